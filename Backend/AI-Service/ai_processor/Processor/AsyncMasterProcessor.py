@@ -0,0 +1,121 @@
+import asyncio
+from django.conf import settings
+from .. import repository
+from django.core.exceptions import ObjectDoesNotExist
+from .audio_downloader import download_audio_to_storage_async, cleanup_audio_file, open_audio_stream_async
+from .MasterProcessor import MasterProcessor, PIPELINE_STAGES, stage_timeout
+from .audio_transcoder import prepare_for_upload
+from .pipeline import AsyncStageScheduler, stored_outputs, graph_status
+from .status_events import notify_status
+from .task_writes import TaskWriter
+
+#? async master processor class
+#? same pipeline as MasterProcessor, but every stage awaits the network instead
+#? of blocking a worker, so one event loop can hold many meetings in flight.
+
+
+class AsyncMasterProcessor:
+    def __init__(self, speech_to_text_strategy, summarization_strategy, key_points_strategy):
+        self.speech_to_text_strategy = speech_to_text_strategy
+        self.summarization_strategy = summarization_strategy
+        self.key_points_strategy = key_points_strategy
+
+    def build_stages(self, task):
+        language = task["main_language"]
+
+        async def transcribe():
+            return await self.transcribe(task)
+
+        async def summarize(transcript):
+            return await self.summarization_strategy.summarize_text(transcript, language)
+
+        async def extract_key_points(summary):
+            return MasterProcessor.clean_key_points(await self.key_points_strategy.extract_key_points(summary))
+
+        return [
+            PIPELINE_STAGES["stt"].bind(transcribe, stage_timeout("stt")),
+            PIPELINE_STAGES["summary"].bind(summarize, stage_timeout("summary")),
+            PIPELINE_STAGES["key_points"].bind(extract_key_points, stage_timeout("key_points")),
+        ]
+
+    async def transcribe(self, task):
+        audio_id = task["audio_id"]
+        audio_url = task["audio_url"]
+        if settings.STT_STREAMING and self.speech_to_text_strategy.supports_streaming:
+            #? Pipe the download straight into the STT upload, nothing is written to disk
+            print("Streaming audio to speech to text")
+            async with open_audio_stream_async(audio_url) as (chunks, content_type):
+                return await self.speech_to_text_strategy.convert_stream_to_text(chunks, content_type)
+
+        audio_file_path = None
+        try:
+            # Download the audio file to the AUDIOS_FOLDER
+            audio_file_path, file_format = await download_audio_to_storage_async(audio_url, audio_id)
+            print(f"Audio file downloaded successfully to: {audio_file_path}")
+            #? Transcoded after the transcript cache lookup, ffmpeg runs in a thread
+            return await self.speech_to_text_strategy.convert_file_to_text(audio_file_path, prepare_for_upload)
+        finally:
+            if audio_file_path:
+                cleanup_audio_file(audio_file_path)
+
+    async def process_task(self, task):
+        audio_id = task["audio_id"]
+        print(f"Processing Audio ID: {audio_id}")
+        print("step02: async master processor")
+
+        writer = None
+        try:
+            audio_task = await asyncio.to_thread(repository.get_task, audio_id)
+            if audio_task.processing_status == 'COMPLETED':
+                print(f"Audio task {audio_id} is already completed, skipping")
+                return self.format_results(audio_id, audio_task.transcript, audio_task.summarization, audio_task.key_points)
+
+            writer = TaskWriter(audio_task)
+            stages = self.build_stages(task)
+            #? Stages stored by an earlier attempt are reused instead of being paid for again
+            outputs = stored_outputs(stages, audio_task)
+            if outputs:
+                print(f"Resuming audio task {audio_id}, already stored: {sorted(outputs)}")
+
+            async def on_stage_done(stage, value, outputs):
+                status = graph_status(stages, outputs)
+                if not stage.field and status == audio_task.processing_status:
+                    return
+                changed = status != audio_task.processing_status
+                if stage.field:
+                    writer.set(**stage.stored_fields(value))
+                writer.set(processing_status=status)
+                if len(outputs) == len(stages):
+                    #? Last stage, written together with COMPLETED
+                    return
+                await asyncio.to_thread(writer.flush)
+                if changed:
+                    await asyncio.to_thread(notify_status, audio_task)
+
+            await AsyncStageScheduler(stages, on_stage_done).run(outputs)
+
+            # Final status update
+            writer.set(processing_status='COMPLETED')
+            await asyncio.to_thread(writer.flush)
+            await asyncio.to_thread(notify_status, audio_task)
+            print("step07: async master processor completed")
+            return self.format_results(audio_id, outputs["stt"], outputs["summary"], outputs["key_points"])
+
+        except ObjectDoesNotExist:
+            print(f"Audio task with ID {audio_id} not found in database")
+            raise
+        except Exception as e:
+            if writer is not None:
+                #? Outputs not written yet are kept for the retry
+                writer.set(processing_status='FAILED')
+                await asyncio.to_thread(writer.flush)
+            print(f"Error processing task {audio_id}: {str(e)}")
+            raise e
+
+    def format_results(self, audio_id, transcript, summary, key_points):
+        return {
+            "audio_id": audio_id,
+            "transcript": transcript,
+            "summary": summary,
+            "key_points": key_points
+        }
@@ -0,0 +1,167 @@
+from typing import List
+from pydantic import BaseModel, ValidationError
+from .Summarization_component import (
+    SummarizationStrategy,
+    AsyncSummarizationStrategy,
+    MapReduceSummarization,
+    AsyncMapReduceSummarization,
+    _summary_max_words,
+    _openai_chat_request,
+    _openai_chat,
+    _openai_chat_async,
+)
+from .Key_points_Component import KeyPointsStrategy, AsyncKeyPointsStrategy
+from .text_splitter import TextSplitter
+
+#? Summary and key points of a meeting from one structured OpenAI call.
+#? The answer is constrained by a JSON schema and validated into MeetingDigest,
+#? so there is no second round trip and no "//" parsing of the key points.
+
+
+class MeetingDigest(BaseModel):
+    summary: str
+    key_points: List[str]
+
+
+class KeyPointsList(BaseModel):
+    key_points: List[str]
+
+
+def _json_schema_format(name, properties):
+    #? Written out by hand, strict mode wants every property required and no extra keys
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+_KEY_POINTS_PROPERTY = {"type": "array", "items": {"type": "string"}}
+
+DIGEST_FORMAT = _json_schema_format("meeting_digest", {"summary": {"type": "string"}, "key_points": _KEY_POINTS_PROPERTY})
+KEY_POINTS_FORMAT = _json_schema_format("meeting_key_points", {"key_points": _KEY_POINTS_PROPERTY})
+
+
+def _openai_digest_request(source, language, max_words, from_partials=False):
+    if from_partials:
+        source_description = "the summaries of consecutive parts of one meeting, in order"
+    else:
+        source_description = "a meeting transcript"
+
+    prompt = f"""
+        i will provide you {source_description}.
+        write a summary of the whole meeting in {max_words} words, and extract the key points of the meeting as a list of short items.
+        answer in {language} language  only.
+        the input is:
+        {source}
+        """
+    url, headers, data = _openai_chat_request(prompt)
+    data["response_format"] = DIGEST_FORMAT
+    return url, headers, data
+
+
+def _openai_structured_key_points_request(summary):
+    prompt = f"""
+        i will provide you a summary of a meeting, extract the summarized key points from it as a list of short items.
+        the summary is:
+        {summary}
+        """
+    url, headers, data = _openai_chat_request(prompt)
+    data["response_format"] = KEY_POINTS_FORMAT
+    return url, headers, data
+
+
+def parse_digest(content):
+    """
+    Validate the JSON answer into a MeetingDigest, ValueError when it does not match.
+    """
+    try:
+        return MeetingDigest.model_validate_json(content)
+    except ValidationError as e:
+        raise ValueError(f"Invalid digest returned by openai: {e}")
+
+
+def parse_key_points(content):
+    try:
+        return KeyPointsList.model_validate_json(content).key_points
+    except ValidationError as e:
+        raise ValueError(f"Invalid key points returned by openai: {e}")
+
+
+class StructuredDigest(SummarizationStrategy, KeyPointsStrategy):
+    """
+    Summarization and key points strategy in one object, meant to be passed as
+    both strategies of the MasterProcessor.
+
+    summarize_text makes the single structured call and keeps the key points of
+    that answer, extract_key_points then returns them without another request.
+    When the summary comes from an earlier attempt (resumed task), only the key
+    points are requested. Transcripts longer than one window are summarized per
+    window first and the digest is built from the partial summaries.
+    """
+
+    def __init__(self, window_tokens=None):
+        self.map_reduce = MapReduceSummarization(window_tokens)
+        self.key_points_by_summary = {}
+
+    def digest(self, transcript, language):
+        max_words = _summary_max_words(transcript)
+        if TextSplitter.count_tokens(transcript) <= self.map_reduce.window_tokens:
+            request = _openai_digest_request(transcript, language, max_words)
+        else:
+            partials = self.map_reduce.map_partials(transcript, language)
+            request = _openai_digest_request("\n\n".join(partials), language, max_words, from_partials=True)
+        return parse_digest(_openai_chat(request))
+
+    def summarize_text(self, transcript, language):
+        print("step04: structured digest - summary and key points with openai")
+        result = self.digest(transcript, language)
+        self.key_points_by_summary[result.summary] = result.key_points
+        return result.summary
+
+    def extract_key_points(self, summary):
+        print("step06: structured digest key points")
+        key_points = self.key_points_by_summary.pop(summary, None)
+        if key_points is not None:
+            return key_points
+        return parse_key_points(_openai_chat(_openai_structured_key_points_request(summary)))
+
+
+class AsyncStructuredDigest(AsyncSummarizationStrategy, AsyncKeyPointsStrategy):
+    """
+    Async counterpart of StructuredDigest.
+    """
+
+    def __init__(self, window_tokens=None):
+        self.map_reduce = AsyncMapReduceSummarization(window_tokens)
+        self.key_points_by_summary = {}
+
+    async def digest(self, transcript, language):
+        max_words = _summary_max_words(transcript)
+        if TextSplitter.count_tokens(transcript) <= self.map_reduce.splitter.window_tokens:
+            request = _openai_digest_request(transcript, language, max_words)
+        else:
+            partials = await self.map_reduce.map_partials(transcript, language)
+            request = _openai_digest_request("\n\n".join(partials), language, max_words, from_partials=True)
+        return parse_digest(await _openai_chat_async(request))
+
+    async def summarize_text(self, transcript, language):
+        print("step04: structured digest - summary and key points with openai (async)")
+        result = await self.digest(transcript, language)
+        self.key_points_by_summary[result.summary] = result.key_points
+        return result.summary
+
+    async def extract_key_points(self, summary):
+        print("step06: structured digest key points (async)")
+        key_points = self.key_points_by_summary.pop(summary, None)
+        if key_points is not None:
+            return key_points
+        return parse_key_points(await _openai_chat_async(_openai_structured_key_points_request(summary)))
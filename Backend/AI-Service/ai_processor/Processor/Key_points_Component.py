@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
 from django.conf import settings
-import requests
-import os
+import asyncio
+from .provider_limits import provider_slot
+from .errors import check_response
+from .http_clients import get_session, get_async_client, request_timeout
+from .rate_limiter import rate_limited, rate_limited_async, estimate_tokens, usage_tokens
 
 
 api_key = settings.DEEPGRAM_API_KEY
@@ -13,32 +16,60 @@ class KeyPointsStrategy(ABC):
         print("step06: extract key points strategy")
         pass
 
-class AdvancedKeyPoints(KeyPointsStrategy):
-    def extract_key_points(self, summary):
-        print("step06: advanced key points using open ai")
-        prompt = f"""
+
+def _openai_key_points_request(summary):
+    prompt = f"""
         i will provide you a summary of a meeting ,extract the summarized key points from it.
         and format it in a list of key points. separate each key point with a // mark.
         the summary is:
         {summary}
         """
-        url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {openai_api_key}"
-        }
-        
-        data = {
-            "model": "gpt-4o-mini",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7,
-        }
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            result = response.json()
-            message_content = result['choices'][0]['message']['content']
-
-        else:
-            print(f"Request failed with status code {response.status_code}: {response.text}")
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {openai_api_key}"
+    }
+
+    data = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+    }
+    return url, headers, data
+
+
+class AdvancedKeyPoints(KeyPointsStrategy):
+    def extract_key_points(self, summary):
+        print("step06: advanced key points using open ai")
+        url, headers, data = _openai_key_points_request(summary)
+        tokens = estimate_tokens(data["messages"][0]["content"])
+        with rate_limited("openai", tokens) as limiter:
+            response = get_session(url).post(url, headers=headers, json=data, timeout=request_timeout())
+            limiter.observe(response)
+        check_response(response, "openai")
+        result = response.json()
+        limiter.settle(tokens, usage_tokens(result))
+        message_content = result['choices'][0]['message']['content']
         return message_content
-        
+
+
+#? Async variants for the AsyncMasterProcessor
+
+class AsyncKeyPointsStrategy(ABC):
+    @abstractmethod
+    async def extract_key_points(self, summary):
+        pass
+
+
+class AsyncAdvancedKeyPoints(AsyncKeyPointsStrategy):
+    async def extract_key_points(self, summary):
+        print("step06: advanced key points using open ai (async)")
+        url, headers, data = _openai_key_points_request(summary)
+        tokens = estimate_tokens(data["messages"][0]["content"])
+        async with rate_limited_async("openai", tokens) as limiter, provider_slot("openai"):
+            response = await get_async_client(url).post(url, headers=headers, json=data)
+            await asyncio.to_thread(limiter.observe, response)
+        check_response(response, "openai")
+        result = response.json()
+        await asyncio.to_thread(limiter.settle, tokens, usage_tokens(result))
+        return result['choices'][0]['message']['content']
@@ -1,11 +1,62 @@
-from ..models import AudioProcessing
+from .. import repository
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from .audio_downloader import download_audio_to_storage, cleanup_audio_file
+from .audio_downloader import download_audio_to_storage, cleanup_audio_file, open_audio_stream
 from .text_splitter import TextSplitter
+from .audio_transcoder import prepare_for_upload
+from .pipeline import Stage, StageScheduler, stored_outputs, graph_status
+from .status_events import notify_status
+from .task_writes import TaskWriter
 
 #? master processor class
 #? pipeline of the audio processing
 
+#? Values the summarization strategies return instead of raising, they don't count as a stored summary
+SUMMARY_ERROR_PREFIXES = ("Error generating summary", "Failed to generate summary")
+
+
+def transcript_segments(transcript):
+    #? Chunked speech to text returns a Transcript carrying the offset of every segment
+    segments = getattr(transcript, "segments", None)
+    return {"transcript_segments": segments} if segments else {}
+
+
+#? Stages of the pipeline and where their outputs are stored, implementations are bound per task.
+#? key_points reads the summary, the structured digest takes its key points from the summary call.
+PIPELINE_STAGES = {
+    "stt": Stage("stt", field="transcript", status='STT_PROCESSED', extra_fields=transcript_segments),
+    "summary": Stage(
+        "summary",
+        inputs=("stt",),
+        field="summarization",
+        status='SUMMARY_PROCESSED',
+        is_stored=lambda summary: not summary.startswith(SUMMARY_ERROR_PREFIXES),
+    ),
+    "key_points": Stage("key_points", inputs=("summary",), field="key_points", status='KEY_POINTS_PROCESSED'),
+}
+
+
+def completed_stages(audio_task, stages=None):
+    """
+    Stages whose output is already stored on the task, so a retry can skip them.
+
+    Returns:
+        set: subset of the stage names, {"stt", "summary", "key_points"} by default
+    """
+    return set(stored_outputs(stages or PIPELINE_STAGES.values(), audio_task))
+
+
+def resume_status(audio_task, stages=None):
+    """
+    Status matching the last stage stored in order, used when a failed task is requeued.
+    """
+    stages = list(stages or PIPELINE_STAGES.values())
+    return graph_status(stages, completed_stages(audio_task, stages))
+
+
+def stage_timeout(name):
+    return settings.PIPELINE_STAGE_TIMEOUTS.get(name) or None
+
 
 class MasterProcessor:
     def __init__(self, speech_to_text_strategy, summarization_strategy, key_points_strategy):
@@ -13,78 +64,115 @@ class MasterProcessor:
         self.summarization_strategy = summarization_strategy
         self.key_points_strategy = key_points_strategy
 
-    def process_task(self, task):
+    def build_stages(self, task):
+        language = task["main_language"]
+
+        def summarize(transcript):
+            return self.summarization_strategy.summarize_text(transcript, language)
+
+        def extract_key_points(summary):
+            return self.clean_key_points(self.key_points_strategy.extract_key_points(summary))
+
+        return [
+            PIPELINE_STAGES["stt"].bind(lambda: self.transcribe(task), stage_timeout("stt")),
+            PIPELINE_STAGES["summary"].bind(summarize, stage_timeout("summary")),
+            PIPELINE_STAGES["key_points"].bind(extract_key_points, stage_timeout("key_points")),
+        ]
+
+    def transcribe(self, task):
         audio_id = task["audio_id"]
         audio_url = task["audio_url"]
-        print(f"Processing Audio ID: {audio_id}")
-        print(f"Processing Audio URL: {audio_url}")
-        print("step02: master processor")
+        if settings.STT_STREAMING and self.speech_to_text_strategy.supports_streaming:
+            #? Pipe the download straight into the STT upload, nothing is written to disk
+            print("Streaming audio to speech to text")
+            with open_audio_stream(audio_url) as (chunks, content_type):
+                return self.speech_to_text_strategy.convert_stream_to_text(chunks, content_type)
 
         audio_file_path = None
         try:
-            audio_task = AudioProcessing.objects.get(audio_token=audio_id)
-            
             # Download the audio file to the AUDIOS_FOLDER
             audio_file_path, file_format = download_audio_to_storage(audio_url, audio_id)
             print(f"Audio file downloaded successfully to: {audio_file_path}")
+            #? Preprocessing: 16 kHz mono Opus / FLAC without the silent ends, when enabled.
+            #? The strategy prepares the file after the transcript cache looked up the download.
+            return self.speech_to_text_strategy.convert_file_to_text(audio_file_path, prepare_for_upload)
+        finally:
+            if audio_file_path:
+                cleanup_audio_file(audio_file_path)
 
+    def process_task(self, task):
+        audio_id = task["audio_id"]
+        audio_url = task["audio_url"]
+        print(f"Processing Audio ID: {audio_id}")
+        print(f"Processing Audio URL: {audio_url}")
+        print("step02: master processor")
 
-            transcript = self.speech_to_text_strategy.convert_speech_to_text(audio_file_path)
-            audio_task.transcript = transcript
-            audio_task.processing_status = 'STT_PROCESSED'
-            audio_task.save()
-            print(f"Transcript completed!")
-
-            # Step 3: Summarization
-            print(task["main_language"])
-            
-            summary = self.summarization_strategy.summarize_text(transcript, task["main_language"])
-            audio_task.summarization = summary
-            audio_task.processing_status = 'SUMMARY_PROCESSED'
-            audio_task.save()
-            print(f"Summary completed!")    
-
-            # Step 4: Key Points Extraction
-            key_points = self.key_points_strategy.extract_key_points(summary) 
-            print(f"Key points: {key_points} in the master processor")          
-            key_points = TextSplitter.split_into_sentences(key_points)
-            print(f"Key points after splitting: {key_points}")
-            key_points = [point for point in key_points if point and point.strip()]
-            print(f"Key points after cleaning: {key_points}")
-            
-            # Ensure key_points is always a list, even if empty
-            if not isinstance(key_points, list):
-                key_points = []
-                
-            print(f"Processed key points: {key_points}")
-            
-            audio_task.key_points = key_points
-            audio_task.processing_status = 'KEY_POINTS_PROCESSED'
-            audio_task.save()
-            print(f"Key Points extraction completed!")
+        writer = None
+        try:
+            audio_task = repository.get_task(audio_id)
+            if audio_task.processing_status == 'COMPLETED':
+                print(f"Audio task {audio_id} is already completed, skipping")
+                return self.format_results(audio_id, audio_task.transcript, audio_task.summarization, audio_task.key_points)
+
+            writer = TaskWriter(audio_task)
+            stages = self.build_stages(task)
+            #? Stages stored by an earlier attempt are reused instead of being paid for again
+            outputs = stored_outputs(stages, audio_task)
+            if outputs:
+                print(f"Resuming audio task {audio_id}, already stored: {sorted(outputs)}")
+
+            def on_stage_done(stage, value, outputs):
+                status = graph_status(stages, outputs)
+                if not stage.field and status == audio_task.processing_status:
+                    return
+                changed = status != audio_task.processing_status
+                if stage.field:
+                    writer.set(**stage.stored_fields(value))
+                writer.set(processing_status=status)
+                if len(outputs) == len(stages):
+                    #? Last stage, written together with COMPLETED
+                    return
+                writer.flush()
+                if changed:
+                    notify_status(audio_task)
+
+            StageScheduler(stages, on_stage_done, settings.PIPELINE_STAGE_WORKERS).run(outputs)
 
             # Final status update
-            audio_task.processing_status = 'COMPLETED'
-            audio_task.save()
+            writer.set(processing_status='COMPLETED')
+            writer.flush()
+            notify_status(audio_task)
             print("step07: master processor completed")
-            cleanup_audio_file
-            return self.format_results(audio_id, transcript, summary, key_points)
+            return self.format_results(audio_id, outputs["stt"], outputs["summary"], outputs["key_points"])
 
     
         except ObjectDoesNotExist:
             print(f"Audio task with ID {audio_id} not found in database")
             raise
         except Exception as e:
-            if 'audio_task' in locals():
-                audio_task.processing_status = 'FAILED'
-                audio_task.error_message = str(e)
-                audio_task.save()
+            if writer is not None:
+                #? Outputs not written yet are kept for the retry
+                writer.set(processing_status='FAILED')
+                writer.flush()
             print(f"Error processing task {audio_id}: {str(e)}")
             raise e
-        finally:
-            if audio_file_path:
-                cleanup_audio_file(audio_file_path)
 
+    @staticmethod
+    def clean_key_points(key_points):
+        print(f"Key points: {key_points} in the master processor")
+        #? Structured strategies already return a list, only "//" separated text needs splitting
+        if not isinstance(key_points, list):
+            key_points = TextSplitter.split_into_sentences(key_points)
+        print(f"Key points after splitting: {key_points}")
+        key_points = [point.strip() for point in key_points if point and point.strip()]
+        print(f"Key points after cleaning: {key_points}")
+
+        # Ensure key_points is always a list, even if empty
+        if not isinstance(key_points, list):
+            key_points = []
+
+        print(f"Processed key points: {key_points}")
+        return key_points
 
     def format_results(self, audio_id, transcript, summary, key_points):
         return {
@@ -1,61 +1,222 @@
 import json
-from .Speech_to_text_component import EnglishSpeechToText, ArabicSpeechToText
-from .Summarization_component import BasicSummarization, AdvancedSummarization
-from .Key_points_Component import  AdvancedKeyPoints
-from .MasterProcessor import MasterProcessor
+import asyncio
+import threading
+from django.conf import settings
+from .transcript_cache import get_transcript_cache
+from .strategy_registry import strategy_class, create_strategy
+from .MasterProcessor import MasterProcessor, resume_status
+from .AsyncMasterProcessor import AsyncMasterProcessor
+from .errors import is_retryable
+from .status_events import notify_status
+from .. import repository
+from ..Queue.topology import TaskOutcome, attempt_from_headers, will_retry, settle_delivery
+from ..Queue.queue_metrics import record_queue_wait
 
 
 #?    Consumer callback function to process audio tasks.
 
-def process_audio(channel, method, properties, body):
+_shared_strategies = {}
+_shared_lock = threading.Lock()
+
+
+def shared_strategy(name, *args):
     """
-    RabbitMQ callback function for processing audio messages.
-    
+    Per process instance of a stateless strategy, reused by every message so
+    the strategies and their HTTP clients are not rebuilt for each task.
+    Strategies holding per task state (StructuredDigest) are not shared.
+    name is a key of strategy_registry.STRATEGIES, its module is imported on first use.
+    """
+    key = (name, args)
+    strategy = _shared_strategies.get(key)
+    if strategy is None:
+        strategy_cls = strategy_class(name)  # Outside the lock, the first import can take a while
+        with _shared_lock:
+            strategy = _shared_strategies.get(key)
+            if strategy is None:
+                strategy = strategy_cls(*args)
+                _shared_strategies[key] = strategy
+    return strategy
+
+
+def build_processor(task):
+    # Dynamic Strategy Selection
+    language = task.get("main_language")
+    user_plan = task.get("user_plan")
+
+    if language == "ar":
+        speech_to_text_strategy = shared_strategy("stt.arabic")
+    else:
+        speech_to_text_strategy = shared_strategy("stt.english")
+    if language in settings.STT_CHUNKING_LANGUAGES:
+        speech_to_text_strategy = shared_strategy("stt.chunked", speech_to_text_strategy)
+    transcript_cache = get_transcript_cache()
+    if transcript_cache:
+        speech_to_text_strategy = shared_strategy("stt.cached", speech_to_text_strategy, transcript_cache, language)
+
+    if user_plan == "premium" and settings.PREMIUM_STRUCTURED_DIGEST:
+        #? One openai call answers both stages
+        summarization_strategy = key_points_strategy = create_strategy("digest.structured")
+    elif user_plan == "premium":
+        if settings.SUMMARY_MAP_REDUCE:
+            summarization_strategy = shared_strategy("summary.map_reduce") #openai, long transcripts in windows
+        else:
+            summarization_strategy = shared_strategy("summary.advanced") #openai
+        key_points_strategy = shared_strategy("key_points.advanced") #openai
+    else:
+        if settings.BASIC_SUMMARY_ENGINE == "local":
+            summarization_strategy = shared_strategy("summary.local") #worker CPU
+        else:
+            summarization_strategy = shared_strategy("summary.basic") #deepgram
+        key_points_strategy = shared_strategy("key_points.advanced") #openai
+
+    return MasterProcessor(
+        speech_to_text_strategy,
+        summarization_strategy,
+        key_points_strategy
+    )
+
+
+def build_async_processor(task):
+    language = task.get("main_language")
+    user_plan = task.get("user_plan")
+
+    if language == "ar":
+        speech_to_text_strategy = shared_strategy("async.stt.arabic")
+    else:
+        speech_to_text_strategy = shared_strategy("async.stt.english")
+    if language in settings.STT_CHUNKING_LANGUAGES:
+        speech_to_text_strategy = shared_strategy("async.stt.chunked", speech_to_text_strategy)
+    transcript_cache = get_transcript_cache()
+    if transcript_cache:
+        speech_to_text_strategy = shared_strategy("async.stt.cached", speech_to_text_strategy, transcript_cache, language)
+
+    if user_plan == "premium" and settings.PREMIUM_STRUCTURED_DIGEST:
+        summarization_strategy = key_points_strategy = create_strategy("async.digest.structured")
+    else:
+        if user_plan == "premium":
+            if settings.SUMMARY_MAP_REDUCE:
+                summarization_strategy = shared_strategy("async.summary.map_reduce") #openai, long transcripts in windows
+            else:
+                summarization_strategy = shared_strategy("async.summary.advanced") #openai
+        elif settings.BASIC_SUMMARY_ENGINE == "local":
+            summarization_strategy = shared_strategy("async.summary.local") #worker CPU
+        else:
+            summarization_strategy = shared_strategy("async.summary.basic") #deepgram
+        key_points_strategy = shared_strategy("async.key_points.advanced") #openai
+
+    return AsyncMasterProcessor(
+        speech_to_text_strategy,
+        summarization_strategy,
+        key_points_strategy
+    )
+
+
+def settle_failed_task(task, retry_scheduled):
+    """
+    When a retry is coming the task should not look FAILED to pollers in the
+    meantime, it goes back to the status of its last stored stage.
+    Subscribers are told either way.
+    """
+    try:
+        audio_task = repository.get_task(task["audio_id"])
+        if retry_scheduled:
+            audio_task.processing_status = resume_status(audio_task)
+            repository.update_task(task["audio_id"], processing_status=audio_task.processing_status)
+        notify_status(audio_task, retry_scheduled=retry_scheduled)
+    except Exception as e:
+        print(f"Warning: failed to settle the status of the failed task: {e}")
+
+
+def failure_outcome(error, task, attempt):
+    retryable = is_retryable(error)
+    if task and "audio_id" in task:
+        settle_failed_task(task, will_retry(attempt, retryable))
+    return TaskOutcome(False, retryable, str(error))
+
+
+def run_task(body, attempt=0):
+    """
+    Parse and process a single audio message body.
+
+    This is the part of the callback that does not touch the channel, so it can
+    run inline on the connection thread or inside a worker pool.
+
     Args:
-        channel: The channel object
-        method: The delivery method
-        properties: Message properties
         body: The message body
+        attempt: Number of earlier attempts that failed for this message
+
+    Returns:
+        TaskOutcome: whether it succeeded, and if not whether a retry makes sense
     """
+    task = None
     try:
         # Parse the message body
         task = json.loads(body)
         print(f"Received Task: {task}")
         print("step02: process audio")
 
-        # Dynamic Strategy Selection
-        language = task.get("main_language")
-        user_plan = task.get("user_plan")
-
-        if language == "ar":
-            speech_to_text_strategy = ArabicSpeechToText()
-        else:
-            speech_to_text_strategy = EnglishSpeechToText()
-
-        if user_plan == "premium":
-            summarization_strategy = AdvancedSummarization() #openai
-            key_points_strategy = AdvancedKeyPoints() #openai
-        else:
-            summarization_strategy = BasicSummarization() #deepgram
-            key_points_strategy = AdvancedKeyPoints() #openai
-
-        processor = MasterProcessor(
-            speech_to_text_strategy,
-            summarization_strategy,
-            key_points_strategy
-        )
+        processor = build_processor(task)
 
         # Process the task
         processor.process_task(task)
-        
-        # Acknowledge the message
-        channel.basic_ack(delivery_tag=method.delivery_tag)
         print(f"Task {task.get('audio_id', 'unknown')} completed successfully\n")
+        return TaskOutcome(True)
 
     except json.JSONDecodeError as e:
         print(f"Invalid JSON in message: {e}")
-        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return TaskOutcome(False, False, str(e))
     except Exception as e:
         print(f"Error processing task: {e}")
-        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return failure_outcome(e, task, attempt)
+
+
+def run_delivery(body, headers=None, priority=None):
+    """
+    run_task for a message as delivered: records how long it waited in the
+    queue, then processes it. Meant for the worker side, so the metrics write
+    never holds up the connection thread. Module level to be picklable for
+    the process pool.
+    """
+    record_queue_wait(headers, priority)
+    return run_task(body, attempt_from_headers(headers))
+
+
+def process_audio(channel, method, properties, body):
+    """
+    RabbitMQ callback function for processing audio messages.
+
+    Args:
+        channel: The channel object
+        method: The delivery method
+        properties: Message properties
+        body: The message body
+    """
+    outcome = run_delivery(body, properties.headers, properties.priority)
+    settle_delivery(channel, method, properties, body, outcome)
+
+
+async def run_task_async(body, attempt=0):
+    """
+    Async counterpart of run_task, used by the aio-pika consumer.
+
+    Returns:
+        TaskOutcome: whether it succeeded, and if not whether a retry makes sense
+    """
+    task = None
+    try:
+        task = json.loads(body)
+        print(f"Received Task: {task}")
+        print("step02: process audio (async)")
+
+        processor = build_async_processor(task)
+
+        await processor.process_task(task)
+        print(f"Task {task.get('audio_id', 'unknown')} completed successfully\n")
+        return TaskOutcome(True)
 
+    except json.JSONDecodeError as e:
+        print(f"Invalid JSON in message: {e}")
+        return TaskOutcome(False, False, str(e))
+    except Exception as e:
+        print(f"Error processing task: {e}")
+        return await asyncio.to_thread(failure_outcome, e, task, attempt)
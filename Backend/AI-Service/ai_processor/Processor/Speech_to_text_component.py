@@ -1,83 +1,364 @@
 from abc import ABC, abstractmethod
-import os
 from django.conf import settings
-from openai import OpenAI
-import os
-from deepgram import (
-    DeepgramClient,
-    PrerecordedOptions,
-    FileSource,
+import aiofiles
+import asyncio
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from .provider_limits import provider_slot
+from .rate_limiter import rate_limited, rate_limited_async
+from .audio_chunker import split_on_silence, export_chunk
+from .transcript_cache import hash_file, cache_key
+from .errors import check_response
+from .audio_downloader import cleanup_audio_file
+from .http_clients import (
+    get_session, get_async_client, get_openai_client, get_async_openai_client, request_timeout, openai_timeout, carry_deadline
 )
-import requests
 
 
 api_key = settings.DEEPGRAM_API_KEY
 class SpeechToTextStrategy(ABC):
+    #? Strategies that can upload a non-seekable byte stream set this to True
+    supports_streaming = False
+
     @abstractmethod
     def convert_speech_to_text(self, file_path):
         pass
 
+    def convert_file_to_text(self, file_path, prepare=None):
+        """
+        Transcribe a downloaded recording. prepare(file_path) returns the path
+        to upload and the path to clean up afterwards (or None), e.g.
+        prepare_for_upload. Wrappers that look at the recording itself, like
+        the transcript cache, see file_path before it is prepared.
+        """
+        upload_path, prepared_path = prepare(file_path) if prepare else (file_path, None)
+        try:
+            return self.convert_speech_to_text(upload_path)
+        finally:
+            if prepared_path:
+                cleanup_audio_file(prepared_path)
+
+    def convert_stream_to_text(self, chunks, content_type=None):
+        """
+        Transcribe audio given as an iterator of byte chunks, without a local file.
+        Only available when supports_streaming is True.
+        """
+        raise NotImplementedError(f"{type(self).__name__} needs a seekable file")
+
+
+class Transcript(str):
+    """
+    Transcript stitched from segments, the text plus where each segment sits in the recording.
+    segments is [{"start": seconds, "end": seconds, "text": str}, ...] in time order.
+    """
+
+    def __new__(cls, segments):
+        transcript = super().__new__(cls, " ".join(segment["text"].strip() for segment in segments if segment["text"]))
+        transcript.segments = [
+            {"start": round(segment["start"], 3), "end": round(segment["end"], 3), "text": segment["text"].strip()}
+            for segment in segments
+        ]
+        return transcript
+
+
+def stitch_segments(segments):
+    """
+    Transcript of the segments, with their offsets when the audio was actually split.
+    """
+    if len(segments) == 1:
+        return (segments[0]["text"] or "").strip()
+    return Transcript(segments)
+
+
+def _deepgram_headers(content_type=None):
+    return {
+        "Authorization": f"Token {api_key}",
+        "Content-Type": content_type if content_type and content_type.startswith("audio/") else "audio/*"
+    }
+
+
+def _parse_deepgram_transcript(payload):
+    return payload.get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("transcript", "")
+
 
 class EnglishSpeechToText(SpeechToTextStrategy):
-    def convert_speech_to_text(self, file_path):
-        url = "https://api.deepgram.com/v1/listen"
+    url = f"{settings.DEEPGRAM_BASE_URL}/v1/listen"
+    supports_streaming = True
 
-        headers = {
-            "Authorization": f"Token {api_key}",
-            "Content-Type": "audio/*"
-        }   
+    def convert_speech_to_text(self, file_path):
+        headers = _deepgram_headers()
 
         # Get the audio file
-        with open(file_path, "rb") as audio_file:
+        with open(file_path, "rb") as audio_file, rate_limited("deepgram") as limiter:
             # Make the HTTP request
-            response = requests.post(url, headers=headers, data=audio_file)
-            transcript = response.json().get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("transcript", "")
+            response = get_session(self.url).post(self.url, headers=headers, data=audio_file, timeout=request_timeout())
+            limiter.observe(response)
+            check_response(response, "deepgram")
+            transcript = _parse_deepgram_transcript(response.json())
 
         print(transcript)
         return transcript
 
-        # print("step02: english speech to text -  nova02")
-        # try:
-        #     deepgram = DeepgramClient(api_key)
-        #     with open(file_path, "rb") as file:
-        #         buffer_data = file.read()
-        #     payload: FileSource = {
-        #         "buffer": buffer_data,
-        #         "mimetype": "audio/m4a"  
-        #     }
-        #     options = PrerecordedOptions(
-        #         model="nova-2",
-        #         smart_format=True,
-        #         language="en", 
-        #         tier="enhanced"  
-        #     )
-        #     response = deepgram.listen.rest.v("1").transcribe_file(payload, options)
-
-        #     print(response.to_json(indent=4))
-        
-        #     # Extract the transcript from the response
-        #     if response and response.get("results"):
-        #         transcript = response["results"]["channels"][0]["alternatives"][0]["transcript"]
-        #         return transcript
-        #     else:
-        #         print("No transcription results found in the response")
-        #         return "Error: Failed to transcribe audio"
-        
-        # except Exception as e:
-        #     print(f"Exception in English STT: {e}")
-        #     return "Error: Failed to transcribe audio"
+    def convert_stream_to_text(self, chunks, content_type=None):
+        #? requests sends a generator body with chunked transfer encoding
+        with rate_limited("deepgram") as limiter:
+            response = get_session(self.url).post(
+                self.url, headers=_deepgram_headers(content_type), data=chunks, timeout=request_timeout()
+            )
+            limiter.observe(response)
+        check_response(response, "deepgram")
+        transcript = _parse_deepgram_transcript(response.json())
+
+        print(transcript)
+        return transcript
 
 
 class ArabicSpeechToText(SpeechToTextStrategy):
 
     def convert_speech_to_text(self, file_path):
         print("arabic speech to text - whisper large")
-        client = OpenAI()
-        with open(file_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
+        client = get_openai_client()
+        with open(file_path, "rb") as audio_file, rate_limited("openai-whisper") as limiter:
+            response = client.audio.transcriptions.with_raw_response.create(
                 model="whisper-1",
-                file=audio_file
+                file=audio_file,
+                timeout=openai_timeout(),
             )
+            limiter.observe(response)
+            transcription = response.parse()
             print(transcription.text)
         return transcription.text
-    
+
+
+class ChunkedSpeechToText(SpeechToTextStrategy):
+    """
+    Wraps any SpeechToTextStrategy and transcribes long recordings in parallel.
+
+    The audio is split at silence boundaries into segments of at most
+    max_chunk_seconds (and small enough for upload limits such as Whisper's
+    25 MB), every segment is transcribed concurrently by the wrapped strategy,
+    and the transcripts are stitched back together in time order into a
+    Transcript that keeps the offsets of the segments. Without ffmpeg the file
+    goes to the wrapped strategy as it is.
+    """
+
+    def __init__(self, strategy, max_chunk_seconds=None, max_chunk_bytes=None, max_workers=None):
+        self.strategy = strategy
+        self.max_chunk_seconds = max_chunk_seconds or settings.STT_CHUNK_MAX_SECONDS
+        self.max_chunk_bytes = max_chunk_bytes or settings.STT_CHUNK_MAX_BYTES
+        self.max_workers = max_workers or settings.STT_CHUNK_WORKERS
+
+    def transcribe_segments(self, file_path):
+        """
+        Returns:
+            list: [{"start": seconds, "end": seconds, "text": str}, ...] in time order
+        """
+        chunks = split_on_silence(file_path, self.max_chunk_seconds, self.max_chunk_bytes)
+        if len(chunks) == 1 and chunks[0].path:
+            chunk = chunks[0]
+            return [{"start": chunk.start, "end": chunk.end, "text": self.strategy.convert_speech_to_text(file_path)}]
+
+        out_dir = tempfile.mkdtemp(prefix="chunks_", dir=settings.AUDIOS_FOLDER)
+        try:
+            def transcribe(chunk):
+                chunk_path = export_chunk(file_path, chunk, out_dir)
+                text = self.strategy.convert_speech_to_text(chunk_path)
+                return {"start": chunk.start, "end": chunk.end, "text": text}
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                #? map keeps the input order, so segments come back sorted by offset
+                return list(executor.map(carry_deadline(transcribe), chunks))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def convert_speech_to_text(self, file_path):
+        return stitch_segments(self.transcribe_segments(file_path))
+
+
+def strategy_name(strategy):
+    #? Wrapper strategies are named after what they wrap, e.g. ChunkedSpeechToText(ArabicSpeechToText)
+    inner = getattr(strategy, "strategy", None)
+    if inner is None:
+        return type(strategy).__name__
+    return f"{type(strategy).__name__}({strategy_name(inner)})"
+
+
+class CachedSpeechToText(SpeechToTextStrategy):
+    """
+    Wraps any SpeechToTextStrategy with the content-addressed transcript cache.
+
+    File input is hashed first and a cached transcript is returned without
+    calling the provider. Downloaded recordings are hashed before they are
+    transcoded, the transcoded file is neither needed nor made on a hit.
+    Streamed input has no key before it has been uploaded, so the streaming
+    path bypasses the cache: it is neither looked up, filled nor counted.
+    """
+
+    def __init__(self, strategy, cache, language):
+        self.strategy = strategy
+        self.cache = cache
+        self.language = language
+        self.supports_streaming = strategy.supports_streaming
+
+    def _key(self, content_hash):
+        return cache_key(content_hash, strategy_name(self.strategy), self.language)
+
+    def convert_speech_to_text(self, file_path):
+        return self.convert_file_to_text(file_path)
+
+    def convert_file_to_text(self, file_path, prepare=None):
+        key = self._key(hash_file(file_path))
+        transcript = self.cache.get(key)
+        self.cache.record(hit=transcript is not None)
+        if transcript is not None:
+            print("Transcript cache hit")
+            return transcript
+
+        transcript = self.strategy.convert_file_to_text(file_path, prepare)
+        if transcript:
+            self.cache.set(key, transcript)
+        return transcript
+
+    def convert_stream_to_text(self, chunks, content_type=None):
+        return self.strategy.convert_stream_to_text(chunks, content_type)
+
+
+#? Async variants, used by the AsyncMasterProcessor so a single event loop can
+#? keep many meetings waiting on the providers at the same time.
+
+class AsyncSpeechToTextStrategy(ABC):
+    supports_streaming = False
+
+    @abstractmethod
+    async def convert_speech_to_text(self, file_path):
+        pass
+
+    async def convert_file_to_text(self, file_path, prepare=None):
+        """
+        Async version of SpeechToTextStrategy.convert_file_to_text, prepare runs in a worker thread.
+        """
+        upload_path, prepared_path = await asyncio.to_thread(prepare, file_path) if prepare else (file_path, None)
+        try:
+            return await self.convert_speech_to_text(upload_path)
+        finally:
+            if prepared_path:
+                cleanup_audio_file(prepared_path)
+
+    async def convert_stream_to_text(self, chunks, content_type=None):
+        """
+        Transcribe audio given as an async iterator of byte chunks.
+        Only available when supports_streaming is True.
+        """
+        raise NotImplementedError(f"{type(self).__name__} needs a seekable file")
+
+
+async def _read_file_chunks(file_path, chunk_size=64 * 1024):
+    async with aiofiles.open(file_path, "rb") as audio_file:
+        while True:
+            chunk = await audio_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class AsyncEnglishSpeechToText(AsyncSpeechToTextStrategy):
+    url = EnglishSpeechToText.url
+    supports_streaming = True
+
+    async def convert_speech_to_text(self, file_path):
+        return await self.convert_stream_to_text(_read_file_chunks(file_path))
+
+    async def convert_stream_to_text(self, chunks, content_type=None):
+        async with rate_limited_async("deepgram") as limiter, provider_slot("deepgram"):
+            response = await get_async_client(self.url).post(self.url, headers=_deepgram_headers(content_type), content=chunks)
+            await asyncio.to_thread(limiter.observe, response)
+        check_response(response, "deepgram")
+        transcript = _parse_deepgram_transcript(response.json())
+
+        print(transcript)
+        return transcript
+
+
+class AsyncArabicSpeechToText(AsyncSpeechToTextStrategy):
+
+    async def convert_speech_to_text(self, file_path):
+        print("arabic speech to text - whisper large (async)")
+        client = get_async_openai_client()
+        async with rate_limited_async("openai-whisper") as limiter, provider_slot("openai"):
+            with open(file_path, "rb") as audio_file:
+                response = await client.audio.transcriptions.with_raw_response.create(
+                    model="whisper-1",
+                    file=audio_file
+                )
+            await asyncio.to_thread(limiter.observe, response)
+            transcription = response.parse()
+        print(transcription.text)
+        return transcription.text
+
+
+class AsyncChunkedSpeechToText(AsyncSpeechToTextStrategy):
+    """
+    Async counterpart of ChunkedSpeechToText around an AsyncSpeechToTextStrategy.
+    The provider semaphores still bound how many segments are uploaded at once.
+    """
+
+    def __init__(self, strategy, max_chunk_seconds=None, max_chunk_bytes=None):
+        self.strategy = strategy
+        self.max_chunk_seconds = max_chunk_seconds or settings.STT_CHUNK_MAX_SECONDS
+        self.max_chunk_bytes = max_chunk_bytes or settings.STT_CHUNK_MAX_BYTES
+
+    async def transcribe_segments(self, file_path):
+        chunks = await asyncio.to_thread(split_on_silence, file_path, self.max_chunk_seconds, self.max_chunk_bytes)
+        if len(chunks) == 1 and chunks[0].path:
+            chunk = chunks[0]
+            return [{"start": chunk.start, "end": chunk.end, "text": await self.strategy.convert_speech_to_text(file_path)}]
+
+        out_dir = tempfile.mkdtemp(prefix="chunks_", dir=settings.AUDIOS_FOLDER)
+        try:
+            async def transcribe(chunk):
+                chunk_path = await asyncio.to_thread(export_chunk, file_path, chunk, out_dir)
+                text = await self.strategy.convert_speech_to_text(chunk_path)
+                return {"start": chunk.start, "end": chunk.end, "text": text}
+
+            return await asyncio.gather(*(transcribe(chunk) for chunk in chunks))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    async def convert_speech_to_text(self, file_path):
+        return stitch_segments(await self.transcribe_segments(file_path))
+
+
+class AsyncCachedSpeechToText(AsyncSpeechToTextStrategy):
+    """
+    Async counterpart of CachedSpeechToText, cache and hashing run in worker threads.
+    Streamed input bypasses the cache, as in CachedSpeechToText.
+    """
+
+    def __init__(self, strategy, cache, language):
+        self.strategy = strategy
+        self.cache = cache
+        self.language = language
+        self.supports_streaming = strategy.supports_streaming
+
+    def _key(self, content_hash):
+        return cache_key(content_hash, strategy_name(self.strategy), self.language)
+
+    async def convert_speech_to_text(self, file_path):
+        return await self.convert_file_to_text(file_path)
+
+    async def convert_file_to_text(self, file_path, prepare=None):
+        key = self._key(await asyncio.to_thread(hash_file, file_path))
+        transcript = await asyncio.to_thread(self.cache.get, key)
+        await asyncio.to_thread(self.cache.record, transcript is not None)
+        if transcript is not None:
+            print("Transcript cache hit")
+            return transcript
+
+        transcript = await self.strategy.convert_file_to_text(file_path, prepare)
+        if transcript:
+            await asyncio.to_thread(self.cache.set, key, transcript)
+        return transcript
+
+    async def convert_stream_to_text(self, chunks, content_type=None):
+        return await self.strategy.convert_stream_to_text(chunks, content_type)
@@ -1,87 +1,318 @@
 from abc import ABC, abstractmethod
 from django.conf import settings
 import requests
-from summarizer import Summarizer, TransformerSummarizer
-import requests
-import os
+import httpx
+import asyncio
+from .provider_limits import provider_slot
+from .errors import ProviderError, check_response
+from .http_clients import get_session, get_async_client, request_timeout, carry_deadline
+from .text_splitter import TextSplitter
+from concurrent.futures import ThreadPoolExecutor
+from .rate_limiter import rate_limited, rate_limited_async, estimate_tokens, usage_tokens
+from .extractive_summarizer import extractive_summary
 
 api_key = settings.DEEPGRAM_API_KEY
 
-class SummarizationStrategy(ABC):   
+class SummarizationStrategy(ABC):
     @abstractmethod
     def summarize_text(self, transcript, language="en"):
         pass
 
+
+def _deepgram_summary_request(transcript):
+    headers = {
+        "Authorization": f"Token {api_key}",
+        "Content-Type": "application/json"
+    }
+    params = {
+        "summarize": "true",
+        "language": "en"
+    }
+    data = {
+        "text": transcript  # Sending direct text instead of URL
+    }
+    return headers, params, data
+
+
+def _parse_deepgram_summary(payload):
+    summary = payload.get("results", {}).get("summary", "").get("text", "")
+    return summary if summary else "Failed to generate summary"
+
+
+def _summary_max_words(transcript):
+    transcript_word_number = len(transcript.split())
+    print(transcript_word_number)
+    print(transcript_word_number*0.1)
+
+    max_words = 0
+    if transcript_word_number*0.1 >300 :
+        max_words = 300
+    else:
+        max_words = transcript_word_number*0.1
+    if max_words <20:
+        max_words = 50
+    return max_words
+
+
+def _openai_chat_request(prompt):
+    api_key = settings.OPENAI_API_KEY
+    url = f"{settings.OPENAI_BASE_URL}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    data = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+    }
+    return url, headers, data
+
+
+def _openai_summary_request(transcript, language):
+    max_words = _summary_max_words(transcript)
+
+    prompt = f"""
+        i will provide you a meeting transcript, please summarize it in {max_words} words, in {language} language  only.
+        the transcript is:
+        {transcript}
+        """
+    return _openai_chat_request(prompt)
+
+
+def _openai_partial_summary_request(window, language, index, total):
+    max_words = _summary_max_words(window)
+
+    prompt = f"""
+        i will provide you part {index} of {total} of a meeting transcript, please summarize this part in {max_words} words, in {language} language  only.
+        keep the names, decisions and action items mentioned in it.
+        the transcript part is:
+        {window}
+        """
+    return _openai_chat_request(prompt)
+
+
+def _openai_reduce_request(partials, language, max_words):
+    joined = "\n\n".join(f"part {index}: {partial}" for index, partial in enumerate(partials, start=1))
+
+    prompt = f"""
+        i will provide you the summaries of consecutive parts of one meeting, in order.
+        please combine them into a single summary of the whole meeting in {max_words} words, in {language} language  only.
+        the part summaries are:
+        {joined}
+        """
+    return _openai_chat_request(prompt)
+
+
+def _openai_chat(request):
+    url, headers, data = request
+    tokens = estimate_tokens(data["messages"][0]["content"])
+    with rate_limited("openai", tokens) as limiter:
+        response = get_session(url).post(url, headers=headers, json=data, timeout=request_timeout())
+        limiter.observe(response)
+    check_response(response, "openai")
+    result = response.json()
+    limiter.settle(tokens, usage_tokens(result))
+    return result['choices'][0]['message']['content']
+
+
+async def _openai_chat_async(request):
+    url, headers, data = request
+    tokens = estimate_tokens(data["messages"][0]["content"])
+    async with rate_limited_async("openai", tokens) as limiter, provider_slot("openai"):
+        response = await get_async_client(url).post(url, headers=headers, json=data)
+        await asyncio.to_thread(limiter.observe, response)
+    check_response(response, "openai")
+    result = response.json()
+    await asyncio.to_thread(limiter.settle, tokens, usage_tokens(result))
+    return result['choices'][0]['message']['content']
+
+
 class BasicSummarization(SummarizationStrategy):
-    api_url = "https://api.deepgram.com/v1/read"
+    api_url = f"{settings.DEEPGRAM_BASE_URL}/v1/read"
     print("summarization with deepgram")
     def summarize_text(self, transcript, language="en"):
         print("step04: basic summarization - with deepgram")
-        headers = {
-            "Authorization": f"Token {api_key}",
-            "Content-Type": "application/json"
-        }
-        params = {
-            "summarize": "true",
-            "language": "en"
-        }
-        data = {
-            "text": transcript  # Sending direct text instead of URL
-        }
+        headers, params, data = _deepgram_summary_request(transcript)
         try:
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                params=params,
-                json=data
-            )
-            response.raise_for_status()      
+            with rate_limited("deepgram") as limiter:
+                response = get_session(self.api_url).post(
+                    self.api_url,
+                    headers=headers,
+                    params=params,
+                    json=data,
+                    timeout=request_timeout()
+                )
+                limiter.observe(response)
+            check_response(response, "deepgram")
             # Extract summary from response
-            summary = response.json().get("results", {}).get("summary", "").get("text", "")
-            return summary if summary else "Failed to generate summary"         
+            return _parse_deepgram_summary(response.json())
+        except ProviderError as e:
+            #? Throttling and outages are retried by the consumer instead of storing an error summary
+            if e.retryable:
+                raise
+            return f"Error generating summary: {str(e)}"
         except requests.exceptions.RequestException as e:
             return f"Error generating summary: {str(e)}"
 
 
 
 
+class LocalExtractiveSummarization(SummarizationStrategy):
+    """
+    Basic plan summary computed on the worker CPU (extractive_summarizer), no provider call.
+    """
+
+    def summarize_text(self, transcript, language="en"):
+        print("step04: basic summarization - local extractive")
+        summary = extractive_summary(transcript, _summary_max_words(transcript))
+        return summary if summary else "Failed to generate summary"
+
+
 class AdvancedSummarization(SummarizationStrategy):
     def summarize_text(self, transcript, language):
         print(language)
-        api_key = settings.OPENAI_API_KEY   
         print("step04: advanced summarization - with openai")
-        url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        transcript_word_number = len(transcript.split())
-        print(transcript_word_number)
-        print(transcript_word_number*0.1)
-        
-        max_words = 0
-        if transcript_word_number*0.1 >300 :
-            max_words = 300
-        else:
-            max_words = transcript_word_number*0.1
-        if max_words <20:
-            max_words = 50
-        
-        prompt = f"""
-        i will provide you a meeting transcript, please summarize it in {max_words} words, in {language} language  only.
-        the transcript is:
-        {transcript}
+        message_content = _openai_chat(_openai_summary_request(transcript, language))
+        return message_content
+
+
+class MapReduceSummarization(SummarizationStrategy):
+    """
+    Token aware OpenAI summarization for transcripts of any length.
+
+    Transcripts that fit in one window are summarized with a single prompt like
+    AdvancedSummarization. Longer ones are split into overlapping token windows
+    that are summarized concurrently (map), then the partial summaries are
+    combined into one summary of _summary_max_words(transcript) words (reduce).
+    """
+
+    def __init__(self, window_tokens=None, overlap_tokens=None, max_workers=None):
+        self.window_tokens = window_tokens or settings.SUMMARY_WINDOW_TOKENS
+        self.overlap_tokens = settings.SUMMARY_WINDOW_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.max_workers = max_workers or settings.SUMMARY_MAP_WORKERS
+
+    def windows(self, text, overlap_tokens=None):
+        overlap_tokens = self.overlap_tokens if overlap_tokens is None else overlap_tokens
+        return TextSplitter.split_into_token_windows(text, self.window_tokens, overlap_tokens)
+
+    def map_partials(self, transcript, language):
         """
-        data = {
-            "model": "gpt-4o-mini",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7,
-        }
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            result = response.json()
-            message_content = result['choices'][0]['message']['content']
-            return message_content
-
-        else:
-            print(f"Request failed with status code {response.status_code}: {response.text}")
+        Returns:
+            list: the summary of every window of the transcript, in order
+        """
+        windows = self.windows(transcript)
+        print(f"map step: summarizing {len(windows)} transcript windows")
+
+        def summarize_window(indexed_window):
+            index, window = indexed_window
+            return _openai_chat(_openai_partial_summary_request(window, language, index, len(windows)))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(carry_deadline(summarize_window), enumerate(windows, start=1)))
+
+    def reduce(self, partials, language, max_words):
+        #? Partials of very long meetings may not fit in one window, collapse them in groups first,
+        #? as long as grouping still reduces their number
+        while len(partials) > 1 and TextSplitter.count_tokens("\n\n".join(partials)) > self.window_tokens:
+            groups = self.windows("\n\n".join(partials), overlap_tokens=0)
+            if len(groups) >= len(partials):
+                break
+            print(f"reduce step: collapsing {len(partials)} partial summaries into {len(groups)}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                partials = list(executor.map(
+                    carry_deadline(lambda group: _openai_chat(
+                        _openai_reduce_request([group], language, _summary_max_words(group))
+                    )),
+                    groups,
+                ))
+        return _openai_chat(_openai_reduce_request(partials, language, max_words))
+
+    def summarize_text(self, transcript, language):
+        print("step04: map reduce summarization - with openai")
+        if TextSplitter.count_tokens(transcript) <= self.window_tokens:
+            return _openai_chat(_openai_summary_request(transcript, language))
+
+        partials = self.map_partials(transcript, language)
+        return self.reduce(partials, language, _summary_max_words(transcript))
+
+
+#? Async variants for the AsyncMasterProcessor
+
+class AsyncSummarizationStrategy(ABC):
+    @abstractmethod
+    async def summarize_text(self, transcript, language="en"):
+        pass
+
+
+class AsyncBasicSummarization(AsyncSummarizationStrategy):
+    api_url = BasicSummarization.api_url
+
+    async def summarize_text(self, transcript, language="en"):
+        print("step04: basic summarization - with deepgram (async)")
+        headers, params, data = _deepgram_summary_request(transcript)
+        try:
+            async with rate_limited_async("deepgram") as limiter, provider_slot("deepgram"):
+                response = await get_async_client(self.api_url).post(self.api_url, headers=headers, params=params, json=data)
+                await asyncio.to_thread(limiter.observe, response)
+            check_response(response, "deepgram")
+            return _parse_deepgram_summary(response.json())
+        except ProviderError as e:
+            if e.retryable:
+                raise
+            return f"Error generating summary: {str(e)}"
+        except httpx.HTTPError as e:
+            return f"Error generating summary: {str(e)}"
+
+
+class AsyncLocalExtractiveSummarization(AsyncSummarizationStrategy):
+    async def summarize_text(self, transcript, language="en"):
+        print("step04: basic summarization - local extractive (async)")
+        #? CPU bound, off the event loop
+        summary = await asyncio.to_thread(extractive_summary, transcript, _summary_max_words(transcript))
+        return summary if summary else "Failed to generate summary"
+
+
+class AsyncAdvancedSummarization(AsyncSummarizationStrategy):
+    async def summarize_text(self, transcript, language):
+        print("step04: advanced summarization - with openai (async)")
+        return await _openai_chat_async(_openai_summary_request(transcript, language))
+
+
+class AsyncMapReduceSummarization(AsyncSummarizationStrategy):
+    """
+    Async counterpart of MapReduceSummarization, the map step runs as one
+    gather bounded by the OpenAI provider semaphore.
+    """
+
+    def __init__(self, window_tokens=None, overlap_tokens=None):
+        self.splitter = MapReduceSummarization(window_tokens, overlap_tokens)
+
+    async def map_partials(self, transcript, language):
+        windows = self.splitter.windows(transcript)
+        print(f"map step: summarizing {len(windows)} transcript windows (async)")
+        return await asyncio.gather(*(
+            _openai_chat_async(_openai_partial_summary_request(window, language, index, len(windows)))
+            for index, window in enumerate(windows, start=1)
+        ))
+
+    async def reduce(self, partials, language, max_words):
+        window_tokens = self.splitter.window_tokens
+        while len(partials) > 1 and TextSplitter.count_tokens("\n\n".join(partials)) > window_tokens:
+            groups = self.splitter.windows("\n\n".join(partials), overlap_tokens=0)
+            if len(groups) >= len(partials):
+                break
+            print(f"reduce step: collapsing {len(partials)} partial summaries into {len(groups)}")
+            partials = await asyncio.gather(*(
+                _openai_chat_async(_openai_reduce_request([group], language, _summary_max_words(group)))
+                for group in groups
+            ))
+        return await _openai_chat_async(_openai_reduce_request(partials, language, max_words))
+
+    async def summarize_text(self, transcript, language):
+        print("step04: map reduce summarization - with openai (async)")
+        if TextSplitter.count_tokens(transcript) <= self.splitter.window_tokens:
+            return await _openai_chat_async(_openai_summary_request(transcript, language))
+
+        partials = await self.map_partials(transcript, language)
+        return await self.reduce(partials, language, _summary_max_words(transcript))
@@ -0,0 +1,78 @@
+import os
+from collections import namedtuple
+from .ffmpeg_utils import ffmpeg_available, run_ffmpeg, probe_duration, detect_silences
+
+#? Splits long recordings into bounded segments at silence boundaries,
+#? so the segments can be transcribed in parallel and stay under provider upload limits.
+
+AudioChunk = namedtuple("AudioChunk", ["index", "start", "end", "path"])
+
+
+def plan_segments(duration, silences, max_chunk_seconds, min_chunk_seconds):
+    """
+    Choose (start, end) ranges no longer than max_chunk_seconds.
+
+    Each cut is placed in the middle of the last silence that fits in the
+    current window. If the window has no usable silence the cut is made at
+    the window edge.
+    """
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    cuts = []
+    start = 0.0
+    while duration - start > max_chunk_seconds:
+        limit = start + max_chunk_seconds
+        candidates = [point for point in midpoints if start + min_chunk_seconds < point <= limit]
+        cut = candidates[-1] if candidates else limit
+        cuts.append(cut)
+        start = cut
+    bounds = [0.0] + cuts + [duration]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def needs_split(file_path, max_chunk_seconds, max_chunk_bytes):
+    duration = probe_duration(file_path)
+    return duration, duration > max_chunk_seconds or os.path.getsize(file_path) > max_chunk_bytes
+
+
+def split_on_silence(file_path, max_chunk_seconds, max_chunk_bytes, min_chunk_seconds=30, min_silence_seconds=0.5):
+    """
+    Plan the segments of an audio file without writing anything yet.
+
+    Returns:
+        list: [AudioChunk, ...] in file order. path is None for segments that
+        still have to be cut with export_chunk, or the original file path when
+        the file is small enough to be sent as is. Without ffmpeg the file is
+        sent as is too, with an unknown end.
+    """
+    if not ffmpeg_available():
+        print("ffmpeg is not installed, transcribing the audio in one piece")
+        return [AudioChunk(0, 0.0, None, file_path)]
+
+    duration, split = needs_split(file_path, max_chunk_seconds, max_chunk_bytes)
+    if not split:
+        return [AudioChunk(0, 0.0, duration, file_path)]
+
+    silences = detect_silences(file_path, min_silence_seconds=min_silence_seconds)
+    segments = plan_segments(duration, silences, max_chunk_seconds, min_chunk_seconds)
+    print(f"Splitting {file_path} ({duration:.0f}s) into {len(segments)} segments")
+    return [AudioChunk(index, start, end, None) for index, (start, end) in enumerate(segments)]
+
+
+def export_chunk(file_path, chunk, out_dir):
+    """
+    Cut one segment into a compact mono mp3 file.
+
+    Returns:
+        str: path of the exported segment
+    """
+    out_path = os.path.join(out_dir, f"chunk_{chunk.index:04d}.mp3")
+    run_ffmpeg([
+        "-y",
+        "-ss", f"{chunk.start:.3f}",
+        "-i", file_path,
+        "-t", f"{chunk.end - chunk.start:.3f}",
+        "-vn", "-ac", "1", "-ar", "16000",
+        "-c:a", "libmp3lame", "-b:a", "48k",
+        out_path,
+    ])
+    return out_path
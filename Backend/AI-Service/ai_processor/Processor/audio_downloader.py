@@ -1,46 +1,126 @@
 import requests
+import httpx
+import aiofiles
 import os
+from contextlib import contextmanager, asynccontextmanager
 from django.conf import settings
 from urllib.parse import urlparse
 import uuid
+from .http_clients import get_session, get_async_client, request_timeout
+from .errors import ProviderError
+
+
+def _storage_path(url, audio_id):
+    # Extract file extension from URL or default to .mp3
+    parsed_url = urlparse(url)
+    path = parsed_url.path
+    extension = os.path.splitext(path)[1] or '.mp3'
+
+    # Create file path in AUDIOS_FOLDER
+    file_name = f"{audio_id}{extension}"
+    file_path = os.path.join(settings.AUDIOS_FOLDER, file_name)
+    return file_path, extension.lstrip('.')
+
+
+def _check_download(url, status_code, reason):
+    """
+    Raise ProviderError for a non-2xx answer of the audio URL, so a 403 / 404
+    goes straight to the dead letter queue while 429 and 5xx are retried.
+    """
+    if not 200 <= status_code < 300:
+        raise ProviderError("download", status_code, f"{reason} for {url}")
+
 
 def download_audio_to_storage(url, audio_id):
     """
     Downloads audio from URL and saves it to the configured AUDIOS_FOLDER
-    
+
     Args:
         url (str): The URL of the audio file
         audio_id (str): Unique identifier for the audio
-        
+
     Returns:
         tuple: (file_path, file_format)
     """
     try:
-        # Extract file extension from URL or default to .mp3
-        parsed_url = urlparse(url)
-        path = parsed_url.path
-        extension = os.path.splitext(path)[1] or '.mp3'
-        
-        # Create file path in AUDIOS_FOLDER
-        file_name = f"{audio_id}{extension}"
-        file_path = os.path.join(settings.AUDIOS_FOLDER, file_name)
-        
+        file_path, file_format = _storage_path(url, audio_id)
+
         # Download the file with streaming to handle large files
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        # Write the file in chunks
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        return file_path, extension.lstrip('.')
-        
+        with get_session(url).get(url, stream=True, timeout=request_timeout()) as response:
+            _check_download(url, response.status_code, response.reason)
+
+            # Write the file in chunks
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if chunk:
+                        f.write(chunk)
+        return file_path, file_format
+
+    except ProviderError:
+        raise
     except requests.exceptions.RequestException as e:
         raise Exception(f"Failed to download audio: {str(e)}")
     except Exception as e:
         raise Exception(f"Error processing audio download: {str(e)}")
-    
+
+
+async def download_audio_to_storage_async(url, audio_id):
+    """
+    Async version of download_audio_to_storage, used by the AsyncMasterProcessor.
+
+    Returns:
+        tuple: (file_path, file_format)
+    """
+    try:
+        file_path, file_format = _storage_path(url, audio_id)
+
+        async with get_async_client(url).stream("GET", url) as response:
+            _check_download(url, response.status_code, response.reason_phrase)
+            async with aiofiles.open(file_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(chunk_size=64 * 1024):
+                    await f.write(chunk)
+        return file_path, file_format
+
+    except ProviderError:
+        raise
+    except httpx.HTTPError as e:
+        raise Exception(f"Failed to download audio: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Error processing audio download: {str(e)}")
+
+
+@contextmanager
+def open_audio_stream(url, chunk_size=64 * 1024):
+    """
+    Open the audio URL without saving it, for strategies that accept a byte stream.
+
+    Yields:
+        tuple: (chunks, content_type) where chunks is an iterator of bytes
+    """
+    try:
+        response = get_session(url).get(url, stream=True, timeout=request_timeout())
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Failed to download audio: {str(e)}")
+    try:
+        _check_download(url, response.status_code, response.reason)
+        chunks = (chunk for chunk in response.iter_content(chunk_size=chunk_size) if chunk)
+        yield chunks, response.headers.get("Content-Type")
+    finally:
+        response.close()
+
+
+@asynccontextmanager
+async def open_audio_stream_async(url, chunk_size=64 * 1024):
+    """
+    Async version of open_audio_stream.
+
+    Yields:
+        tuple: (chunks, content_type) where chunks is an async iterator of bytes
+    """
+    async with get_async_client(url).stream("GET", url) as response:
+        _check_download(url, response.status_code, response.reason_phrase)
+        yield response.aiter_bytes(chunk_size), response.headers.get("Content-Type")
+
 
 
 def cleanup_audio_file(file_path):
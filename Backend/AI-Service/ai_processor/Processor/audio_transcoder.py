@@ -0,0 +1,132 @@
+import os
+import time
+from collections import namedtuple
+from django.conf import settings
+from .ffmpeg_utils import ffmpeg_available, run_ffmpeg, probe_duration, detect_silences
+from .transcode_metrics import record_transcode, record_transcode_failure
+
+#? Pre-upload transcoding of the downloaded audio.
+#?
+#? Clients upload wav or high bitrate m4a, but speech to text only needs 16 kHz
+#? mono. Transcoding to Opus (or lossless FLAC) before the upload cuts the bytes
+#? sent to Deepgram / Whisper several times over, and leading / trailing silence
+#? can be cut on the way. The transcoded file is only used when it is smaller.
+
+TranscodeResult = namedtuple("TranscodeResult", "path input_bytes output_bytes seconds trimmed_seconds")
+
+#? extension and codec arguments per format, ogg/opus and flac are accepted by both providers
+FORMATS = {
+    "opus": (".ogg", lambda: ["-c:a", "libopus", "-b:a", settings.STT_TRANSCODE_BITRATE, "-application", "voip"]),
+    "flac": (".flac", lambda: ["-c:a", "flac", "-sample_fmt", "s16"]),
+}
+
+
+def speech_bounds(file_path, duration, noise_db, min_silence_seconds, margin=0.25):
+    """
+    Start and end of the audio once leading and trailing silences are cut,
+    keeping margin seconds around the speech.
+
+    Returns:
+        tuple: (start_seconds, end_seconds)
+    """
+    silences = detect_silences(file_path, noise_db, min_silence_seconds, until=duration)
+    start, end = 0.0, duration
+    if silences and silences[0][0] <= margin:
+        start = max(0.0, silences[0][1] - margin)
+    if silences and silences[-1][1] >= duration - margin:
+        end = min(duration, silences[-1][0] + margin)
+    if end <= start:
+        #? Silent from start to end, nothing sensible to cut
+        return 0.0, duration
+    return start, end
+
+
+def transcode_args(file_path, out_path, audio_format, start=0.0, length=None):
+    extension, codec_args = FORMATS[audio_format]
+    args = ["-y"]
+    if start > 0:
+        args += ["-ss", f"{start:.3f}"]
+    args += ["-i", file_path]
+    if length is not None:
+        args += ["-t", f"{length:.3f}"]
+    #? bitexact and no metadata: the Ogg muxer would otherwise pick a random stream
+    #? serial, and the same recording must always give the same bytes
+    return args + [
+        "-vn", "-ac", "1", "-ar", "16000", *codec_args(),
+        "-fflags", "+bitexact", "-map_metadata", "-1",
+        out_path,
+    ]
+
+
+def transcode_for_stt(file_path, audio_format=None, trim_silence=None):
+    """
+    Transcode file_path to 16 kHz mono next to it, optionally without leading / trailing silence.
+
+    Returns:
+        TranscodeResult
+    """
+    audio_format = audio_format or settings.STT_TRANSCODE_FORMAT
+    trim_silence = settings.STT_TRIM_SILENCE if trim_silence is None else trim_silence
+    if audio_format not in FORMATS:
+        raise ValueError(f"Unknown transcode format '{audio_format}', expected one of {sorted(FORMATS)}")
+
+    started = time.perf_counter()
+    out_path = f"{os.path.splitext(file_path)[0]}_stt{FORMATS[audio_format][0]}"
+    start, length, trimmed = 0.0, None, 0.0
+    if trim_silence:
+        duration = probe_duration(file_path)
+        start, end = speech_bounds(
+            file_path,
+            duration,
+            settings.STT_TRIM_SILENCE_NOISE_DB,
+            settings.STT_TRIM_SILENCE_MIN_SECONDS,
+        )
+        trimmed = duration - (end - start)
+        if end < duration:
+            length = end - start
+
+    run_ffmpeg(transcode_args(file_path, out_path, audio_format, start, length))
+    return TranscodeResult(
+        out_path,
+        os.path.getsize(file_path),
+        os.path.getsize(out_path),
+        time.perf_counter() - started,
+        trimmed,
+    )
+
+
+def prepare_for_upload(file_path):
+    """
+    Path of the audio to send to speech to text: the transcoded file when
+    transcoding is enabled, possible and smaller, file_path otherwise.
+    Never raises, a failed transcode only means the original is uploaded.
+
+    Returns:
+        tuple: (path to upload, path of the transcoded file to clean up or None)
+    """
+    if not settings.STT_TRANSCODE:
+        return file_path, None
+    if not ffmpeg_available():
+        print("ffmpeg is not installed, uploading the audio as it is")
+        return file_path, None
+
+    try:
+        result = transcode_for_stt(file_path)
+    except Exception as e:
+        print(f"Warning: transcoding {file_path} failed, uploading it as it is: {e}")
+        record_transcode_failure(settings.STT_TRANSCODE_FORMAT)
+        return file_path, None
+
+    saved = result.input_bytes - result.output_bytes
+    print(
+        f"Transcoded audio for STT: {result.input_bytes / 1e6:.2f} MB -> {result.output_bytes / 1e6:.2f} MB "
+        f"({saved / max(result.input_bytes, 1):.0%} saved) in {result.seconds:.2f}s, "
+        f"{result.trimmed_seconds:.1f}s of silence trimmed"
+    )
+    used = saved > 0
+    record_transcode(settings.STT_TRANSCODE_FORMAT, result, used)
+    if not used:
+        print("Transcoded audio is not smaller, uploading the original")
+        os.remove(result.path)
+        return file_path, None
+    return result.path, result.path
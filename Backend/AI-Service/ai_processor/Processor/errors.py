@@ -0,0 +1,62 @@
+import json
+
+#? Errors raised by the processing pipeline and how the consumer should treat them.
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """
+    A provider (Deepgram, OpenAI) answered with a non-success status code.
+    """
+
+    def __init__(self, provider, status_code, body=""):
+        self.provider = provider
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"{provider} request failed with status code {status_code}: {body[:300]}")
+
+    @property
+    def retryable(self):
+        return self.status_code in RETRYABLE_STATUS_CODES
+
+
+class StageTimeout(Exception):
+    """
+    A pipeline stage ran longer than its timeout. Retried like other transient failures.
+    """
+
+    def __init__(self, stage, timeout):
+        self.stage = stage
+        self.timeout = timeout
+        super().__init__(f"Stage {stage} timed out after {timeout} seconds")
+
+
+def check_response(response, provider):
+    """
+    Raise ProviderError for a non-2xx requests / httpx response.
+    """
+    if not 200 <= response.status_code < 300:
+        print(f"Request failed with status code {response.status_code}: {response.text}")
+        raise ProviderError(provider, response.status_code, response.text)
+    return response
+
+
+def is_retryable(error):
+    """
+    Whether a failed task is worth another attempt later.
+
+    Malformed messages and missing documents will never succeed, provider
+    4xx answers other than throttling neither. Everything else (throttling,
+    5xx, network errors, unexpected failures) is retried with backoff.
+    """
+    from django.core.exceptions import ObjectDoesNotExist
+
+    if isinstance(error, (json.JSONDecodeError, ObjectDoesNotExist)):
+        return False
+    if isinstance(error, ProviderError):
+        return error.retryable
+    status_code = getattr(error, "status_code", None)  # openai.APIStatusError
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES
+    return True
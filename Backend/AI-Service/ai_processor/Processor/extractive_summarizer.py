@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from django.conf import settings
+
+#? Extractive summaries computed on the worker CPU, for the basic plan.
+#?
+#? The sentences of the transcript are embedded by a small sentence-transformers
+#? model, in batches, and clustered with k-means. The sentence closest to each
+#? centroid is kept, in transcript order. The model is loaded once per process
+#? (again after a fork, torch threads don't survive one) and kept warm, the
+#? workers can load it at start up so the first task doesn't pay for it.
+#? torch, transformers and scikit-learn are only imported when it is used.
+
+SENTENCE_END = re.compile(r'(?<=[.!?؟])\s+')
+
+_lock = threading.Lock()
+_encoder = None
+_encoder_pid = None
+
+
+def split_sentences(text, min_words=3):
+    """
+    Sentences of the transcript, fragments shorter than min_words are joined to the next one.
+    """
+    sentences = []
+    pending = ""
+    for part in SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {part}".strip() if pending else part.strip()
+        if len(pending.split()) >= min_words:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+class SentenceEncoder:
+    """
+    Mean pooled, normalized sentence embeddings of a transformers model.
+    """
+
+    def __init__(self, model_name, threads, batch_size, max_length=256):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name).eval()
+        #? One inference at a time, torch already spreads each one over `threads` cores
+        self._lock = threading.Lock()
+
+    def encode(self, sentences):
+        """
+        Returns:
+            numpy.ndarray: one row per sentence, in the order of sentences
+        """
+        torch = self.torch
+        #? Batches of similar lengths need less padding
+        order = sorted(range(len(sentences)), key=lambda index: len(sentences[index]))
+        vectors = [None] * len(sentences)
+        with self._lock, torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                inputs = self.tokenizer(
+                    [sentences[index] for index in batch],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors="pt",
+                )
+                hidden = self.model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, dim=1)
+                for index, vector in zip(batch, pooled):
+                    vectors[index] = vector
+        return torch.stack(vectors).numpy()
+
+
+def get_sentence_encoder():
+    global _encoder, _encoder_pid
+    pid = os.getpid()
+    if _encoder is None or _encoder_pid != pid:
+        with _lock:
+            if _encoder is None or _encoder_pid != pid:
+                print(f"Loading local summarization model {settings.LOCAL_SUMMARY_MODEL}")
+                _encoder = SentenceEncoder(
+                    settings.LOCAL_SUMMARY_MODEL,
+                    settings.LOCAL_SUMMARY_THREADS,
+                    settings.LOCAL_SUMMARY_BATCH_SIZE,
+                )
+                _encoder_pid = pid
+    return _encoder
+
+
+def summary_sentence_count(sentences, max_words):
+    """
+    How many sentences of average length fit in max_words, at least one.
+    None when all the sentences already fit.
+    """
+    total_words = sum(len(sentence.split()) for sentence in sentences)
+    if total_words <= max_words:
+        return None
+    average_words = total_words / len(sentences)
+    return max(1, min(len(sentences), round(max_words / average_words)))
+
+
+def extractive_summary(text, max_words):
+    """
+    Sentences of text that best cover its content, about max_words long.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+    count = summary_sentence_count(sentences, max_words)
+    if count is None:
+        return " ".join(sentences)
+
+    embeddings = get_sentence_encoder().encode(sentences)
+
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=count, n_init=3, random_state=0).fit(embeddings)
+    distances = kmeans.transform(embeddings)
+    chosen = set()
+    for cluster in range(count):
+        members = [index for index, label in enumerate(kmeans.labels_) if label == cluster]
+        if members:
+            chosen.add(min(members, key=lambda index: distances[index, cluster]))
+    return " ".join(sentences[index] for index in sorted(chosen))
+
+
+def warm_up():
+    """
+    Load the model in this process when the basic plan is summarized locally.
+    Never raises, a failure here only means the first task loads it.
+    """
+    if settings.BASIC_SUMMARY_ENGINE != "local" or not settings.LOCAL_SUMMARY_WARM_UP:
+        return
+    try:
+        get_sentence_encoder().encode(["Warm up sentence for the local summarizer."])
+    except Exception as e:
+        print(f"Warning: failed to load the local summarization model: {e}")
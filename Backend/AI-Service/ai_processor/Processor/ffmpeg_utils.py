@@ -0,0 +1,77 @@
+import re
+import shutil
+import subprocess
+
+#? Thin wrappers around the ffmpeg / ffprobe binaries.
+#? Everything streams through ffmpeg, so long meetings are never decoded into memory.
+
+_SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def run_ffmpeg(args):
+    """
+    Run ffmpeg with the given arguments and return its stderr (where ffmpeg logs).
+
+    Raises:
+        Exception: if ffmpeg exits with a non-zero status
+    """
+    process = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise Exception(f"ffmpeg failed ({process.returncode}): {process.stderr[-500:]}")
+    return process.stderr
+
+
+def probe_duration(file_path):
+    """
+    Returns:
+        float: duration of the audio file in seconds
+    """
+    process = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", file_path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise Exception(f"ffprobe failed ({process.returncode}): {process.stderr[-500:]}")
+    return float(process.stdout.strip())
+
+
+def detect_silences(file_path, noise_db=-30, min_silence_seconds=0.5, until=None):
+    """
+    Find silent ranges with ffmpeg's silencedetect filter.
+    A silence still running at the end of the file is only returned when until
+    (the duration) is given, it then ends there.
+
+    Returns:
+        list: [(start_seconds, end_seconds), ...] in file order
+    """
+    log = run_ffmpeg([
+        "-nostats", "-i", file_path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+        "-f", "null", "-",
+    ])
+    silences = []
+    start = None
+    for line in log.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(float(match.group(1)), 0.0)
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None and until is not None and until > start:
+        silences.append((start, until))
+    return silences
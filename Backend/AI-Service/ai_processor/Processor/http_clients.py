@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from django.conf import settings
+
+#? Process wide HTTP clients of the provider strategies and the audio downloads.
+#?
+#? One pooled client per host keeps the TCP / TLS connections alive between
+#? calls and between messages, instead of paying DNS + handshake on every
+#? request. Like the pymongo client, the sync clients are rebuilt after a fork.
+#? httpx async clients belong to the loop they were created on, so they are
+#? kept per event loop.
+
+_lock = threading.Lock()
+_pid = None
+_sessions = {}
+_openai_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_async_openai_clients = weakref.WeakKeyDictionary()
+#? time.monotonic() by which the pipeline stage running in this context has to finish, see deadline_scope
+_deadline = contextvars.ContextVar("stage_deadline", default=None)
+
+
+def http2_available():
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401, installed with httpx[http2]
+    except ImportError:
+        return False
+    return True
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Bound the requests made in this block by deadline (a time.monotonic() value,
+    None for no bound), so a timed out pipeline stage stops on its own instead
+    of running on next to the retry.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def carry_deadline(fn):
+    """
+    fn running under the deadline of the caller, for work handed to a thread pool.
+    """
+    deadline = _deadline.get()
+
+    def run(*args, **kwargs):
+        with deadline_scope(deadline):
+            return fn(*args, **kwargs)
+    return run
+
+
+def remaining_seconds():
+    """
+    Seconds left before the deadline of the current stage, None without one.
+    Raises TimeoutError once it has passed, so no new request is started.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("The stage deadline has passed")
+    return remaining
+
+
+def request_timeout():
+    """
+    (connect, read) timeout for requests calls, read covers long uploads and
+    transcriptions. Both are cut to what is left of the stage deadline.
+    """
+    read = settings.HTTP_READ_TIMEOUT
+    remaining = remaining_seconds()
+    if remaining is not None:
+        read = min(read, remaining)
+    return (min(settings.HTTP_CONNECT_TIMEOUT, read), read)
+
+
+def openai_timeout():
+    """
+    request_timeout for the calls of the sync OpenAI client.
+    """
+    connect, read = request_timeout()
+    return httpx.Timeout(read, connect=connect)
+
+
+def _httpx_timeout():
+    return httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+
+def _httpx_limits():
+    return httpx.Limits(
+        max_connections=settings.HTTP_POOL_MAXSIZE,
+        max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def _host(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _reset_after_fork():
+    global _pid, _openai_client
+    pid = os.getpid()
+    if _pid != pid:
+        _sessions.clear()
+        _openai_client = None
+        _pid = pid
+
+
+def get_session(url):
+    """
+    Keep-alive requests.Session for the host of url.
+    """
+    host = _host(url)
+    with _lock:
+        _reset_after_fork()
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def get_async_client(url):
+    """
+    Keep-alive httpx.AsyncClient for the host of url on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    host = _host(url)
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=http2_available(),
+            limits=_httpx_limits(),
+            timeout=_httpx_timeout(),
+            follow_redirects=True,
+        )
+        clients[host] = client
+    return client
+
+
+def get_openai_client():
+    global _openai_client
+    from openai import OpenAI
+
+    with _lock:
+        _reset_after_fork()
+        if _openai_client is None:
+            _openai_client = OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=httpx.Client(http2=http2_available(), limits=_httpx_limits(), timeout=_httpx_timeout()),
+            )
+        return _openai_client
+
+
+def get_async_openai_client():
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    client = _async_openai_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=httpx.AsyncClient(http2=http2_available(), limits=_httpx_limits(), timeout=_httpx_timeout()),
+        )
+        _async_openai_clients[loop] = client
+    return client
+
+
+async def close_async_clients():
+    """
+    Close the async clients of the running loop, called when the async consumer stops.
+    """
+    loop = asyncio.get_running_loop()
+    for client in (_async_clients.pop(loop, None) or {}).values():
+        await client.aclose()
+    openai_client = _async_openai_clients.pop(loop, None)
+    if openai_client is not None:
+        await openai_client.close()
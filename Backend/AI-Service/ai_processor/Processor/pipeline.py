@@ -0,0 +1,244 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .errors import StageTimeout
+from .http_clients import deadline_scope
+
+#? Stage graph of the audio pipeline.
+#?
+#? Every stage names the stages whose outputs it needs. The schedulers start a
+#? stage as soon as its inputs exist, so stages that do not depend on each
+#? other run at the same time. A stage over its timeout fails the run, its
+#? requests are cut to the stage deadline so it stops soon after. Stages that store their output declare the
+#? AudioProcessing field and the status reached once it is stored.
+#? Stage durations are printed and handed to the stage observers, which is
+#? how benchmarks/pipeline_throughput.py collects its stage latencies.
+
+_stage_observers = []
+
+
+class Stage:
+    """
+    One node of the pipeline.
+
+    Args:
+        name: Name of the stage, also the name of its output
+        run: Callable (or coroutine function for the async scheduler) taking the outputs of inputs, in order
+        inputs: Names of the stages this one needs
+        field: AudioProcessing field the output is stored in, None to only return it
+        status: processing_status once this stage and every status stage before it are stored
+        timeout: Seconds the stage may run, None for no limit
+        is_stored: Optional check of a stored field value, e.g. to ignore stored error messages
+        extra_fields: Optional callable returning more AudioProcessing fields to store with an output
+    """
+
+    def __init__(self, name, run=None, inputs=(), field=None, status=None, timeout=None, is_stored=None,
+                 extra_fields=None):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.field = field
+        self.status = status
+        self.timeout = timeout
+        self.is_stored = is_stored
+        self.extra_fields = extra_fields
+
+    def bind(self, run, timeout=None):
+        """
+        Copy of this stage declaration with its implementation attached.
+        """
+        return Stage(
+            self.name, run, self.inputs, self.field, self.status, timeout or self.timeout, self.is_stored, self.extra_fields
+        )
+
+    def stored_fields(self, value):
+        """
+        AudioProcessing fields to write for an output of this stage.
+        """
+        fields = {self.field: value}
+        if self.extra_fields:
+            fields.update(self.extra_fields(value))
+        return fields
+
+    def stored_output(self, audio_task):
+        if not self.field:
+            return None
+        value = getattr(audio_task, self.field, None)
+        if not value:
+            return None
+        if self.is_stored and not self.is_stored(value):
+            return None
+        return value
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs!r})"
+
+
+def stored_outputs(stages, audio_task):
+    """
+    Outputs already stored on the task by an earlier attempt, keyed by stage name.
+    """
+    outputs = {}
+    for stage in stages:
+        value = stage.stored_output(audio_task)
+        if value is not None:
+            outputs[stage.name] = value
+    return outputs
+
+
+def graph_status(stages, done, default='ON_QUEUE'):
+    """
+    Status of the last stage, in declaration order, up to which every status stage is done.
+    """
+    status = default
+    for stage in stages:
+        if not stage.status:
+            continue
+        if stage.name not in done:
+            break
+        status = stage.status
+    return status
+
+
+def add_stage_observer(callback):
+    """
+    Call callback(stage_name, seconds, ok) after each stage run by a scheduler of this process.
+    """
+    _stage_observers.append(callback)
+
+
+def _stage_finished(stage, seconds, ok):
+    print(f"Stage {stage.name} {'completed' if ok else 'failed'} in {seconds:.2f}s")
+    for callback in _stage_observers:
+        try:
+            callback(stage.name, seconds, ok)
+        except Exception as e:
+            print(f"Warning: stage observer failed: {e}")
+
+
+def validate_stages(stages):
+    names = set()
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"Duplicate pipeline stage {stage.name}")
+        names.add(stage.name)
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in names]
+        if missing:
+            raise ValueError(f"Stage {stage.name} needs unknown stages {missing}")
+
+
+def _run_until(deadline, run, args):
+    #? Requests of the stage time out by the deadline, the thread does not outlive the stage by long
+    with deadline_scope(deadline):
+        return run(*args)
+
+
+def _ready(pending, outputs):
+    return [stage for stage in pending.values() if all(name in outputs for name in stage.inputs)]
+
+
+class StageScheduler:
+    """
+    Runs the stages of a graph on a thread pool.
+
+    on_stage_done(stage, value, outputs) is called on the calling thread after
+    each stage, so stages themselves never write to the database.
+    """
+
+    def __init__(self, stages, on_stage_done, max_workers=4):
+        validate_stages(stages)
+        self.stages = stages
+        self.on_stage_done = on_stage_done
+        self.max_workers = max_workers
+
+    def run(self, outputs):
+        pending = {stage.name: stage for stage in self.stages if stage.name not in outputs}
+        running = {}
+        deadlines = {}
+        started = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        try:
+            while pending or running:
+                for stage in _ready(pending, outputs):
+                    del pending[stage.name]
+                    print(f"Starting stage {stage.name}")
+                    deadline = time.monotonic() + stage.timeout if stage.timeout else None
+                    future = executor.submit(_run_until, deadline, stage.run, [outputs[name] for name in stage.inputs])
+                    running[future] = stage
+                    started[future] = time.perf_counter()
+                    if deadline is not None:
+                        deadlines[future] = deadline
+                if not running:
+                    raise RuntimeError(f"Stages {sorted(pending)} can never get their inputs")
+
+                timeout = None
+                if deadlines:
+                    timeout = max(0, min(deadlines.values()) - time.monotonic())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    expired = min(deadlines, key=deadlines.get)
+                    stage = running[expired]
+                    raise StageTimeout(stage.name, stage.timeout)
+
+                for future in done:
+                    stage = running.pop(future)
+                    deadlines.pop(future, None)
+                    _stage_finished(stage, time.perf_counter() - started.pop(future), future.exception() is None)
+                    outputs[stage.name] = future.result()
+                    self.on_stage_done(stage, outputs[stage.name], outputs)
+            return outputs
+        finally:
+            #? Stages still running (a timed out one, or siblings of a failed one) are waited
+            #? for, so the retry of the task never runs next to them. Their requests are
+            #? bounded by the stage deadline, they stop soon after it.
+            if running:
+                print(f"Waiting for stages {sorted(stage.name for stage in running.values())} to stop")
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+class AsyncStageScheduler:
+    """
+    StageScheduler for coroutine stages, every stage is a task on the running loop.
+    on_stage_done is awaited.
+    """
+
+    def __init__(self, stages, on_stage_done):
+        validate_stages(stages)
+        self.stages = stages
+        self.on_stage_done = on_stage_done
+
+    async def _run_stage(self, stage, args):
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await asyncio.wait_for(stage.run(*args), timeout=stage.timeout)
+            ok = True
+            return result
+        except asyncio.TimeoutError:
+            raise StageTimeout(stage.name, stage.timeout)
+        finally:
+            _stage_finished(stage, time.perf_counter() - started, ok)
+
+    async def run(self, outputs):
+        pending = {stage.name: stage for stage in self.stages if stage.name not in outputs}
+        running = {}
+        try:
+            while pending or running:
+                for stage in _ready(pending, outputs):
+                    del pending[stage.name]
+                    print(f"Starting stage {stage.name}")
+                    task = asyncio.ensure_future(self._run_stage(stage, [outputs[name] for name in stage.inputs]))
+                    running[task] = stage
+                if not running:
+                    raise RuntimeError(f"Stages {sorted(pending)} can never get their inputs")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    outputs[stage.name] = task.result()
+                    await self.on_stage_done(stage, outputs[stage.name], outputs)
+            return outputs
+        finally:
+            for task in running:
+                task.cancel()
@@ -0,0 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
+from django.conf import settings
+
+#? Per-provider concurrency limits for the async pipeline.
+#? One event loop can hold hundreds of meetings, but each provider only sees
+#? as many in-flight requests as its semaphore allows.
+
+_semaphores = {}
+
+
+def get_provider_semaphore(provider):
+    semaphore = _semaphores.get(provider)
+    if semaphore is None:
+        limit = settings.ASYNC_PROVIDER_CONCURRENCY.get(provider, settings.ASYNC_DEFAULT_PROVIDER_CONCURRENCY)
+        semaphore = asyncio.Semaphore(limit)
+        _semaphores[provider] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def provider_slot(provider):
+    """
+    Wait for a free request slot on the given provider ("deepgram", "openai", ...).
+    """
+    async with get_provider_semaphore(provider):
+        yield
@@ -0,0 +1,335 @@
+import re
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from django.conf import settings
+
+#? Token bucket rate limiting of the provider APIs, shared by every strategy.
+#?
+#? Each limiter key ("openai", "openai-whisper", "deepgram") has a requests per
+#? minute bucket and optionally a tokens per minute bucket. Buckets live in a
+#? store: "local" keeps them in the process, "mongo" keeps them in one document
+#? per key so every consumer process and host draws from the same budget.
+#? Rate limit headers of the answers (and 429s) clamp the buckets, so the
+#? limiter follows what the provider reports instead of only its own count.
+
+MAX_SLEEP_SECONDS = 5
+#? Rough size of a token, used wherever the exact tokenizer is not worth it or not available
+CHARS_PER_TOKEN = 4
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """
+    Parse the reset headers of OpenAI ("20ms", "1s", "6m0s") or a plain number of seconds.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(text, completion_tokens=512):
+    """
+    Rough token count of a chat request (about 4 characters per token) plus
+    room for the answer. The difference is settled once the usage is known.
+    """
+    return len(text) // CHARS_PER_TOKEN + completion_tokens
+
+
+def usage_tokens(result):
+    """
+    Tokens used by an OpenAI chat completion payload, None when not reported.
+    """
+    return (result.get("usage") or {}).get("total_tokens")
+
+
+def _take(state, limits, cost, now):
+    """
+    Refill the buckets in state for the time elapsed, then take cost from them.
+
+    Returns:
+        float: 0 when cost was taken, otherwise seconds to wait before trying again
+    """
+    levels = state["levels"]
+    elapsed = max(0.0, now - state["updated"])
+    for name, per_minute in limits.items():
+        level = levels.get(name, per_minute)
+        levels[name] = min(per_minute, level + elapsed * per_minute / 60)
+    state["updated"] = now
+
+    if state["paused_until"] > now:
+        return state["paused_until"] - now
+
+    wait = 0.0
+    for name, per_minute in limits.items():
+        #? A single request bigger than the whole bucket would never fit, it only waits for a full bucket
+        missing = min(cost.get(name, 0), per_minute) - levels[name]
+        if missing > 0:
+            wait = max(wait, missing * 60 / per_minute)
+    if wait:
+        return wait
+
+    for name, per_minute in limits.items():
+        levels[name] -= min(cost.get(name, 0), per_minute)
+    return 0.0
+
+
+def _new_state(now):
+    return {"levels": {}, "updated": now, "paused_until": 0.0}
+
+
+class LocalBucketStore:
+    """
+    Buckets of this process only.
+    """
+
+    blocking_io = False
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, limits, cost, now):
+        with self._lock:
+            state = self._states.setdefault(key, _new_state(now))
+            return _take(state, limits, cost, now)
+
+    def adjust(self, key, deltas):
+        with self._lock:
+            levels = self._states.setdefault(key, _new_state(time.time()))["levels"]
+            for name, delta in deltas.items():
+                if name in levels:
+                    levels[name] += delta
+
+    def clamp(self, key, remaining, paused_until):
+        with self._lock:
+            state = self._states.setdefault(key, _new_state(time.time()))
+            for name, value in remaining.items():
+                if name in state["levels"]:
+                    state["levels"][name] = min(state["levels"][name], value)
+            state["paused_until"] = max(state["paused_until"], paused_until)
+
+
+class MongoBucketStore:
+    """
+    Buckets in a MongoDB collection, one document per limiter key.
+
+    take() is an optimistic read-modify-write guarded by a version field,
+    adjust() and clamp() are single atomic $inc / $min / $max updates.
+    Wall clock time is used so that several hosts agree on the refill.
+    """
+
+    blocking_io = True
+    MAX_CONFLICTS = 10
+
+    def __init__(self, collection_name):
+        from ai_processor.mongo import get_database
+        self.collection = get_database()[collection_name]
+
+    def take(self, key, limits, cost, now):
+        from pymongo.errors import DuplicateKeyError
+
+        for _ in range(self.MAX_CONFLICTS):
+            document = self.collection.find_one({"_id": key})
+            if document is None:
+                try:
+                    self.collection.insert_one({"_id": key, "version": 0, **_new_state(now)})
+                except DuplicateKeyError:
+                    pass
+                continue
+
+            state = {
+                "levels": dict(document.get("levels", {})),
+                "updated": document.get("updated", now),
+                "paused_until": document.get("paused_until", 0.0),
+            }
+            wait = _take(state, limits, cost, now)
+            result = self.collection.update_one(
+                {"_id": key, "version": document["version"]},
+                {"$set": {"levels": state["levels"], "updated": state["updated"]}, "$inc": {"version": 1}},
+            )
+            if result.modified_count:
+                return wait
+        #? Heavy contention, back off a little and let the caller try again
+        return 0.05
+
+    def adjust(self, key, deltas):
+        increments = {f"levels.{name}": delta for name, delta in deltas.items()}
+        if increments:
+            self.collection.update_one({"_id": key}, {"$inc": increments})
+
+    def clamp(self, key, remaining, paused_until):
+        update = {"$max": {"paused_until": paused_until}}
+        if remaining:
+            update["$min"] = {f"levels.{name}": value for name, value in remaining.items()}
+        self.collection.update_one({"_id": key}, update)
+
+
+class ProviderRateLimiter:
+    """
+    Requests per minute / tokens per minute limiter of one provider key.
+    A limit of 0 means unlimited.
+    """
+
+    def __init__(self, key, store, rpm=0, tpm=0):
+        self.key = key
+        self.store = store
+        #? The configured budget, the limits in use can only be lowered below it by the headers
+        self.configured_rpm = rpm
+        self.configured_tpm = tpm
+        self.rpm = rpm
+        self.tpm = tpm
+
+    def limits(self):
+        limits = {}
+        if self.rpm:
+            limits["requests"] = self.rpm
+        if self.tpm:
+            limits["tokens"] = self.tpm
+        return limits
+
+    def acquire(self, tokens=0):
+        cost = {"requests": 1, "tokens": tokens}
+        while True:
+            wait = self.store.take(self.key, self.limits(), cost, time.time())
+            if not wait:
+                return
+            time.sleep(min(wait, MAX_SLEEP_SECONDS))
+
+    async def acquire_async(self, tokens=0):
+        cost = {"requests": 1, "tokens": tokens}
+        while True:
+            if self.store.blocking_io:
+                wait = await asyncio.to_thread(self.store.take, self.key, self.limits(), cost, time.time())
+            else:
+                wait = self.store.take(self.key, self.limits(), cost, time.time())
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, MAX_SLEEP_SECONDS))
+
+    def settle(self, estimated_tokens, used_tokens):
+        """
+        Correct the tokens bucket once the real usage of a request is known.
+        """
+        if self.tpm and used_tokens is not None and used_tokens != estimated_tokens:
+            self.store.adjust(self.key, {"tokens": estimated_tokens - used_tokens})
+
+    def observe(self, response):
+        """
+        Adjust to the rate limit headers of a requests / httpx response.
+
+        x-ratelimit-limit-* lowers the limit when the provider allows less than
+        the configured budget (a deliberately lower budget is kept),
+        x-ratelimit-remaining-* caps the bucket, and a 429 pauses the key
+        until Retry-After (or the reported reset) has passed.
+        """
+        headers = getattr(response, "headers", None) or {}
+
+        limit_requests = _header_number(headers, "x-ratelimit-limit-requests")
+        if limit_requests and self.configured_rpm:
+            self.rpm = min(self.configured_rpm, limit_requests)
+        limit_tokens = _header_number(headers, "x-ratelimit-limit-tokens")
+        if limit_tokens and self.configured_tpm:
+            self.tpm = min(self.configured_tpm, limit_tokens)
+
+        remaining = {}
+        remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests")
+        if remaining_requests is not None and self.rpm:
+            remaining["requests"] = remaining_requests
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None and self.tpm:
+            remaining["tokens"] = remaining_tokens
+
+        paused_until = 0.0
+        if getattr(response, "status_code", None) == 429:
+            pause = (
+                parse_duration(headers.get("retry-after"))
+                or parse_duration(headers.get("x-ratelimit-reset-requests"))
+                or 1.0
+            )
+            paused_until = time.time() + pause
+            print(f"{self.key} rate limited, pausing for {pause:.1f}s")
+
+        if remaining or paused_until:
+            self.store.clamp(self.key, remaining, paused_until)
+
+    def _observe_error(self, error):
+        #? openai / httpx errors carry the failed response
+        response = getattr(error, "response", None)
+        if response is not None:
+            self.observe(response)
+
+
+_store = None
+_limiters = {}
+_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if settings.RATE_LIMIT_BACKEND == "mongo":
+                    _store = MongoBucketStore(settings.RATE_LIMIT_COLLECTION)
+                else:
+                    _store = LocalBucketStore()
+    return _store
+
+
+def get_rate_limiter(key):
+    limiter = _limiters.get(key)
+    if limiter is None:
+        store = get_bucket_store()
+        with _lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limits = settings.PROVIDER_RATE_LIMITS.get(key, {})
+                limiter = ProviderRateLimiter(key, store, limits.get("rpm", 0), limits.get("tpm", 0))
+                _limiters[key] = limiter
+    return limiter
+
+
+@contextmanager
+def rate_limited(key, tokens=0):
+    """
+    Wait for room in the buckets of key, then run the request.
+    Failed requests that carry a response (e.g. openai.RateLimitError) are observed too.
+    """
+    limiter = get_rate_limiter(key)
+    limiter.acquire(tokens)
+    try:
+        yield limiter
+    except Exception as e:
+        limiter._observe_error(e)
+        raise
+
+
+@asynccontextmanager
+async def rate_limited_async(key, tokens=0):
+    limiter = get_rate_limiter(key)
+    await limiter.acquire_async(tokens)
+    try:
+        yield limiter
+    except Exception as e:
+        #? observe() may write to the bucket store, keep it off the event loop like settle()
+        await asyncio.to_thread(limiter._observe_error, e)
+        raise
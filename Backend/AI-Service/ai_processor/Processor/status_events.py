@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+
+#? Status events sent on every stage transition, they feed the webhooks and
+#? the SSE / long-poll status endpoints so that clients don't have to poll.
+
+FINAL_STATUSES = ('COMPLETED', 'FAILED')
+
+
+def build_status_event(audio_task, retry_scheduled=False):
+    status = audio_task.processing_status
+    return {
+        "audio_id": str(audio_task.audio_token),
+        "status": status,
+        "done": status == 'COMPLETED',
+        "final": status in FINAL_STATUSES,
+        "retry_scheduled": retry_scheduled,
+        "timestamp": timezone.now().isoformat(),
+    }
+
+
+class StatusCache:
+    """
+    Last known status per audio task and when it was learned, so that status
+    reads of the web processes don't need the database while it is fresh.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, audio_id, max_age):
+        with self._lock:
+            entry = self._entries.get(audio_id)
+        if entry and time.monotonic() - entry[1] <= max_age:
+            return entry[0]
+        return None
+
+    def set(self, audio_id, status):
+        with self._lock:
+            self._entries[audio_id] = (status, time.monotonic())
+            self._entries.move_to_end(audio_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_status_cache = None
+_status_cache_lock = threading.Lock()
+
+
+def get_status_cache():
+    global _status_cache
+    if _status_cache is None:
+        with _status_cache_lock:
+            if _status_cache is None:
+                _status_cache = StatusCache(settings.STATUS_BROKER_MAX_ENTRIES)
+    return _status_cache
+
+
+def notify_status(audio_task, retry_scheduled=False):
+    """
+    Publish the current status of audio_task. Never raises, a lost event only
+    means subscribers fall back to reading the status.
+    """
+    if not settings.STATUS_EVENTS_ENABLED:
+        return
+    from ..Queue.Producer import get_producer
+
+    try:
+        get_producer().publish_status_event(
+            build_status_event(audio_task, retry_scheduled),
+            getattr(audio_task, "callback_url", None),
+        )
+    except Exception as e:
+        print(f"Warning: failed to publish status event of {audio_task.audio_token}: {e}")
@@ -0,0 +1,67 @@
+import importlib
+
+#? Name keyed registry of the processing strategies.
+#?
+#? Strategies are referenced by dotted path and their module is only imported
+#? the first time a task selects them, so the web processes and the consumers
+#? don't load provider SDKs, pydantic models or torch for plans they never run.
+#? `python benchmarks/import_time.py` checks the cold start stays that way.
+
+STRATEGIES = {
+    # Speech to text
+    "stt.english": "ai_processor.Processor.Speech_to_text_component.EnglishSpeechToText",
+    "stt.arabic": "ai_processor.Processor.Speech_to_text_component.ArabicSpeechToText",
+    "stt.chunked": "ai_processor.Processor.Speech_to_text_component.ChunkedSpeechToText",
+    "stt.cached": "ai_processor.Processor.Speech_to_text_component.CachedSpeechToText",
+    "async.stt.english": "ai_processor.Processor.Speech_to_text_component.AsyncEnglishSpeechToText",
+    "async.stt.arabic": "ai_processor.Processor.Speech_to_text_component.AsyncArabicSpeechToText",
+    "async.stt.chunked": "ai_processor.Processor.Speech_to_text_component.AsyncChunkedSpeechToText",
+    "async.stt.cached": "ai_processor.Processor.Speech_to_text_component.AsyncCachedSpeechToText",
+    # Summarization
+    "summary.basic": "ai_processor.Processor.Summarization_component.BasicSummarization",
+    "summary.local": "ai_processor.Processor.Summarization_component.LocalExtractiveSummarization",
+    "summary.advanced": "ai_processor.Processor.Summarization_component.AdvancedSummarization",
+    "summary.map_reduce": "ai_processor.Processor.Summarization_component.MapReduceSummarization",
+    "async.summary.basic": "ai_processor.Processor.Summarization_component.AsyncBasicSummarization",
+    "async.summary.local": "ai_processor.Processor.Summarization_component.AsyncLocalExtractiveSummarization",
+    "async.summary.advanced": "ai_processor.Processor.Summarization_component.AsyncAdvancedSummarization",
+    "async.summary.map_reduce": "ai_processor.Processor.Summarization_component.AsyncMapReduceSummarization",
+    # Key points
+    "key_points.advanced": "ai_processor.Processor.Key_points_Component.AdvancedKeyPoints",
+    "async.key_points.advanced": "ai_processor.Processor.Key_points_Component.AsyncAdvancedKeyPoints",
+    # Summary and key points from one call
+    "digest.structured": "ai_processor.Processor.Digest_component.StructuredDigest",
+    "async.digest.structured": "ai_processor.Processor.Digest_component.AsyncStructuredDigest",
+}
+
+_classes = {}
+
+
+def register_strategy(name, path):
+    """
+    Add or replace a strategy, path is "package.module.ClassName".
+    """
+    STRATEGIES[name] = path
+    _classes.pop(name, None)
+
+
+def strategy_class(name):
+    """
+    Class of a registered strategy, importing its module on first use.
+    Raises ValueError for an unknown name.
+    """
+    strategy = _classes.get(name)
+    if strategy is None:
+        try:
+            path = STRATEGIES[name]
+        except KeyError:
+            raise ValueError(f"Unknown strategy '{name}', registered: {sorted(STRATEGIES)}")
+        module_name, class_name = path.rsplit(".", 1)
+        #? import_module holds the import lock, concurrent first uses are safe
+        strategy = getattr(importlib.import_module(module_name), class_name)
+        _classes[name] = strategy
+    return strategy
+
+
+def create_strategy(name, *args):
+    return strategy_class(name)(*args)
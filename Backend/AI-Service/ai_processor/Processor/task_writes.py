@@ -0,0 +1,43 @@
+from django.utils import timezone
+from .. import repository
+
+#? Partial writes of the audio task document.
+#?
+#? audio_task.save() rewrites every field of the document, the already stored
+#? transcript included. The pipeline instead collects the fields that changed
+#? and writes only those with a single $set through the repository. Changes
+#? of back to back transitions (the last stage and COMPLETED, a pending stage
+#? output and FAILED) are written together.
+
+
+class TaskWriter:
+    """
+    Changed fields of one audio task, waiting to be written in one update.
+    """
+
+    def __init__(self, audio_task):
+        self.audio_task = audio_task
+        self.pending = {}
+
+    def set(self, **fields):
+        """
+        Change fields on the in memory task, they are written on the next flush.
+        """
+        for name, value in fields.items():
+            setattr(self.audio_task, name, value)
+        self.pending.update(fields)
+
+    def flush(self):
+        """
+        Write the pending fields, if any.
+
+        Returns:
+            bool: whether an update was sent
+        """
+        if not self.pending:
+            return False
+        fields, self.pending = self.pending, {}
+        fields["updated_at"] = timezone.now()
+        repository.update_task(self.audio_task.audio_token, **fields)
+        self.audio_task.updated_at = fields["updated_at"]
+        return True
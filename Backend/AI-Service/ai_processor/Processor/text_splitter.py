@@ -1,4 +1,38 @@
 import re
+from .rate_limiter import CHARS_PER_TOKEN
+
+#? Tokenizer of gpt-4o-mini, loaded on first use
+_encoding = None
+
+
+class CharacterEncoding:
+    """
+    Stand-in for the tiktoken encoding when it cannot be loaded: tiktoken
+    downloads it on first use, which fails on hosts without internet access.
+    A "token" is CHARS_PER_TOKEN characters, the estimate rate_limiter uses.
+    """
+
+    @staticmethod
+    def encode(text):
+        return [text[start:start + CHARS_PER_TOKEN] for start in range(0, len(text), CHARS_PER_TOKEN)]
+
+    @staticmethod
+    def decode(tokens):
+        return "".join(tokens)
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+        except Exception as e:
+            #? Kept for the life of the process, so the download is not retried for every text
+            print(f"Warning: tiktoken encoding unavailable, estimating {CHARS_PER_TOKEN} characters per token: {e}")
+            _encoding = CharacterEncoding()
+    return _encoding
+
 
 class TextSplitter:
     @staticmethod
@@ -15,4 +49,28 @@ class TextSplitter:
         sentences = text.split('//')
         print(sentences)
         # Filter out empty strings and strip whitespace
-        return [sentence.strip() for sentence in sentences if sentence.strip()] 
\ No newline at end of file
+        return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+    @staticmethod
+    def count_tokens(text):
+        return len(_get_encoding().encode(text))
+
+    @staticmethod
+    def split_into_token_windows(text, max_tokens, overlap_tokens=0):
+        """
+        Split text into windows of at most max_tokens tokens, each one starting
+        overlap_tokens before the end of the previous one so that sentences cut
+        at a boundary are seen whole by at least one window.
+        """
+        encoding = _get_encoding()
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return [text]
+
+        step = max(1, max_tokens - overlap_tokens)
+        windows = []
+        for start in range(0, len(tokens), step):
+            windows.append(encoding.decode(tokens[start:start + max_tokens]))
+            if start + max_tokens >= len(tokens):
+                break
+        return windows
\ No newline at end of file
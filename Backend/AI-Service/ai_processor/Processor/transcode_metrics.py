@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.utils import timezone
+
+#? Bytes saved and time spent by the pre-upload transcoding, see audio_transcoder.
+#?
+#? One document per format in a MongoDB collection shared by all consumer
+#? hosts, with the number of transcodes, the bytes before and the bytes
+#? uploaded after (the original when the transcoded file was not smaller),
+#? the ffmpeg time and the silence trimmed. `manage.py transcode_stats` reads
+#? them back.
+
+
+def metrics_collection():
+    from ai_processor.mongo import get_database
+    return get_database()[settings.TRANSCODE_METRICS_COLLECTION]
+
+
+def _record(audio_format, counters):
+    #? Never raises, a metrics failure must not fail the task
+    try:
+        metrics_collection().update_one(
+            {"_id": audio_format},
+            {"$inc": counters, "$set": {"updated_at": timezone.now()}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"Warning: failed to record the transcode metrics: {e}")
+
+
+def record_transcode(audio_format, result, used):
+    """
+    Record one transcode, used tells whether the transcoded file was uploaded.
+    """
+    _record(audio_format, {
+        "count": 1,
+        "used": int(used),
+        "input_bytes": result.input_bytes,
+        "uploaded_bytes": result.output_bytes if used else result.input_bytes,
+        "seconds": result.seconds,
+        "trimmed_seconds": result.trimmed_seconds,
+    })
+
+
+def record_transcode_failure(audio_format):
+    _record(audio_format, {"failures": 1})
+
+
+def transcode_stats():
+    """
+    Returns:
+        list: one dict per format with count, used, failures, input_bytes, saved_bytes, mean_seconds and trimmed_seconds
+    """
+    stats = []
+    for document in metrics_collection().find().sort("_id", 1):
+        count = document.get("count", 0)
+        input_bytes = document.get("input_bytes", 0)
+        stats.append({
+            "format": document["_id"],
+            "count": count,
+            "used": document.get("used", 0),
+            "failures": document.get("failures", 0),
+            "input_bytes": input_bytes,
+            "saved_bytes": input_bytes - document.get("uploaded_bytes", 0),
+            "mean_seconds": document.get("seconds", 0.0) / count if count else 0.0,
+            "trimmed_seconds": document.get("trimmed_seconds", 0.0),
+        })
+    return stats
+
+
+def clear_transcode_stats():
+    metrics_collection().delete_many({})
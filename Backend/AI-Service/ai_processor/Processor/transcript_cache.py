@@ -0,0 +1,240 @@
+import os
+import json
+import fcntl
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.utils import timezone
+
+#? Content-addressed transcript cache.
+#? Keys are sha256(strategy, language, sha256(audio bytes)), so a resubmitted
+#? recording skips the STT call no matter which URL it came from.
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as audio_file:
+        for chunk in iter(lambda: audio_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, strategy_name, language):
+    return hashlib.sha256(f"{strategy_name}:{language}:{content_hash}".encode()).hexdigest()
+
+
+class TranscriptCache:
+    """
+    Base class of the cache backends. Backends keep the entries and the shared
+    hit / miss counters, so the stats cover every worker using the same store.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, transcript):
+        raise NotImplementedError
+
+    def record(self, hit):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class DiskTranscriptCache(TranscriptCache):
+    """
+    One file per transcript, least recently used files are evicted once the
+    folder grows over max_bytes. File mtimes are the LRU clock.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.stats_path = os.path.join(folder, "_stats.json")
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.txt")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cached:
+                transcript = cached.read()
+            os.utime(path)
+            return transcript
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, transcript):
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            tmp.write(transcript)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(".txt"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @contextmanager
+    def _locked_stats(self):
+        #? flock so that several consumer processes can update the counters
+        with open(self.stats_path, "a+", encoding="utf-8") as stats_file:
+            fcntl.flock(stats_file, fcntl.LOCK_EX)
+            try:
+                stats_file.seek(0)
+                content = stats_file.read()
+                counters = json.loads(content) if content else {"hits": 0, "misses": 0}
+                yield counters
+                stats_file.seek(0)
+                stats_file.truncate()
+                stats_file.write(json.dumps(counters))
+            finally:
+                fcntl.flock(stats_file, fcntl.LOCK_UN)
+
+    def record(self, hit):
+        with self._locked_stats() as counters:
+            counters["hits" if hit else "misses"] += 1
+
+    def stats(self):
+        entries = self._entries()
+        with self._locked_stats() as counters:
+            result = dict(counters)
+        result.update({"entries": len(entries), "bytes": sum(size for _, size, _ in entries)})
+        return result
+
+    def clear(self):
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.folder, name))
+        with self._locked_stats() as counters:
+            counters.update({"hits": 0, "misses": 0})
+
+
+class MongoTranscriptCache(TranscriptCache):
+    """
+    Transcripts stored in a MongoDB collection, shared by every worker host.
+    A stats document tracks the counters and the total stored size, which
+    drives the LRU eviction on last_used.
+    """
+
+    STATS_ID = "_stats"
+
+    def __init__(self, collection_name, max_bytes):
+        self.collection_name = collection_name
+        self.max_bytes = max_bytes
+        self.collection.create_index("last_used")
+
+    @property
+    def collection(self):
+        #? Looked up on every use, the cache may outlive a fork and the client is per process (see mongo.py)
+        from ai_processor.mongo import get_database
+        return get_database()[self.collection_name]
+
+    def get(self, key):
+        document = self.collection.find_one_and_update(
+            {"_id": key},
+            {"$set": {"last_used": timezone.now()}},
+            projection={"transcript": 1},
+        )
+        return document["transcript"] if document else None
+
+    def set(self, key, transcript):
+        size = len(transcript.encode("utf-8"))
+        result = self.collection.update_one(
+            {"_id": key},
+            {"$set": {"transcript": transcript, "size": size, "last_used": timezone.now()}},
+            upsert=True,
+        )
+        if result.upserted_id is not None:
+            self.collection.update_one({"_id": self.STATS_ID}, {"$inc": {"bytes": size, "entries": 1}}, upsert=True)
+            self._evict()
+
+    def _evict(self):
+        stats = self.collection.find_one({"_id": self.STATS_ID}) or {}
+        excess = stats.get("bytes", 0) - self.max_bytes
+        while excess > 0:
+            oldest = list(
+                self.collection.find({"_id": {"$ne": self.STATS_ID}}, {"size": 1})
+                .sort("last_used", 1)
+                .limit(100)
+            )
+            if not oldest:
+                break
+            victims = []
+            freed = 0
+            for document in oldest:
+                if excess - freed <= 0:
+                    break
+                victims.append(document["_id"])
+                freed += document.get("size", 0)
+            deleted = self.collection.delete_many({"_id": {"$in": victims}}).deleted_count
+            self.collection.update_one({"_id": self.STATS_ID}, {"$inc": {"bytes": -freed, "entries": -deleted}})
+            excess -= freed
+
+    def record(self, hit):
+        self.collection.update_one(
+            {"_id": self.STATS_ID},
+            {"$inc": {"hits" if hit else "misses": 1}},
+            upsert=True,
+        )
+
+    def stats(self):
+        stats = self.collection.find_one({"_id": self.STATS_ID}) or {}
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "entries": stats.get("entries", 0),
+            "bytes": stats.get("bytes", 0),
+        }
+
+    def clear(self):
+        self.collection.delete_many({})
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    """
+    Return the configured cache backend, or None when TRANSCRIPT_CACHE_BACKEND is "off".
+    """
+    global _cache
+    backend = settings.TRANSCRIPT_CACHE_BACKEND
+    if backend == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if backend == "mongo":
+                    _cache = MongoTranscriptCache(settings.TRANSCRIPT_CACHE_COLLECTION, settings.TRANSCRIPT_CACHE_MAX_BYTES)
+                else:
+                    _cache = DiskTranscriptCache(settings.TRANSCRIPT_CACHE_FOLDER, settings.TRANSCRIPT_CACHE_MAX_BYTES)
+    return _cache
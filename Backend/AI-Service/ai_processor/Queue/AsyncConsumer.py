@@ -0,0 +1,96 @@
+import asyncio
+import signal
+import sys
+import aio_pika
+from django.conf import settings
+from ai_processor.Queue.connection import rabbitmq_url
+from ai_processor.Queue.topology import attempt_from_headers, declare_topology_async, failure_route
+from ai_processor.Queue.queue_metrics import record_queue_wait
+
+from ai_processor.Processor.Process_audio_callback import run_task_async
+from ai_processor.Processor.http_clients import close_async_clients
+from ai_processor.Processor import extractive_summarizer
+
+
+class AsyncAudioConsumer:
+    """
+    aio-pika based consumer for the audio_queue.
+
+    Every delivery becomes a task on the event loop, so up to max_in_flight
+    meetings are processed at once while the per-provider semaphores in
+    provider_limits keep each upstream API within its own concurrency limit.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.channel = None
+        self.in_flight = set()
+        self.stopping = asyncio.Event()
+
+    async def on_message(self, message):
+        task = asyncio.create_task(self._handle(message))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def _handle(self, message):
+        await asyncio.to_thread(record_queue_wait, message.headers, message.priority)
+        outcome = await run_task_async(message.body, attempt_from_headers(message.headers))
+        if not outcome.ok:
+            #? Republish to a retry queue or the dead letter queue before acking the original
+            queue, headers = failure_route(message.headers, outcome)
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    message.body,
+                    headers=headers,
+                    content_type=message.content_type,
+                    priority=message.priority,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=queue,
+            )
+            print(f"Task routed to {queue}")
+        await message.ack()
+
+    async def run(self):
+        connection = await aio_pika.connect_robust(rabbitmq_url(), heartbeat=600)
+        try:
+            channel = await connection.channel()
+            self.channel = channel
+            await channel.set_qos(prefetch_count=self.max_in_flight)
+
+            # Declare the queue, its retry queues and the dead letter queue
+            queue = await declare_topology_async(channel)
+            consumer_tag = await queue.consume(self.on_message, no_ack=False)
+
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGINT, self.stopping.set)
+            loop.add_signal_handler(signal.SIGTERM, self.stopping.set)
+
+            print(f"Async consumer is now listening to the 'audio_queue' with up to {self.max_in_flight} tasks in flight...")
+            await self.stopping.wait()
+
+            print('\nShutting down consumer...')
+            await queue.cancel(consumer_tag)
+            if self.in_flight:
+                print(f"Waiting for {len(self.in_flight)} in-flight tasks to finish...")
+                await asyncio.gather(*self.in_flight, return_exceptions=True)
+        finally:
+            await connection.close()
+            await close_async_clients()
+
+
+def setup_async_consumer(max_in_flight=None):
+    max_in_flight = max_in_flight or settings.ASYNC_MAX_IN_FLIGHT
+    extractive_summarizer.warm_up()
+    try:
+        asyncio.run(AsyncAudioConsumer(max_in_flight).run())
+    except aio_pika.exceptions.AMQPConnectionError as e:
+        print(f"Failed to connect to RabbitMQ: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    setup_async_consumer()
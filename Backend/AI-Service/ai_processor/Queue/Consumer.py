@@ -1,35 +1,141 @@
 import pika
 import sys
 import signal
+import functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from ai_processor.Queue.connection import rabbitmq_parameters
+from ai_processor.Queue.topology import AUDIO_QUEUE, TaskOutcome, declare_topology, settle_delivery
 
-# Import the process_audio function
-from ai_processor.Processor.Process_audio_callback import process_audio
+from ai_processor.Processor.Process_audio_callback import run_delivery
+from ai_processor.Processor import extractive_summarizer
 
-def setup_consumer():
+
+def _init_worker_process():
+    #? Worker processes must not reuse database sockets inherited from the parent
+    import django
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+    extractive_summarizer.warm_up()
+
+
+class PooledTaskDispatcher:
+    """
+    Hands incoming messages to a thread or process pool so the connection thread
+    stays free to pump heartbeats while long meetings are being processed.
+
+    pika's BlockingConnection is not thread safe, so workers never touch the
+    channel: acks and retry / dead letter publishes are scheduled back onto
+    the connection thread with add_callback_threadsafe.
+
+    A process pool breaks for good when one of its processes dies (OOM killer,
+    segfault in a native library): its tasks are retried and the pool is
+    replaced on the connection thread, the consumer keeps running.
+    """
+
+    def __init__(self, connection, channel, workers, pool="thread"):
+        self.connection = connection
+        self.channel = channel
+        self.workers = workers
+        self.pool = pool
+        self.pending = set()
+        self.executor = self._new_executor()
+
+    def _new_executor(self):
+        if self.pool == "process":
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker_process)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audio-worker")
+
+    def _replace_broken(self, executor):
+        #! Connection thread only. Several failed tasks report the same pool, it is replaced once
+        if executor is not self.executor:
+            return
+        print("Worker pool is broken, starting a new one")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._new_executor()
+
+    def _submit(self, body, properties):
+        #? The queue wait is recorded by the worker, a slow Mongo write here would stall heartbeats and acks
+        executor = self.executor
+        try:
+            return executor.submit(run_delivery, body, properties.headers, properties.priority)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            return self.executor.submit(run_delivery, body, properties.headers, properties.priority)
+
+    def on_message(self, channel, method, properties, body):
+        future = self._submit(body, properties)
+        self.pending.add(future)
+        #? self.executor is the pool that took the task, only this thread replaces it
+        future.add_done_callback(functools.partial(self._on_done, self.executor, method, properties, body))
+
+    def _on_done(self, executor, method, properties, body, future):
+        #! Runs on a worker thread, only schedule work for the connection thread here
+        try:
+            outcome = future.result()
+        except BrokenProcessPool as e:
+            print(f"Worker process died while processing task, it will be retried: {e}")
+            outcome = TaskOutcome(False, True, f"Worker process died: {e}")
+            self.connection.add_callback_threadsafe(functools.partial(self._replace_broken, executor))
+        except Exception as e:
+            print(f"Worker crashed while processing task: {e}")
+            outcome = TaskOutcome(False, True, str(e))
+        self.connection.add_callback_threadsafe(
+            functools.partial(self._settle, future, method, properties, body, outcome)
+        )
+
+    def _settle(self, future, method, properties, body, outcome):
+        self.pending.discard(future)
+        if not self.channel.is_open:
+            print(f"Channel closed before delivery {method.delivery_tag} could be settled, it will be redelivered")
+            return
+        settle_delivery(self.channel, method, properties, body, outcome)
+
+    def drain(self):
+        #? Keep the connection serviced until every in-flight task has been acked or nacked
+        while self.pending and self.connection.is_open:
+            self.connection.process_data_events(time_limit=1)
+        self.executor.shutdown(wait=True)
+
+
+def setup_consumer(workers=None, pool=None):
+    """
+    Start consuming the audio_queue.
+
+    Args:
+        workers (int): Number of tasks processed at once, defaults to settings.CONSUMER_WORKERS.
+            Even a single worker runs off the connection thread, so heartbeats keep flowing.
+        pool (str): "thread" or "process", defaults to settings.CONSUMER_POOL.
+    """
+    workers = workers or settings.CONSUMER_WORKERS
+    pool = pool or settings.CONSUMER_POOL
+    if pool != "process":
+        #? Process pool workers load their own copy in _init_worker_process
+        extractive_summarizer.warm_up()
     try:
         # RabbitMQ connection with better parameters
         connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host='localhost',
+            rabbitmq_parameters(
                 heartbeat=600,
                 blocked_connection_timeout=300
             )
         )
         channel = connection.channel()
 
-        # Declare the queue to ensure it exists
-        channel.queue_declare(
-            queue='audio_queue',
-            durable=True
-        )
+        # Declare the queue, its retry queues and the dead letter queue
+        declare_topology(channel)
 
-        # Set up QoS
-        channel.basic_qos(prefetch_count=1)
+        # Set up QoS, one unacked message per worker
+        channel.basic_qos(prefetch_count=workers)
+
+        dispatcher = PooledTaskDispatcher(connection, channel, workers, pool)
 
         # Set up the consumer to listen to the queue
         channel.basic_consume(
-            queue='audio_queue',
-            on_message_callback=process_audio,  # Callback function to process messages
+            queue=AUDIO_QUEUE,
+            on_message_callback=dispatcher.on_message,  # Hands messages to the worker pool
             auto_ack=False  # Manual acknowledgment to ensure reliability
         )
 
@@ -37,14 +143,17 @@ def setup_consumer():
         def signal_handler(sig, frame):
             print('\nShutting down consumer...')
             channel.stop_consuming()
-            connection.close()
-            sys.exit(0)
 
         signal.signal(signal.SIGINT, signal_handler)
 
-        print("Consumer is now listening to the 'audio_queue'...")
+        print(f"Consumer is now listening to the 'audio_queue' with {workers} {pool} workers...")
         channel.start_consuming()
 
+        print(f"Waiting for {len(dispatcher.pending)} in-flight tasks to finish...")
+        dispatcher.drain()
+        connection.close()
+        sys.exit(0)
+
     except pika.exceptions.AMQPConnectionError as e:
         print(f"Failed to connect to RabbitMQ: {e}")
         sys.exit(1)
@@ -1,39 +1,245 @@
 import pika
 import json
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
 from django.conf import settings
+from .connection import rabbitmq_parameters
+from .topology import (
+    AUDIO_QUEUE,
+    STATUS_EXCHANGE,
+    WEBHOOK_QUEUE,
+    ENQUEUED_AT_HEADER,
+    audio_queue_arguments,
+    declare_status_topology,
+    task_priority,
+)
+from .queue_metrics import enqueued_at
+
 
 class AudioQueueProducer:
-    def __init__(self):
+    """
+    One RabbitMQ connection used to publish audio tasks.
+
+    The connection is kept open between publishes and re-opened if the broker
+    dropped it. A producer is not thread safe, share it through ProducerPool.
+    """
+
+    def __init__(self, confirm_delivery=None):
+        self.confirm_delivery = settings.PRODUCER_CONFIRM_DELIVERY if confirm_delivery is None else confirm_delivery
+        self.connection = None
+        self.channel = None
+        self.batch_channel = None
+        self._connect()
+
+    def _connect(self):
         # Connect to RabbitMQ
-        self.connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
+        self.connection = pika.BlockingConnection(rabbitmq_parameters())
         self.channel = self.connection.channel()
+        self.batch_channel = None
         print("step05: producer")
-        
+
+        if self.confirm_delivery:
+            #? basic_publish now waits for the broker ack and raises if the message was not accepted
+            self.channel.confirm_delivery()
+
         # Declare the queue (create it if it doesn't exist)
-        self.channel.queue_declare(queue='audio_queue', durable=True)
+        self.channel.queue_declare(queue=AUDIO_QUEUE, durable=True, arguments=audio_queue_arguments())
+        declare_status_topology(self.channel)
+
+    def _ensure_connection(self):
+        if self.connection is None or self.connection.is_closed or not self.channel.is_open:
+            self._reconnect()
+            return
+        try:
+            #? Service pending heartbeats of an idle connection, fails fast if the broker closed it
+            self.connection.process_data_events(time_limit=0)
+        except pika.exceptions.AMQPError:
+            self._reconnect()
+
+    def _reconnect(self):
+        print("Reconnecting audio queue producer...")
+        self.close()
+        self._connect()
 
-    def add_audio_task(self, audio_id, audio_url, main_language, user_plan):
+    def _with_reconnect(self, publish):
+        self._ensure_connection()
+        try:
+            return publish()
+        except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError, pika.exceptions.StreamLostError):
+            #? The connection went away between the health check and the publish, try once more
+            self._reconnect()
+            return publish()
+
+    @staticmethod
+    def build_task(audio_id, audio_url, main_language, user_plan, duration_seconds=None):
         task = {
             "audio_id": str(audio_id),
             "audio_url": audio_url,
             "main_language": main_language,
             "user_plan": user_plan
         }
-        
+        if duration_seconds is not None:
+            task["duration_seconds"] = duration_seconds
+        return task
+
+    @staticmethod
+    def _publish_on(channel, task):
         message = json.dumps(task)
-        self.channel.basic_publish(
+        channel.basic_publish(
             exchange='',  # Default exchange
-            routing_key='audio_queue', 
+            routing_key=AUDIO_QUEUE,
             body=message,
             properties=pika.BasicProperties(
-                delivery_mode=2  # Makes the message persistent
+                delivery_mode=2,  # Makes the message persistent
+                priority=task_priority(task.get("user_plan"), task.get("duration_seconds")),
+                headers={ENQUEUED_AT_HEADER: enqueued_at()},
             )
         )
+
+    def add_audio_task(self, audio_id, audio_url, main_language, user_plan, duration_seconds=None):
+        task = self.build_task(audio_id, audio_url, main_language, user_plan, duration_seconds)
+        self._with_reconnect(lambda: self._publish_on(self.channel, task))
         print(f"Task added to queue: {task}")
 
+    def add_audio_tasks(self, tasks):
+        """
+        Publish many tasks (dicts built with build_task) with a single broker round trip.
+
+        The batch goes through a transactional channel, so either every task is
+        queued or none is and the error is raised.
+        """
+        if not tasks:
+            return
+
+        def publish_batch():
+            if self.batch_channel is None or not self.batch_channel.is_open:
+                self.batch_channel = self.connection.channel()
+                self.batch_channel.tx_select()
+            try:
+                for task in tasks:
+                    self._publish_on(self.batch_channel, task)
+                self.batch_channel.tx_commit()
+            except pika.exceptions.AMQPChannelError:
+                self.batch_channel = None
+                raise
+
+        self._with_reconnect(publish_batch)
+        print(f"{len(tasks)} tasks added to queue")
+
+    def publish_status_event(self, event, callback_url=None):
+        """
+        Broadcast a status event to the web processes, and queue its webhook
+        delivery when the task registered a callback_url.
+        """
+        message = json.dumps(event)
+
+        def publish():
+            #? Listeners only care about the latest status, the broadcast copy is not persisted
+            self.channel.basic_publish(exchange=STATUS_EXCHANGE, routing_key='', body=message)
+            if callback_url:
+                self.channel.basic_publish(
+                    exchange='',
+                    routing_key=WEBHOOK_QUEUE,
+                    body=json.dumps({"callback_url": callback_url, "event": event}),
+                    properties=pika.BasicProperties(delivery_mode=2, content_type='application/json')
+                )
+
+        self._with_reconnect(publish)
+
     def close(self):
         if self.connection and not self.connection.is_closed:
-            self.connection.close()
+            try:
+                self.connection.close()
+            except pika.exceptions.AMQPError:
+                pass
 
     def __del__(self):
         self.close()
+
+
+class ProducerPool:
+    """
+    Process-wide pool of long-lived producers.
+
+    Each web thread borrows a producer for the duration of a publish, so a
+    submit costs one publish round trip instead of a new TCP + AMQP handshake.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        producer = self._checkout()
+        try:
+            yield producer
+        except Exception:
+            #? Don't hand a producer in an unknown state to the next request
+            producer.close()
+            with self._lock:
+                self._created -= 1
+            raise
+        else:
+            self._idle.put(producer)
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if not can_create:
+            return self._idle.get()
+        try:
+            return AudioQueueProducer()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def add_audio_task(self, audio_id, audio_url, main_language, user_plan, duration_seconds=None):
+        with self.acquire() as producer:
+            producer.add_audio_task(audio_id, audio_url, main_language, user_plan, duration_seconds)
+
+    def add_audio_tasks(self, tasks):
+        with self.acquire() as producer:
+            producer.add_audio_tasks(tasks)
+
+    def publish_status_event(self, event, callback_url=None):
+        with self.acquire() as producer:
+            producer.publish_status_event(event, callback_url)
+
+    def close(self):
+        while True:
+            try:
+                producer = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            producer.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_producer():
+    """
+    Return the process-wide ProducerPool, created on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProducerPool(settings.PRODUCER_POOL_SIZE)
+                atexit.register(_pool.close)
+    return _pool
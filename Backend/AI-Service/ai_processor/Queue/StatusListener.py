@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+import pika
+from django.conf import settings
+from ai_processor.Queue.connection import rabbitmq_parameters
+from ai_processor.Queue.topology import STATUS_EXCHANGE
+from ai_processor.Processor.status_events import get_status_cache
+
+#? Web side of the status events.
+#?
+#? A daemon thread of each web process binds a temporary queue to the
+#? audio_status fanout exchange and hands every event to a StatusBroker, where
+#? the SSE and long-poll requests of that process wait for their task. The
+#? events also keep the status cache of the process up to date.
+
+
+class StatusBroker:
+    """
+    Latest event per audio task, plus per task conditions to wake the waiters.
+    Events carry a sequence number so a waiter only takes events newer than its wait.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._latest = OrderedDict()
+        self._conditions = {}
+        self._waiters = {}
+        self._sequence = 0
+
+    def sequence(self):
+        with self._lock:
+            return self._sequence
+
+    def publish(self, event):
+        audio_id = event.get("audio_id")
+        if not audio_id:
+            return
+        with self._lock:
+            self._sequence += 1
+            self._latest[audio_id] = (self._sequence, event)
+            self._latest.move_to_end(audio_id)
+            while len(self._latest) > self.max_entries:
+                self._latest.popitem(last=False)
+            condition = self._conditions.get(audio_id)
+            if condition:
+                condition.notify_all()
+
+    def wait_for_event(self, audio_id, after_sequence, timeout):
+        """
+        Wait until an event of audio_id newer than after_sequence arrives.
+
+        Returns:
+            tuple: (sequence, event), or None on timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            condition = self._conditions.setdefault(audio_id, threading.Condition(self._lock))
+            self._waiters[audio_id] = self._waiters.get(audio_id, 0) + 1
+            try:
+                while True:
+                    latest = self._latest.get(audio_id)
+                    if latest and latest[0] > after_sequence:
+                        return latest
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    condition.wait(remaining)
+            finally:
+                self._waiters[audio_id] -= 1
+                if not self._waiters[audio_id]:
+                    del self._waiters[audio_id]
+                    del self._conditions[audio_id]
+
+
+class StatusListener(threading.Thread):
+    """
+    Consumes the status fanout exchange into a StatusBroker, reconnecting when the broker goes away.
+    """
+
+    RECONNECT_SECONDS = 5
+
+    def __init__(self, broker):
+        super().__init__(name="status-listener", daemon=True)
+        self.broker = broker
+        self.connected = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                connection = pika.BlockingConnection(rabbitmq_parameters(heartbeat=60))
+                channel = connection.channel()
+                channel.exchange_declare(exchange=STATUS_EXCHANGE, exchange_type='fanout', durable=True)
+                #? Server named, exclusive queue: removed by RabbitMQ when this process goes away
+                queue = channel.queue_declare(queue='', exclusive=True, auto_delete=True).method.queue
+                channel.queue_bind(exchange=STATUS_EXCHANGE, queue=queue)
+                channel.basic_consume(queue=queue, on_message_callback=self.on_event, auto_ack=True)
+                #? Events may have been missed while disconnected
+                get_status_cache().clear()
+                self.connected.set()
+                print("Status listener connected")
+                channel.start_consuming()
+            except Exception as e:
+                print(f"Status listener disconnected: {e}")
+            self.connected.clear()
+            time.sleep(self.RECONNECT_SECONDS)
+
+    def on_event(self, channel, method, properties, body):
+        try:
+            event = json.loads(body)
+            self.broker.publish(event)
+            get_status_cache().set(event["audio_id"], event["status"])
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring invalid status event: {e}")
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_status_listener():
+    """
+    Start the listener of this process on first use and return it.
+    """
+    global _listener
+    if _listener is None:
+        with _listener_lock:
+            if _listener is None:
+                listener = StatusListener(StatusBroker(settings.STATUS_BROKER_MAX_ENTRIES))
+                listener.start()
+                #? Give the first request a chance to use events instead of the polling fallback
+                listener.connected.wait(timeout=1)
+                _listener = listener
+    return _listener
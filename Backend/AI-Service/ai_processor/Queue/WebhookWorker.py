@@ -0,0 +1,145 @@
+import hashlib
+import hmac
+import json
+import signal
+import sys
+import time
+import pika
+import requests
+from django.conf import settings
+from ai_processor.Queue.connection import rabbitmq_parameters
+from ai_processor.Queue.topology import (
+    WEBHOOK_QUEUE,
+    ATTEMPT_HEADER,
+    LAST_ERROR_HEADER,
+    attempt_from_headers,
+    declare_status_topology,
+    retry_queue_name,
+    webhook_retry_delays,
+)
+from ai_processor.Processor.http_clients import get_session
+from ai_processor.Queue.webhook_targets import UnsafeCallbackURL, check_callback_url
+
+#? Delivers the status events of tasks that registered a callback_url.
+#?
+#? Requests are signed with HMAC-SHA256 over "<timestamp>.<body>" using
+#? WEBHOOK_SIGNING_SECRET, receivers recompute it and compare, and reject old
+#? timestamps to stop replays. Deliveries that fail (network error or non 2xx)
+#? are retried with backoff through TTL queues, then dropped. Targets are
+#? checked again before every attempt (see webhook_targets) and redirects are
+#? not followed, so a receiver can't bounce the worker to an internal host.
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+TIMESTAMP_HEADER = 'X-Webhook-Timestamp'
+EVENT_ID_HEADER = 'X-Webhook-Id'
+
+
+def sign_payload(body, timestamp, secret=None):
+    secret = secret or settings.WEBHOOK_SIGNING_SECRET
+    message = f"{timestamp}.".encode() + body
+    return "sha256=" + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def deliver(callback_url, event):
+    """
+    POST one event to its callback_url.
+
+    Returns:
+        str: None when the receiver accepted it, otherwise the error
+
+    Raises:
+        UnsafeCallbackURL: callback_url now points to a non public address, retrying won't help
+    """
+    try:
+        check_callback_url(callback_url)
+    except OSError as e:
+        return f"could not resolve the callback host: {e}"
+    body = json.dumps(event).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: sign_payload(body, timestamp),
+        #? Same id on every attempt, so receivers can drop duplicates
+        EVENT_ID_HEADER: f"{event['audio_id']}:{event['status']}:{event['timestamp']}",
+    }
+    try:
+        response = get_session(callback_url).post(
+            callback_url,
+            data=body,
+            headers=headers,
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            allow_redirects=False,
+        )
+    except requests.exceptions.RequestException as e:
+        return str(e)
+    if 200 <= response.status_code < 300:
+        return None
+    return f"status code {response.status_code}"
+
+
+def on_webhook(channel, method, properties, body):
+    try:
+        message = json.loads(body)
+        callback_url = message["callback_url"]
+        event = message["event"]
+    except (ValueError, KeyError) as e:
+        print(f"Dropping invalid webhook message: {e}")
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        return
+
+    try:
+        error = deliver(callback_url, event)
+    except UnsafeCallbackURL as e:
+        print(f"Dropping webhook to {callback_url}: {e}")
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        return
+    if error is None:
+        print(f"Webhook delivered: {event['audio_id']} {event['status']} -> {callback_url}")
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        return
+
+    attempt = attempt_from_headers(properties.headers)
+    delays = webhook_retry_delays()
+    if attempt < len(delays):
+        headers = dict(properties.headers or {})
+        headers[ATTEMPT_HEADER] = attempt + 1
+        headers[LAST_ERROR_HEADER] = error[:500]
+        channel.basic_publish(
+            exchange='',
+            routing_key=retry_queue_name(delays[attempt], WEBHOOK_QUEUE),
+            body=body,
+            properties=pika.BasicProperties(delivery_mode=2, content_type='application/json', headers=headers)
+        )
+        print(f"Webhook to {callback_url} failed ({error}), retrying in {delays[attempt]}s")
+    else:
+        print(f"Webhook to {callback_url} failed ({error}) after {attempt + 1} attempts, dropping it")
+    channel.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def setup_webhook_worker():
+    if not settings.WEBHOOK_SIGNING_SECRET:
+        print("WEBHOOK_SIGNING_SECRET is not set, refusing to send unsigned webhooks")
+        sys.exit(1)
+    try:
+        connection = pika.BlockingConnection(rabbitmq_parameters(heartbeat=600, blocked_connection_timeout=300))
+        channel = connection.channel()
+        declare_status_topology(channel)
+        channel.basic_qos(prefetch_count=settings.WEBHOOK_PREFETCH)
+        channel.basic_consume(queue=WEBHOOK_QUEUE, on_message_callback=on_webhook, auto_ack=False)
+
+        def signal_handler(sig, frame):
+            print('\nShutting down webhook worker...')
+            channel.stop_consuming()
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        print(f"Webhook worker is now listening to '{WEBHOOK_QUEUE}'...")
+        channel.start_consuming()
+        connection.close()
+        sys.exit(0)
+
+    except pika.exceptions.AMQPConnectionError as e:
+        print(f"Failed to connect to RabbitMQ: {e}")
+        sys.exit(1)
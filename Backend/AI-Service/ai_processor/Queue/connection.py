@@ -0,0 +1,28 @@
+import pika
+from urllib.parse import quote
+from django.conf import settings
+
+
+def rabbitmq_parameters(**overrides):
+    """
+    Build pika connection parameters from the RABBITMQ_* settings.
+
+    Keyword arguments override the defaults (e.g. heartbeat, blocked_connection_timeout).
+    """
+    options = {
+        "host": settings.RABBITMQ_HOST,
+        "port": settings.RABBITMQ_PORT,
+        "credentials": pika.PlainCredentials(settings.RABBITMQ_USER, settings.RABBITMQ_PASSWORD),
+    }
+    options.update(overrides)
+    return pika.ConnectionParameters(**options)
+
+
+def rabbitmq_url():
+    """
+    AMQP URL for aio-pika, built from the same RABBITMQ_* settings.
+    """
+    return (
+        f"amqp://{quote(settings.RABBITMQ_USER, safe='')}:{quote(settings.RABBITMQ_PASSWORD, safe='')}"
+        f"@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}/"
+    )
@@ -0,0 +1,106 @@
+import time
+from django.conf import settings
+from django.utils import timezone
+from .topology import AUDIO_QUEUE, ENQUEUED_AT_HEADER, attempt_from_headers
+
+#? Time the audio tasks wait in audio_queue, per message priority.
+#?
+#? The producer stamps every task with its publish time and the consumers
+#? record the wait of the first delivery in a MongoDB collection shared by all
+#? consumer hosts: one document per priority with the count, total, max and a
+#? histogram of the waits. Retries are left out, their wait is mostly the retry
+#? delay. Producer and consumer clocks must be in sync (NTP) for the numbers to
+#? mean something. `manage.py queue_wait_stats` reads them back.
+
+#? Upper bounds of the histogram buckets, in seconds
+WAIT_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 4 * 3600)
+
+
+def enqueued_at():
+    return int(time.time() * 1000)
+
+
+def queue_wait_seconds(headers):
+    """
+    Seconds since the task was published, None for messages without the header.
+    """
+    try:
+        published = int((headers or {})[ENQUEUED_AT_HEADER])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return max(0.0, time.time() - published / 1000)
+
+
+def bucket_name(seconds):
+    for bound in WAIT_BUCKETS:
+        if seconds <= bound:
+            return f"le_{bound}"
+    return "inf"
+
+
+def metrics_collection():
+    from ai_processor.mongo import get_database
+    return get_database()[settings.QUEUE_WAIT_METRICS_COLLECTION]
+
+
+def record_queue_wait(headers, priority):
+    """
+    Record how long a delivery waited in audio_queue.
+    Never raises, a metrics failure must not fail the task.
+    """
+    if not settings.QUEUE_WAIT_METRICS or attempt_from_headers(headers):
+        return
+    wait = queue_wait_seconds(headers)
+    if wait is None:
+        return
+    priority = priority or 0
+    print(f"Task waited {wait:.1f}s in {AUDIO_QUEUE} (priority {priority})")
+    try:
+        metrics_collection().update_one(
+            {"_id": priority},
+            {
+                "$inc": {"count": 1, "total_seconds": wait, f"buckets.{bucket_name(wait)}": 1},
+                "$max": {"max_seconds": wait},
+                "$set": {"updated_at": timezone.now()},
+            },
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"Warning: failed to record the queue wait: {e}")
+
+
+def _percentile(buckets, count, max_seconds, fraction):
+    #? Upper bound of the bucket holding the percentile, the max for the last one
+    seen = 0
+    for bound in WAIT_BUCKETS:
+        seen += buckets.get(f"le_{bound}", 0)
+        if seen >= fraction * count:
+            return min(bound, max_seconds)
+    return max_seconds
+
+
+def queue_wait_stats():
+    """
+    Returns:
+        list: one dict per priority, highest first, with count, mean, max, p50 and p95 in seconds
+    """
+    stats = []
+    for document in metrics_collection().find().sort("_id", -1):
+        count = document.get("count", 0)
+        if not count:
+            continue
+        buckets = document.get("buckets", {})
+        max_seconds = document.get("max_seconds", 0.0)
+        stats.append({
+            "priority": document["_id"],
+            "count": count,
+            "mean": document.get("total_seconds", 0.0) / count,
+            "max": max_seconds,
+            "p50": _percentile(buckets, count, max_seconds, 0.5),
+            "p95": _percentile(buckets, count, max_seconds, 0.95),
+        })
+    return stats
+
+
+def clear_queue_wait_stats():
+    metrics_collection().delete_many({})
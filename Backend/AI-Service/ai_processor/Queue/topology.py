@@ -0,0 +1,182 @@
+import pika
+from collections import namedtuple
+from django.conf import settings
+
+#? Queue topology of the audio pipeline and the retry policy that routes failed deliveries.
+#?
+#?   audio_queue --(failure, attempts left)--> audio_queue.retry.<delay>s --(TTL expires)--> audio_queue
+#?   audio_queue --(permanent failure or out of attempts)--> audio_queue.dead_letter
+#?
+#? With AUDIO_QUEUE_MAX_PRIORITY > 0 audio_queue is a priority queue
+#? (x-max-priority) and task_priority ranks the tasks by plan and meeting
+#? length, so a backlog of basic plan backfills does not hold premium reports
+#? back. Priorities only reorder messages still in the queue, not the ones
+#? already prefetched by a consumer. It defaults to 0, a plain FIFO queue,
+#? because RabbitMQ refuses to redeclare an existing queue with other
+#? arguments (PRECONDITION_FAILED): submissions would fail and consumers exit.
+#? Turning priorities on or off is a one time migration:
+#?   1. stop the web processes (or point them at maintenance) so nothing is published
+#?   2. let the consumers empty audio_queue, then stop them
+#?   3. rabbitmqctl delete_queue audio_queue
+#?   4. set AUDIO_QUEUE_MAX_PRIORITY everywhere and start the consumers, then the web processes
+#? Messages waiting in the retry queues are dead-lettered into the new queue.
+#?
+#? Retry queues have no consumers, RabbitMQ dead-letters each message back to
+#? audio_queue once its TTL is over. The delay is part of the queue name, so
+#? changing the backoff settings declares new queues instead of conflicting
+#? with the arguments of existing ones.
+#?
+#? Status events of the pipeline go to the audio_status fanout exchange, every
+#? web process binds its own temporary queue to it. Events of tasks with a
+#? callback_url are also queued on audio_status.webhooks for the webhook
+#? worker, which retries failed deliveries through the same kind of TTL queues.
+
+AUDIO_QUEUE = 'audio_queue'
+DEAD_LETTER_QUEUE = 'audio_queue.dead_letter'
+STATUS_EXCHANGE = 'audio_status'
+WEBHOOK_QUEUE = 'audio_status.webhooks'
+
+ATTEMPT_HEADER = 'x-attempt'
+LAST_ERROR_HEADER = 'x-last-error'
+DEAD_REASON_HEADER = 'x-dead-reason'
+ENQUEUED_AT_HEADER = 'x-enqueued-at'  # Publish time in epoch milliseconds, for the queue wait metrics
+
+TaskOutcome = namedtuple("TaskOutcome", ["ok", "retryable", "error"], defaults=(False, None))
+
+
+def retry_delays():
+    """
+    Delay in seconds before each retry, e.g. [15, 60, 240] with the defaults.
+    """
+    return [
+        settings.RETRY_BASE_DELAY_SECONDS * settings.RETRY_BACKOFF_FACTOR ** retry
+        for retry in range(settings.RETRY_MAX_ATTEMPTS - 1)
+    ]
+
+
+def webhook_retry_delays():
+    return [
+        settings.WEBHOOK_RETRY_BASE_DELAY_SECONDS * settings.WEBHOOK_RETRY_BACKOFF_FACTOR ** retry
+        for retry in range(settings.WEBHOOK_MAX_ATTEMPTS - 1)
+    ]
+
+
+def audio_queue_arguments():
+    if settings.AUDIO_QUEUE_MAX_PRIORITY <= 0:
+        return None
+    return {'x-max-priority': settings.AUDIO_QUEUE_MAX_PRIORITY}
+
+
+def task_priority(user_plan, duration_seconds=None):
+    """
+    Priority of an audio task: the one of its plan, plus a boost for short
+    meetings when the client sent their length. None when priorities are off.
+    """
+    if settings.AUDIO_QUEUE_MAX_PRIORITY <= 0:
+        return None
+    priority = settings.PLAN_PRIORITIES.get(user_plan, settings.DEFAULT_PLAN_PRIORITY)
+    if duration_seconds is not None and duration_seconds <= settings.SHORT_MEETING_SECONDS:
+        priority += settings.SHORT_MEETING_PRIORITY_BOOST
+    return max(0, min(settings.AUDIO_QUEUE_MAX_PRIORITY, priority))
+
+
+def retry_queue_name(delay, queue=AUDIO_QUEUE):
+    return f"{queue}.retry.{delay}s"
+
+
+def retry_queue_arguments(delay, queue=AUDIO_QUEUE):
+    return {
+        'x-message-ttl': delay * 1000,
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': queue,
+    }
+
+
+def declare_topology(channel):
+    channel.queue_declare(queue=AUDIO_QUEUE, durable=True, arguments=audio_queue_arguments())
+    for delay in retry_delays():
+        channel.queue_declare(queue=retry_queue_name(delay), durable=True, arguments=retry_queue_arguments(delay))
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+
+
+def declare_status_topology(channel):
+    channel.exchange_declare(exchange=STATUS_EXCHANGE, exchange_type='fanout', durable=True)
+    channel.queue_declare(queue=WEBHOOK_QUEUE, durable=True)
+    for delay in webhook_retry_delays():
+        channel.queue_declare(
+            queue=retry_queue_name(delay, WEBHOOK_QUEUE),
+            durable=True,
+            arguments=retry_queue_arguments(delay, WEBHOOK_QUEUE),
+        )
+
+
+async def declare_topology_async(channel):
+    """
+    Same as declare_topology for an aio-pika channel.
+
+    Returns:
+        the aio-pika audio_queue object
+    """
+    queue = await channel.declare_queue(AUDIO_QUEUE, durable=True, arguments=audio_queue_arguments())
+    for delay in retry_delays():
+        await channel.declare_queue(retry_queue_name(delay), durable=True, arguments=retry_queue_arguments(delay))
+    await channel.declare_queue(DEAD_LETTER_QUEUE, durable=True)
+    return queue
+
+
+def attempt_from_headers(headers):
+    """
+    Number of attempts that already failed for this message.
+    """
+    try:
+        return int((headers or {}).get(ATTEMPT_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def will_retry(attempt, retryable):
+    return retryable and attempt + 1 < settings.RETRY_MAX_ATTEMPTS
+
+
+def failure_route(headers, outcome):
+    """
+    Where a failed delivery goes next.
+
+    Returns:
+        tuple: (queue_name, headers) for the republished message
+    """
+    attempt = attempt_from_headers(headers)
+    new_headers = dict(headers or {})
+    new_headers[ATTEMPT_HEADER] = attempt + 1
+    new_headers[LAST_ERROR_HEADER] = (outcome.error or '')[:500]
+
+    if will_retry(attempt, outcome.retryable):
+        return retry_queue_name(retry_delays()[attempt]), new_headers
+
+    new_headers[DEAD_REASON_HEADER] = 'max_attempts' if outcome.retryable else 'permanent'
+    return DEAD_LETTER_QUEUE, new_headers
+
+
+def settle_delivery(channel, method, properties, body, outcome):
+    """
+    Ack a processed delivery, republishing it to a retry queue or the dead
+    letter queue first when it failed. Must run on the connection thread.
+    """
+    if outcome.ok:
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        return
+
+    queue, headers = failure_route(properties.headers, outcome)
+    channel.basic_publish(
+        exchange='',
+        routing_key=queue,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2,  # Makes the message persistent
+            content_type=properties.content_type,
+            priority=properties.priority,  # Kept when the retry queue hands it back to audio_queue
+            headers=headers,
+        )
+    )
+    channel.basic_ack(delivery_tag=method.delivery_tag)
+    print(f"Task routed to {queue} after {headers[ATTEMPT_HEADER]} failed attempts")
@@ -0,0 +1,64 @@
+import socket
+import ipaddress
+from urllib.parse import urlparse
+from django.conf import settings
+
+#? Where webhooks may be sent.
+#?
+#? callback_url comes from the API clients and the webhook worker POSTs to it
+#? from inside the network, so without a check anyone could make it call
+#? localhost, the cloud metadata service (169.254.169.254) or a private host.
+#? The host is resolved and every address must be public, both when the task
+#? is submitted and again right before each delivery (the DNS answer may have
+#? changed in between). Receivers inside the network are listed in
+#? WEBHOOK_ALLOWED_HOSTS, which skips the address check for them.
+
+
+class UnsafeCallbackURL(ValueError):
+    """
+    callback_url points somewhere the webhook worker must not call.
+    """
+
+
+def is_allowed_host(host):
+    """
+    Whether host is listed in WEBHOOK_ALLOWED_HOSTS, ".example.com" entries match every subdomain.
+    """
+    host = host.lower().rstrip(".")
+    for allowed in settings.WEBHOOK_ALLOWED_HOSTS:
+        if host == allowed or (allowed.startswith(".") and host.endswith(allowed)):
+            return True
+    return False
+
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_host(host, port):
+    """
+    Addresses host resolves to. Raises OSError (socket.gaierror) when it does not resolve.
+    """
+    return {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+
+
+def check_callback_url(url):
+    """
+    Raise UnsafeCallbackURL unless url is http(s) and its host is allowed or
+    only resolves to public addresses. Resolution failures raise OSError.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise UnsafeCallbackURL("callback_url must be an http(s) URL")
+    if is_allowed_host(parsed.hostname):
+        return
+    if settings.WEBHOOK_ALLOWED_HOSTS and settings.WEBHOOK_ALLOWED_HOSTS_ONLY:
+        raise UnsafeCallbackURL(f"{parsed.hostname} is not in WEBHOOK_ALLOWED_HOSTS")
+
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    for address in resolve_host(parsed.hostname, port):
+        if not is_public_address(address):
+            raise UnsafeCallbackURL(f"{parsed.hostname} resolves to the non public address {address}")
@@ -2,10 +2,81 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from ai_processor.models import AudioProcessing
-from ai_processor.Queue.Producer import AudioQueueProducer
+from ai_processor import repository
+from ai_processor.Queue.Producer import AudioQueueProducer, get_producer
 import uuid
+from django.conf import settings
 from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
 from ai_processor.authentication import require_api_key
+from ai_processor.Queue.webhook_targets import UnsafeCallbackURL, check_callback_url
+
+
+def _read_submission(data):
+    """
+    Read and validate the fields of one submission.
+
+    Returns:
+        tuple: (fields, error) where error is None when the submission is valid
+    """
+    if not isinstance(data, dict):
+        return None, "each item must be an object."
+    #? Get required and optional parameters from the request
+    audio_url = data.get("audio_url")
+    main_language = data.get("main_language") or "en"
+    user_plan = data.get("user_plan") or "premium"
+
+    # Validate that audio_url is provided
+    if not audio_url:
+        return None, "audio_url is required."
+    if not main_language:
+        return None, "main_language is required."
+    if not user_plan:
+        return None, "user_plan is required."
+
+    #? Optional meeting length in seconds, short meetings are queued with a higher priority
+    duration_seconds = data.get("duration_seconds")
+    if duration_seconds is not None:
+        if isinstance(duration_seconds, bool) or not isinstance(duration_seconds, (int, float)) or duration_seconds < 0:
+            return None, "duration_seconds must be a positive number."
+
+    #? Optional webhook, called on every status change of the task
+    callback_url = data.get("callback_url") or None
+    if callback_url:
+        try:
+            URLValidator(schemes=["http", "https"])(callback_url)
+        except ValidationError:
+            return None, "callback_url must be an http(s) URL."
+        try:
+            check_callback_url(callback_url)
+        except UnsafeCallbackURL as e:
+            return None, f"callback_url is not allowed: {e}."
+        except OSError:
+            return None, "callback_url host could not be resolved."
+
+    return {
+        "audio_url": audio_url,
+        "main_language": main_language,
+        "user_plan": user_plan,
+        "callback_url": callback_url,
+        "duration_seconds": duration_seconds,
+    }, None
+
+
+def _new_audio_document(fields):
+    now = timezone.now()
+    return AudioProcessing(
+        audio_token = uuid.uuid4(),
+        main_language=fields["main_language"],
+        user_plan=fields["user_plan"],
+        created_at=now,
+        updated_at=now,
+        processing_status='ON_QUEUE',
+        audio_url=fields["audio_url"],
+        callback_url=fields.get("callback_url"),
+        key_points=[]
+    )
 
 
 
@@ -18,47 +89,31 @@ class SubmitAudioAPIView(APIView):
         print("step02: submit audio")
         print("request data: ", request.data)
         print("request content type: ", request.content_type)
-        #? Get required and optional parameters from the request
-        audio_url = request.data.get("audio_url")
-        main_language = request.data.get("main_language") or "en"
-        user_plan = request.data.get("user_plan") or "premium"
-
-        # Validate that audio_url is provided
-        if not audio_url:
-            return Response({"error": "audio_url is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not main_language:
-            return Response({"error": "main_language is required."}, status=status.HTTP_400_BAD_REQUEST)
-        if not user_plan:
-            return Response({"error": "user_plan is required."}, status=status.HTTP_400_BAD_REQUEST)
+        fields, error = _read_submission(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        audio_url = fields["audio_url"]
+        main_language = fields["main_language"]
+        user_plan = fields["user_plan"]
 
         #? Create a new audio processing document in the database
-        audio_document = AudioProcessing.objects.create(
-            audio_token = uuid.uuid4(),
-            main_language=main_language,
-            user_plan=user_plan,
-            created_at=timezone.now(),
-            updated_at=timezone.now(),
-            processing_status='ON_QUEUE',
-            audio_url=audio_url,
-            key_points=[]
-        )
+        audio_document = _new_audio_document(fields)
+        repository.insert_tasks([audio_document])
         print("step03: create audio task")
         #? Send the task to RabbitMQ
         try:
-            producer = AudioQueueProducer()
-            producer.add_audio_task(
+            get_producer().add_audio_task(
                 audio_id=audio_document.audio_token,
                 audio_url=audio_url,
                 main_language=main_language,
-                user_plan=user_plan
+                user_plan=user_plan,
+                duration_seconds=fields["duration_seconds"],
             )
-            # producer.close()
             print("step04: send to queue")
 
         except Exception as e:
             #? Update the status to FAILED if the task couldn't be sent to the queue
-            audio_document.processing_status = 'FAILED'
-            audio_document.save()
+            repository.update_task(audio_document.audio_token, processing_status='FAILED')
             return Response(
                 {"error": "Failed to process audio", "details": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,3 +124,67 @@ class SubmitAudioAPIView(APIView):
             "message": "Audio processing task submitted successfully",
             "audio_token": str(audio_document.audio_token)
         }, status=status.HTTP_201_CREATED)
+
+
+#? Bulk version of the first Api, used for backfills.
+#? Takes {"items": [{audio_url, main_language, user_plan, callback_url}, ...]} and returns one result per item, in order.
+
+class SubmitAudioBatchAPIView(APIView):
+
+    @require_api_key
+    def post(self, request):
+        print("step02: submit audio batch")
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.SUBMIT_BATCH_MAX_ITEMS:
+            return Response(
+                {"error": f"a batch can contain at most {settings.SUBMIT_BATCH_MAX_ITEMS} items."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        #? Validate every item, invalid ones are reported without failing the rest
+        results = []
+        documents = []
+        durations = []
+        for index, item in enumerate(items):
+            fields, error = _read_submission(item)
+            if error:
+                results.append({"index": index, "error": error})
+                continue
+            document = _new_audio_document(fields)
+            documents.append(document)
+            durations.append(fields["duration_seconds"])
+            results.append({"index": index, "audio_token": str(document.audio_token)})
+
+        if not documents:
+            return Response({"results": results, "submitted": 0, "failed": len(results)}, status=status.HTTP_400_BAD_REQUEST)
+
+        #? One insert for the whole batch
+        repository.insert_tasks(documents)
+        print(f"step03: create {len(documents)} audio tasks")
+
+        #? Send every task to RabbitMQ on one channel
+        tasks = [
+            AudioQueueProducer.build_task(doc.audio_token, doc.audio_url, doc.main_language, doc.user_plan, duration)
+            for doc, duration in zip(documents, durations)
+        ]
+        try:
+            get_producer().add_audio_tasks(tasks)
+            print("step04: send batch to queue")
+
+        except Exception as e:
+            #? Nothing from the batch was queued, mark every created document as FAILED
+            repository.update_tasks([doc.audio_token for doc in documents], processing_status='FAILED')
+            return Response(
+                {"error": "Failed to process audio batch", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        failed = len(results) - len(documents)
+        return Response({
+            "message": "Audio processing batch submitted successfully",
+            "results": results,
+            "submitted": len(documents),
+            "failed": failed,
+        }, status=status.HTTP_201_CREATED if not failed else status.HTTP_207_MULTI_STATUS)
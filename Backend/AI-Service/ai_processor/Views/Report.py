@@ -1,34 +1,112 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from ..models import AudioProcessing
+from django.conf import settings
+from ai_processor import repository
 from django.core.exceptions import ObjectDoesNotExist
 from ai_processor.authentication import require_api_key
 
+#? Report fields a client can select with ?fields=, and the model field behind each one
+REPORT_FIELDS = {
+    'transcript': 'transcript',
+    'summary': 'summarization',
+    'key_points': 'key_points',
+    'transcript_segments': 'transcript_segments',
+}
+
+
+class InvalidReportQuery(ValueError):
+    pass
+
+
+def selected_fields(query_params):
+    """
+    Report fields asked with ?fields=summary,key_points, all of them by default.
+    """
+    fields = query_params.get('fields')
+    if not fields:
+        return list(REPORT_FIELDS)
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in REPORT_FIELDS]
+    if unknown or not selected:
+        raise InvalidReportQuery(f"Unknown fields {unknown}, available fields are {list(REPORT_FIELDS)}")
+    return list(dict.fromkeys(selected))
+
+
+def transcript_page(transcript, cursor, limit):
+    """
+    Cut at most limit characters of the transcript from cursor, ending on a whitespace when possible.
+
+    Returns:
+        tuple: (page, next cursor or None at the end of the transcript)
+    """
+    if cursor >= len(transcript):
+        return "", None
+    end = cursor + limit
+    if end >= len(transcript):
+        return transcript[cursor:], None
+    #? Don't cut in the middle of a word, unless the page is a single word
+    space = transcript.rfind(' ', cursor + 1, end + 1)
+    if space > cursor:
+        end = space + 1
+    return transcript[cursor:end], end
+
+
+def paging_params(query_params):
+    """
+    ?transcript_cursor=<n>&transcript_limit=<chars> , None when the transcript is not paged.
+    """
+    cursor = query_params.get('transcript_cursor')
+    limit = query_params.get('transcript_limit')
+    if cursor is None and limit is None:
+        return None
+    try:
+        cursor = int(cursor or 0)
+        limit = int(limit or settings.REPORT_TRANSCRIPT_PAGE_CHARS)
+    except ValueError:
+        raise InvalidReportQuery("transcript_cursor and transcript_limit must be integers")
+    if cursor < 0 or limit <= 0:
+        raise InvalidReportQuery("transcript_cursor must be >= 0 and transcript_limit > 0")
+    return cursor, min(limit, settings.REPORT_TRANSCRIPT_MAX_PAGE_CHARS)
+
 
 #? Third Api in the processing flow, need to be called only once the processing is completed.
+#? ?fields= selects the parts of the report (only those are read from DB) and the
+#? transcript can be paged with transcript_cursor / transcript_limit, following
+#? transcript_next_cursor until it is null.
 class ReportAPIView(APIView):
     @require_api_key
 
     def get(self, request, audio_token):
         try:
-            audio_task = AudioProcessing.objects.get(audio_token=audio_token)
-            
-            # Return the full report
-            report = {
-                'audio_id': str(audio_task.audio_token),
-                'transcript': audio_task.transcript,
-                'summary': audio_task.summarization,
-                'key_points': audio_task.key_points,
-            }
-            
+            try:
+                fields = selected_fields(request.query_params)
+                paging = paging_params(request.query_params)
+            except InvalidReportQuery as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            #? Projection, a summary only report doesn't load the transcript
+            audio_task = repository.find_task(audio_token, [REPORT_FIELDS[field] for field in fields])
+            if audio_task is None:
+                raise ObjectDoesNotExist(f"No audio processing task {audio_token}")
+
+            report = {'audio_id': str(audio_token)}
+            for field in fields:
+                report[field] = audio_task.get(REPORT_FIELDS[field])
+
+            if paging and 'transcript' in report:
+                cursor, limit = paging
+                report['transcript'], report['transcript_next_cursor'] = transcript_page(
+                    report['transcript'] or "", cursor, limit
+                )
+
             return Response(report, status=status.HTTP_200_OK)
-            
+
         except ObjectDoesNotExist:
             return Response({
                 'error': 'Audio not found'
             }, status=status.HTTP_404_NOT_FOUND)
-        
+
         except Exception as e:
             return Response({
                 'error': f'Failed to retrieve report: {str(e)}'
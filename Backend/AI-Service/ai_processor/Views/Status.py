@@ -1,30 +1,227 @@
+import json
+import time
+import threading
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from ..models import AudioProcessing
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from ai_processor import repository
 from django.core.exceptions import ObjectDoesNotExist
 from ai_processor.authentication import require_api_key
+from ai_processor.Queue.StatusListener import get_status_listener
+from ai_processor.Processor.status_events import FINAL_STATUSES, get_status_cache
+
+
+#? Open SSE streams of this process, each one holds a worker thread until it ends
+_sse_slots = threading.BoundedSemaphore(max(1, settings.STATUS_SSE_MAX_STREAMS))
+
+
+class _SlotStream:
+    """
+    Event stream that gives its SSE slot back when the response is closed,
+    also when it was never iterated.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        self.events.close()
+        if not self.released:
+            self.released = True
+            _sse_slots.release()
+
+
+def _status_payload(processing_status):
+    return {
+        'done': processing_status == 'COMPLETED',
+        'status': processing_status
+    }
+
+
+def _status_etag(processing_status):
+    #? The payload only depends on the status
+    return f'"{processing_status}"'
+
+
+def _etag_matches(if_none_match, etag):
+    #? Weak comparison, as If-None-Match requires
+    if not if_none_match:
+        return False
+    return any(candidate in ('*', etag, 'W/' + etag) for candidate in parse_etags(if_none_match))
+
+
+def load_status(audio_token):
+    """
+    Read only the status of the task from DB, not the transcript and summaries.
+    Raises ObjectDoesNotExist when there is no such task.
+    """
+    processing_status = repository.get_status(audio_token)
+    if processing_status is None:
+        raise ObjectDoesNotExist(f"No audio processing task {audio_token}")
+    get_status_cache().set(str(audio_token), processing_status)
+    return processing_status
+
+
+def read_status(audio_token):
+    """
+    Status of the task from the status cache, or from DB when the cached one is too old.
+    Cached statuses are trusted longer while the status events are received.
+    """
+    max_age = settings.STATUS_CACHE_FALLBACK_TTL_SECONDS
+    if settings.STATUS_EVENTS_ENABLED and get_status_listener().connected.is_set():
+        max_age = settings.STATUS_CACHE_TTL_SECONDS
+    processing_status = get_status_cache().get(str(audio_token), max_age)
+    if processing_status is None:
+        processing_status = load_status(audio_token)
+    return processing_status
+
+
+def _wait_for_status_change(listener, audio_token, current_status, after_sequence, timeout):
+    """
+    Wait for the status of the task to differ from current_status.
+
+    Uses the status events when the listener is connected, otherwise (or
+    without a listener) reads the status every STATUS_POLL_FALLBACK_SECONDS.
+
+    Returns:
+        tuple: (new_status or None on timeout, sequence to wait after next time)
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, after_sequence
+
+        if listener is not None and listener.connected.is_set():
+            found = listener.broker.wait_for_event(str(audio_token), after_sequence, remaining)
+            if found is None:
+                continue
+            after_sequence, event = found
+            if event["status"] != current_status:
+                return event["status"], after_sequence
+        else:
+            time.sleep(min(remaining, settings.STATUS_POLL_FALLBACK_SECONDS))
+            latest_status = load_status(audio_token)
+            if latest_status != current_status:
+                return latest_status, after_sequence
+
 
 #? Second Api in the processing flow, need to be called in a frequency of time.
+#? With ?since=<status>&wait=<seconds> it long-polls: the answer comes as soon
+#? as the status differs from since, or with the unchanged status after wait.
+#? Responses carry an ETag, polls sending it back in If-None-Match get a 304
+#? while the status is unchanged, answered from the status cache when possible.
 class StatusAPIView(APIView):
     @require_api_key
     def get(self, request, audio_token):
         try:
-            # Get the audio processing record from DB
-            audio_task = AudioProcessing.objects.get(audio_token=audio_token)
-            is_done = audio_task.processing_status == 'COMPLETED'
-            
-            return Response({
-                'done': is_done,
-                'status': audio_task.processing_status
-            }, status=status.HTTP_200_OK)
-            
+            since = request.query_params.get('since')
+            try:
+                wait = min(float(request.query_params.get('wait', 0)), settings.STATUS_LONG_POLL_MAX_SECONDS)
+            except ValueError:
+                return Response({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+
+            long_poll = bool(since) and wait > 0
+            listener = None
+            sequence = 0
+            if long_poll and settings.STATUS_EVENTS_ENABLED:
+                #? Take the sequence before reading, so an event arriving in between is not missed
+                listener = get_status_listener()
+                sequence = listener.broker.sequence()
+
+            processing_status = read_status(audio_token)
+
+            if long_poll and processing_status == since:
+                new_status, _ = _wait_for_status_change(listener, audio_token, processing_status, sequence, wait)
+                processing_status = new_status or processing_status
+
+            etag = _status_etag(processing_status)
+            if _etag_matches(request.headers.get('If-None-Match'), etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(_status_payload(processing_status), status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            response['Cache-Control'] = 'no-cache'  # Clients may keep it, but have to revalidate
+            return response
+
         except ObjectDoesNotExist:
             return Response({
                 'error': 'Audio processing task not found'
             }, status=status.HTTP_404_NOT_FOUND)
-        
+
         except Exception as e:
             return Response({
                 'error': f'Failed to retrieve status: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+#? Server-Sent Events version of the status Api, one "status" event per change
+#? until the task is COMPLETED or FAILED (or STATUS_SSE_MAX_SECONDS passed).
+#? Only available with STATUS_EVENTS_ENABLED, at most STATUS_SSE_MAX_STREAMS
+#? at once per process since each stream holds a worker for its whole length.
+class StatusEventsAPIView(APIView):
+    @require_api_key
+    def get(self, request, audio_token):
+        if not settings.STATUS_EVENTS_ENABLED:
+            return Response({
+                'error': 'Status events are disabled, poll the status instead'
+            }, status=status.HTTP_404_NOT_FOUND)
+        if not _sse_slots.acquire(blocking=False):
+            response = Response({
+                'error': 'Too many open status streams, poll the status instead'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(int(settings.STATUS_POLL_FALLBACK_SECONDS) or 1)
+            return response
+
+        try:
+            listener = get_status_listener()
+            sequence = listener.broker.sequence()
+            processing_status = read_status(audio_token)
+        except ObjectDoesNotExist:
+            _sse_slots.release()
+            return Response({
+                'error': 'Audio processing task not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception:
+            _sse_slots.release()
+            raise
+
+        response = StreamingHttpResponse(
+            _SlotStream(self.stream(listener, audio_token, processing_status, sequence)),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let a proxy hold the events back
+        return response
+
+    def stream(self, listener, audio_token, processing_status, sequence):
+        yield self.format_event(processing_status)
+        deadline = time.monotonic() + settings.STATUS_SSE_MAX_SECONDS
+        while processing_status not in FINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            new_status, sequence = _wait_for_status_change(
+                listener,
+                audio_token,
+                processing_status,
+                sequence,
+                min(remaining, settings.STATUS_SSE_KEEPALIVE_SECONDS),
+            )
+            if new_status is None:
+                #? Comment line, keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            processing_status = new_status
+            yield self.format_event(processing_status)
+
+    @staticmethod
+    def format_event(processing_status):
+        return f"event: status\ndata: {json.dumps(_status_payload(processing_status))}\n\n"
@@ -0,0 +1,111 @@
+import json
+import pika
+from django.core.management.base import BaseCommand
+from ai_processor import repository
+from ai_processor.Processor.MasterProcessor import resume_status
+from ai_processor.Processor.status_events import notify_status
+from ai_processor.Queue.connection import rabbitmq_parameters
+from ai_processor.Queue.topology import (
+    AUDIO_QUEUE,
+    DEAD_LETTER_QUEUE,
+    ATTEMPT_HEADER,
+    LAST_ERROR_HEADER,
+    DEAD_REASON_HEADER,
+    ENQUEUED_AT_HEADER,
+    declare_topology,
+)
+from ai_processor.Queue.queue_metrics import enqueued_at
+
+
+class Command(BaseCommand):
+    help = 'Inspects, replays or purges audio tasks in the dead letter queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Handle at most this many messages')
+        parser.add_argument('--replay', action='store_true', help='Send the messages back to the audio queue with a fresh attempt count')
+        parser.add_argument('--purge', action='store_true', help='Drop every message in the dead letter queue')
+
+    def handle(self, *args, **options):
+        connection = pika.BlockingConnection(rabbitmq_parameters())
+        try:
+            channel = connection.channel()
+            declare_topology(channel)
+
+            if options['purge']:
+                method = channel.queue_purge(queue=DEAD_LETTER_QUEUE)
+                self.stdout.write(self.style.SUCCESS(f'Purged {method.method.message_count} dead letters'))
+                return
+
+            if options['replay']:
+                replayed = self.replay(channel, options['limit'])
+                self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} dead letters'))
+                return
+
+            self.peek(channel, options['limit'])
+        finally:
+            #? Unacked deliveries of a peek go back to the queue when the connection closes
+            if connection.is_open:
+                connection.close()
+
+    def describe(self, properties, body):
+        headers = properties.headers or {}
+        try:
+            audio_id = json.loads(body).get('audio_id', 'unknown')
+        except (ValueError, AttributeError):
+            audio_id = 'unparsable'
+        return (
+            f"{audio_id}: {headers.get(DEAD_REASON_HEADER, '?')} after {headers.get(ATTEMPT_HEADER, 0)} attempts"
+            f" - {headers.get(LAST_ERROR_HEADER, '')}"
+        )
+
+    def peek(self, channel, limit):
+        count = 0
+        while count < limit:
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            self.stdout.write(self.describe(properties, body))
+            count += 1
+        if not count:
+            self.stdout.write(self.style.WARNING('Dead letter queue is empty'))
+
+    def replay(self, channel, limit):
+        replayed = 0
+        while replayed < limit:
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            self.stdout.write(self.describe(properties, body))
+
+            headers = {
+                key: value for key, value in (properties.headers or {}).items()
+                if key not in (ATTEMPT_HEADER, LAST_ERROR_HEADER, DEAD_REASON_HEADER)
+            }
+            headers[ENQUEUED_AT_HEADER] = enqueued_at()
+            self.reset_status(body)
+            channel.basic_publish(
+                exchange='',
+                routing_key=AUDIO_QUEUE,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Makes the message persistent
+                    content_type=properties.content_type,
+                    priority=properties.priority,
+                    headers=headers,
+                )
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            replayed += 1
+        return replayed
+
+    def reset_status(self, body):
+        try:
+            audio_token = json.loads(body)['audio_id']
+            audio_task = repository.get_task(audio_token)
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Could not reset the task status: {e}'))
+            return
+        audio_task.processing_status = resume_status(audio_task)
+        repository.update_task(audio_token, processing_status=audio_task.processing_status)
+        #? Status caches and webhooks would otherwise keep reporting FAILED
+        notify_status(audio_task, retry_scheduled=True)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from ai_processor.repository import INDEXES, audio_collection, ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Creates the MongoDB indexes of the audio_processing collection (migrations are disabled, nothing else does)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the indexes and whether they exist')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            existing = audio_collection().index_information()
+            for index in INDEXES:
+                name = index.document['name']
+                state = 'exists' if name in existing else 'missing'
+                self.stdout.write(f"{name} {dict(index.document['key'])}: {state}")
+            return
+
+        failed = 0
+        for name, error in ensure_indexes():
+            if error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'{name}: {error}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} indexes could not be created'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Indexes are up to date'))
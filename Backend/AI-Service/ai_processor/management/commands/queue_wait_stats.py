@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_processor.Queue.queue_metrics import WAIT_BUCKETS, clear_queue_wait_stats, queue_wait_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows how long audio tasks waited in audio_queue, per priority'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Reset the recorded waits')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_queue_wait_stats()
+            self.stdout.write(self.style.SUCCESS('Queue wait metrics cleared'))
+            return
+
+        if not settings.QUEUE_WAIT_METRICS:
+            self.stdout.write(self.style.WARNING('Queue wait metrics are disabled (QUEUE_WAIT_METRICS=false)'))
+        stats = queue_wait_stats()
+        if not stats:
+            self.stdout.write(self.style.WARNING('No queue waits recorded yet'))
+            return
+
+        self.stdout.write(f"{'priority':>8}{'tasks':>10}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'max s':>10}")
+        for row in stats:
+            self.stdout.write(
+                f"{row['priority']:>8}{row['count']:>10}{row['mean']:>10.1f}"
+                f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['max']:>10.1f}"
+            )
+        self.stdout.write(f"p50 / p95 are bucket upper bounds, buckets: {', '.join(f'{b}s' for b in WAIT_BUCKETS)}")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from ai_processor import repository
+from ai_processor.Processor.MasterProcessor import resume_status, completed_stages
+from ai_processor.Processor.status_events import notify_status
+from ai_processor.Queue.Producer import AudioQueueProducer, get_producer
+
+
+class Command(BaseCommand):
+    help = 'Requeues FAILED audio tasks, they continue from the first stage without stored output'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tokens', nargs='*', help='Only resume these audio tokens (default: every FAILED task)')
+        parser.add_argument('--limit', type=int, help='Resume at most this many tasks')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the tasks that would be resumed')
+
+    def handle(self, *args, **options):
+        audio_tasks = repository.find_tasks_by_status('FAILED', audio_ids=options['tokens'], limit=options['limit'])
+        audio_tasks = [audio_task for audio_task in audio_tasks if audio_task.audio_url]
+        if not audio_tasks:
+            self.stdout.write(self.style.WARNING('No failed tasks to resume'))
+            return
+
+        for audio_task in audio_tasks:
+            done = sorted(completed_stages(audio_task)) or ['nothing']
+            self.stdout.write(f"{audio_task.audio_token}: stored {', '.join(done)} -> {resume_status(audio_task)}")
+        if options['dry_run']:
+            return
+
+        #? Put each task back to the status of its last stored stage, then queue them in one batch
+        for audio_task in audio_tasks:
+            audio_task.processing_status = resume_status(audio_task)
+            repository.update_task(audio_task.audio_token, processing_status=audio_task.processing_status)
+        get_producer().add_audio_tasks([
+            AudioQueueProducer.build_task(
+                audio_task.audio_token,
+                audio_task.audio_url,
+                audio_task.main_language,
+                audio_task.user_plan,
+            )
+            for audio_task in audio_tasks
+        ])
+        #? Status caches and webhooks would otherwise keep reporting FAILED
+        for audio_task in audio_tasks:
+            notify_status(audio_task, retry_scheduled=True)
+        self.stdout.write(self.style.SUCCESS(f'Resumed {len(audio_tasks)} tasks'))
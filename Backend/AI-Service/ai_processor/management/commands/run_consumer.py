@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from ai_processor.Queue.Consumer import setup_consumer
 
@@ -5,11 +6,37 @@ from ai_processor.Queue.Consumer import setup_consumer
 class Command(BaseCommand):
     help = 'Starts the RabbitMQ consumer for audio processing'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=['blocking', 'async'],
+            help='blocking: pika consumer with an optional worker pool, async: aio-pika event loop (default: CONSUMER_MODE setting)'
+        )
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            help='Meetings processed concurrently by the async consumer (default: ASYNC_MAX_IN_FLIGHT setting)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of audio tasks processed concurrently (default: CONSUMER_WORKERS setting)'
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            help='Worker pool type used when --workers is greater than 1 (default: CONSUMER_POOL setting)'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting Audio Queue Consumer...'))
         try:
-            setup_consumer()
+            if (options['mode'] or settings.CONSUMER_MODE) == 'async':
+                from ai_processor.Queue.AsyncConsumer import setup_async_consumer
+                setup_async_consumer(max_in_flight=options['max_in_flight'])
+            else:
+                setup_consumer(workers=options['workers'], pool=options['pool'])
         except KeyboardInterrupt:
             self.stdout.write(self.style.WARNING('Stopping consumer...'))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error: {str(e)}')) 
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'Error: {str(e)}'))
\ No newline at end of file
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ai_processor.Queue.WebhookWorker import setup_webhook_worker
+
+
+class Command(BaseCommand):
+    help = 'Starts the worker that delivers status webhooks to the registered callback URLs'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Starting Webhook Worker...'))
+        try:
+            setup_webhook_worker()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping webhook worker...'))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_processor.Processor.transcode_metrics import clear_transcode_stats, transcode_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows the bytes saved and the time spent transcoding audio before the STT upload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Reset the recorded transcodes')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_transcode_stats()
+            self.stdout.write(self.style.SUCCESS('Transcode metrics cleared'))
+            return
+
+        if not settings.STT_TRANSCODE:
+            self.stdout.write(self.style.WARNING('Transcoding is disabled (STT_TRANSCODE=false)'))
+        stats = transcode_stats()
+        if not stats:
+            self.stdout.write(self.style.WARNING('No transcodes recorded yet'))
+            return
+
+        self.stdout.write(
+            f"{'format':>8}{'files':>8}{'used':>8}{'failed':>8}{'input MB':>12}{'saved MB':>12}{'saved':>8}"
+            f"{'mean s':>9}{'trimmed s':>11}"
+        )
+        for row in stats:
+            saved_share = row['saved_bytes'] / row['input_bytes'] if row['input_bytes'] else 0.0
+            self.stdout.write(
+                f"{row['format']:>8}{row['count']:>8}{row['used']:>8}{row['failures']:>8}"
+                f"{row['input_bytes'] / 1e6:>12.1f}{row['saved_bytes'] / 1e6:>12.1f}{saved_share:>8.0%}"
+                f"{row['mean_seconds']:>9.2f}{row['trimmed_seconds']:>11.1f}"
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from ai_processor.Processor.transcript_cache import get_transcript_cache
+
+
+class Command(BaseCommand):
+    help = 'Shows hit / miss counters and size of the transcript cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Remove every cached transcript and reset the counters')
+
+    def handle(self, *args, **options):
+        cache = get_transcript_cache()
+        if cache is None:
+            self.stdout.write(self.style.WARNING('Transcript cache is disabled (TRANSCRIPT_CACHE_BACKEND=off)'))
+            return
+
+        if options['clear']:
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS('Transcript cache cleared'))
+            return
+
+        stats = cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_ratio = stats['hits'] / lookups if lookups else 0.0
+        self.stdout.write(f"backend:   {type(cache).__name__}")
+        self.stdout.write(f"hits:      {stats['hits']}")
+        self.stdout.write(f"misses:    {stats['misses']}")
+        self.stdout.write(f"hit ratio: {hit_ratio:.1%}")
+        self.stdout.write(f"entries:   {stats['entries']}")
+        self.stdout.write(f"bytes:     {stats['bytes']}")
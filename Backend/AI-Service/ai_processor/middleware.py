@@ -0,0 +1,105 @@
+import gzip
+import re
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional, responses are only gzipped without it
+    brotli = None
+
+#? Response compression that keeps ETags strong.
+#?
+#? Django's GZipMiddleware turns strong ETags into weak ones, since the
+#? compressed bytes differ from the ones the ETag was computed on. Here each
+#? encoding gets its own strong ETag instead ("<etag>-gzip", "<etag>-br"), and
+#? the suffix is removed from If-None-Match before the request reaches
+#? ConditionalGetMiddleware, so revalidating a compressed response still ends in a 304.
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+
+def accepted_encoding(request):
+    """
+    Best encoding supported by both sides, or None.
+    """
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = {
+        part.split(';')[0].strip().lower()
+        for part in accept_encoding.split(',')
+        if not re.search(r';\s*q=0(\.0*)?\s*$', part)  # q=0 means "not acceptable"
+    }
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.RESPONSE_BROTLI_QUALITY)
+    #? mtime=0 so the same content always gives the same bytes
+    return gzip.compress(content, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def with_encoding_suffix(etag, encoding):
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli compression of the JSON responses, placed before (outside)
+    ConditionalGetMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = accepted_encoding(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        revalidating = False
+        if if_none_match and encoding:
+            #? Only ETags of the encoding this response would use, a client that
+            #? no longer accepts it must not be told to keep its cached copy
+            stripped = if_none_match.replace(f'-{encoding}"', '"')
+            revalidating = stripped != if_none_match
+            request.META['HTTP_IF_NONE_MATCH'] = stripped
+
+        response = self.get_response(request)
+
+        if response.status_code == 304:
+            #? Same representation as the one revalidated, give back its ETag
+            if revalidating and response.has_header('ETag'):
+                response['ETag'] = with_encoding_suffix(response['ETag'], encoding)
+            return response
+
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = with_encoding_suffix(response['ETag'], encoding)
+        return response
+
+    @staticmethod
+    def should_compress(response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if response.status_code != 200:
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return False
+        return len(response.content) >= settings.RESPONSE_COMPRESSION_MIN_BYTES
@@ -0,0 +1,17 @@
+import djongo.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_processor', '0002_audioprocessing_callback_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audioprocessing',
+            name='transcript_segments',
+            field=djongo.models.fields.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -22,10 +22,12 @@ class AudioProcessing(models.Model):
         default='ON_QUEUE'
     )
     key_points = models.JSONField(blank=True, null=True, default=list)  # Stores array of key points
+    transcript_segments = models.JSONField(blank=True, null=True)  # Offsets of the chunks of a split recording
     main_language = models.CharField(max_length=10, default='en', null=True)  # ISO language code
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user_plan = models.CharField(max_length=50, default='base', null=True)
+    callback_url = models.URLField(blank=True, null=True)  # Webhook notified on status changes
 
     class Meta:
         db_table = 'audio_processing'
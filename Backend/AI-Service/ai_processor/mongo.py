@@ -0,0 +1,28 @@
+import os
+import threading
+from pymongo import MongoClient
+from django.conf import settings
+
+#? Shared pymongo client for code that talks to MongoDB directly instead of going through djongo.
+#? MongoClient keeps its own connection pool and is not fork safe, so one client is kept per process.
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                options = dict(settings.DATABASES['default'].get('CLIENT', {}))
+                options.setdefault('maxPoolSize', settings.MONGO_MAX_POOL_SIZE)
+                _client = MongoClient(**options)
+                _client_pid = pid
+    return _client
+
+
+def get_database():
+    return get_client()[settings.DATABASES['default']['NAME']]
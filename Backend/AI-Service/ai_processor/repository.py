@@ -0,0 +1,148 @@
+import uuid
+from django.utils import timezone
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from ai_processor.models import AudioProcessing
+from ai_processor.mongo import get_database
+
+#? Data access of the audio tasks straight through pymongo.
+#?
+#? djongo parses the SQL Django generates for every ORM call and translates
+#? it into a Mongo query, on each request. The hot paths (status, report,
+#? stage writes) go through here instead, with projections and $set updates on
+#? the pooled client of ai_processor.mongo. The documents keep the layout djongo
+#? gives them, so the model, the admin and the management commands keep working.
+
+TASK_FIELDS = tuple(field.attname for field in AudioProcessing._meta.concrete_fields)
+
+#? One index per query pattern of the service, created by `manage.py ensure_indexes`
+INDEXES = [
+    #? Every lookup and update by token (status, report, processors)
+    IndexModel([("audio_token", ASCENDING)], name="audio_token_unique", unique=True),
+    #? resume_failed_tasks and stuck task checks: tasks of a status, oldest first
+    IndexModel([("processing_status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    #? Per plan listings and usage reports
+    IndexModel([("user_plan", ASCENDING), ("created_at", DESCENDING)], name="user_plan_created_at"),
+    #? Latest tasks first
+    IndexModel([("created_at", DESCENDING)], name="created_at"),
+]
+
+
+def audio_collection():
+    return get_database()[AudioProcessing._meta.db_table]
+
+
+def _token(audio_id):
+    #? djongo stores UUIDField values as UUIDs (native uuid field), not as strings
+    return audio_id if isinstance(audio_id, uuid.UUID) else uuid.UUID(str(audio_id))
+
+
+def _projection(fields):
+    projection = {name: 1 for name in fields}
+    projection["_id"] = 0
+    return projection
+
+
+def _to_model(document):
+    return AudioProcessing(**{name: document[name] for name in TASK_FIELDS if name in document})
+
+
+def _to_document(audio_task):
+    return {name: getattr(audio_task, name) for name in TASK_FIELDS}
+
+
+def find_task(audio_id, fields=None):
+    """
+    Read a task document, only the given fields when fields is set.
+
+    Returns:
+        dict: the document, or None when there is no such task
+    """
+    projection = _projection(fields) if fields is not None else {"_id": 0}
+    return audio_collection().find_one({"audio_token": _token(audio_id)}, projection)
+
+
+def get_task(audio_id, fields=None):
+    """
+    Same as find_task, as an (unsaved) AudioProcessing instance.
+    Raises AudioProcessing.DoesNotExist when there is no such task.
+    """
+    document = find_task(audio_id, fields)
+    if document is None:
+        raise AudioProcessing.DoesNotExist(f"No audio processing task {audio_id}")
+    return _to_model(document)
+
+
+def get_status(audio_id):
+    """
+    Returns:
+        str: processing_status of the task, or None when there is no such task
+    """
+    document = find_task(audio_id, ("processing_status",))
+    return document["processing_status"] if document else None
+
+
+def find_tasks_by_status(processing_status, audio_ids=None, limit=None):
+    """
+    Tasks of a status, oldest first.
+    """
+    query = {"processing_status": processing_status}
+    if audio_ids:
+        query["audio_token"] = {"$in": [_token(audio_id) for audio_id in audio_ids]}
+    cursor = audio_collection().find(query, {"_id": 0}).sort("created_at", ASCENDING)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [_to_model(document) for document in cursor]
+
+
+def insert_tasks(audio_tasks):
+    """
+    Insert new AudioProcessing instances, in one round trip.
+    """
+    documents = [_to_document(audio_task) for audio_task in audio_tasks]
+    if documents:
+        audio_collection().insert_many(documents, ordered=False)
+
+
+def update_task(audio_id, **fields):
+    """
+    $set the given fields of one task, updated_at included.
+
+    Returns:
+        bool: whether the task exists
+    """
+    fields.setdefault("updated_at", timezone.now())
+    result = audio_collection().update_one({"audio_token": _token(audio_id)}, {"$set": fields})
+    return result.matched_count > 0
+
+
+def update_tasks(audio_ids, **fields):
+    """
+    $set the given fields of several tasks in one update.
+    """
+    fields.setdefault("updated_at", timezone.now())
+    audio_collection().update_many(
+        {"audio_token": {"$in": [_token(audio_id) for audio_id in audio_ids]}},
+        {"$set": fields},
+    )
+
+
+def ensure_indexes():
+    """
+    Create the missing indexes of INDEXES, existing ones are left as they are.
+    An index conflicting with an existing one (same keys, other name or options)
+    is reported instead of stopping the others.
+
+    Returns:
+        list: (index name, error or None) per index
+    """
+    collection = audio_collection()
+    results = []
+    for index in INDEXES:
+        name = index.document["name"]
+        try:
+            collection.create_indexes([index])
+            results.append((name, None))
+        except OperationFailure as e:
+            results.append((name, str(e)))
+    return results
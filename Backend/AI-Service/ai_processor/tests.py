@@ -0,0 +1,589 @@
+import json
+import time
+import uuid
+import threading
+import importlib.util
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock, skipUnless
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from ai_processor.Processor import extractive_summarizer, http_clients, audio_transcoder, text_splitter
+from ai_processor.Processor.errors import StageTimeout
+from ai_processor.Processor.pipeline import Stage, StageScheduler
+from ai_processor.Processor.text_splitter import TextSplitter
+from ai_processor.Processor.rate_limiter import LocalBucketStore, ProviderRateLimiter, _new_state, _take, parse_duration
+from ai_processor.Processor.transcript_cache import MongoTranscriptCache
+from ai_processor.Processor.Speech_to_text_component import CachedSpeechToText, ChunkedSpeechToText, Transcript, stitch_segments
+from ai_processor.Processor.audio_chunker import AudioChunk, plan_segments
+from ai_processor.Processor.status_events import StatusCache
+from ai_processor.Queue import webhook_targets, WebhookWorker, Consumer
+from ai_processor.Queue.webhook_targets import UnsafeCallbackURL, check_callback_url
+from ai_processor.Queue.topology import (
+    TaskOutcome, failure_route, retry_delays, ATTEMPT_HEADER, LAST_ERROR_HEADER, DEAD_REASON_HEADER, DEAD_LETTER_QUEUE,
+)
+from ai_processor.Views import Status
+from ai_processor.Views.Report import InvalidReportQuery, REPORT_FIELDS, paging_params, selected_fields, transcript_page
+from ai_processor.Processor.extractive_summarizer import split_sentences, summary_sentence_count, extractive_summary
+
+#? Unit tests that need neither MongoDB, RabbitMQ nor the providers: python manage.py test ai_processor
+
+TOPICS = ("budget", "hiring", "release")
+
+MEETING = (
+    "The budget for next year is approved. "
+    "Marketing gets a bigger budget share. "
+    "The budget review happens every quarter. "
+    "We are hiring two backend engineers. "
+    "Hiring interviews start next Monday morning. "
+    "The hiring committee meets on Fridays. "
+    "The release is planned for June. "
+    "Release notes are written by QA. "
+    "A release candidate ships next week."
+)
+
+
+class StubEncoder:
+    """
+    Stands in for the sentence-transformers model: one axis per topic word, so
+    sentences of the same topic end up in the same k-means cluster.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences):
+        import numpy
+
+        self.calls.append(list(sentences))
+        return numpy.array([
+            [float(topic in sentence.lower()) + 0.01 * index for topic in TOPICS]
+            for index, sentence in enumerate(sentences)
+        ])
+
+
+class SplitSentencesTests(SimpleTestCase):
+    def test_splits_on_sentence_ends(self):
+        self.assertEqual(
+            split_sentences("We start at nine today. Is everyone here already? Yes we are ready!"),
+            ["We start at nine today.", "Is everyone here already?", "Yes we are ready!"],
+        )
+
+    def test_joins_short_fragments_to_the_next_sentence(self):
+        self.assertEqual(
+            split_sentences("Okay. Right. The budget is approved now."),
+            ["Okay. Right. The budget is approved now."],
+        )
+
+    def test_keeps_a_short_last_fragment(self):
+        self.assertEqual(
+            split_sentences("The budget is approved now. Thanks all."),
+            ["The budget is approved now.", "Thanks all."],
+        )
+
+    def test_arabic_question_mark_ends_a_sentence(self):
+        self.assertEqual(
+            split_sentences("هل الميزانية جاهزة الآن؟ نعم هي جاهزة تماما."),
+            ["هل الميزانية جاهزة الآن؟", "نعم هي جاهزة تماما."],
+        )
+
+    def test_empty_text(self):
+        self.assertEqual(split_sentences("   "), [])
+
+
+class SummarySentenceCountTests(SimpleTestCase):
+    def test_none_when_everything_fits(self):
+        self.assertIsNone(summary_sentence_count(["one two three", "four five six"], 6))
+
+    def test_sentences_of_average_length_that_fit(self):
+        sentences = ["one two three four"] * 10
+        self.assertEqual(summary_sentence_count(sentences, 12), 3)
+        self.assertEqual(summary_sentence_count(sentences, 14), 4)
+
+    def test_keeps_at_least_one_sentence(self):
+        self.assertEqual(summary_sentence_count(["one two three four five six"] * 3, 2), 1)
+
+
+class ExtractiveSummaryTests(SimpleTestCase):
+    def setUp(self):
+        self.encoder = StubEncoder()
+        patcher = mock.patch.object(extractive_summarizer, "get_sentence_encoder", return_value=self.encoder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_short_text_is_returned_without_embedding(self):
+        text = "The budget is approved. We hire two engineers."
+        self.assertEqual(extractive_summary(text, 50), text)
+        self.assertEqual(self.encoder.calls, [])
+
+    def test_empty_text(self):
+        self.assertEqual(extractive_summary("", 50), "")
+
+    @skipUnless(
+        importlib.util.find_spec("numpy") and importlib.util.find_spec("sklearn"),
+        "needs numpy and scikit-learn",
+    )
+    def test_keeps_one_sentence_per_topic_in_transcript_order(self):
+        sentences = split_sentences(MEETING)
+        summary = extractive_summary(MEETING, 18)
+
+        self.assertEqual(self.encoder.calls, [sentences])
+        chosen = [sentence for sentence in sentences if sentence in summary]
+        self.assertEqual(len(chosen), summary_sentence_count(sentences, 18))
+        self.assertEqual(" ".join(chosen), summary)
+        for topic in TOPICS:
+            self.assertEqual(len([sentence for sentence in chosen if topic in sentence.lower()]), 1, topic)
+
+
+class CallbackURLTests(SimpleTestCase):
+    def resolving_to(self, *addresses):
+        patcher = mock.patch.object(webhook_targets, "resolve_host", return_value=set(addresses))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_public_address_is_accepted(self):
+        self.resolving_to("93.184.216.34")
+        check_callback_url("https://hooks.example.com/audio")
+
+    def test_internal_addresses_are_refused(self):
+        for address in ("127.0.0.1", "10.1.2.3", "192.168.0.10", "172.16.0.1", "169.254.169.254", "::1",
+                        "fe80::1", "::ffff:127.0.0.1", "100.64.0.1"):
+            self.resolving_to(address)
+            with self.assertRaises(UnsafeCallbackURL, msg=address):
+                check_callback_url("http://hooks.example.com/audio")
+
+    def test_one_internal_address_is_enough_to_refuse(self):
+        self.resolving_to("93.184.216.34", "10.0.0.5")
+        with self.assertRaises(UnsafeCallbackURL):
+            check_callback_url("http://hooks.example.com/audio")
+
+    def test_only_http_and_https(self):
+        with self.assertRaises(UnsafeCallbackURL):
+            check_callback_url("ftp://hooks.example.com/audio")
+
+    @override_settings(WEBHOOK_ALLOWED_HOSTS=["hooks.internal", ".corp.example.com"], WEBHOOK_ALLOWED_HOSTS_ONLY=False)
+    def test_allowed_hosts_skip_the_address_check(self):
+        self.resolving_to("10.0.0.5")
+        check_callback_url("http://hooks.internal/audio")
+        check_callback_url("http://billing.corp.example.com/audio")
+        with self.assertRaises(UnsafeCallbackURL):
+            check_callback_url("http://corp.example.com.evil.io/audio")
+
+    @override_settings(WEBHOOK_ALLOWED_HOSTS=["hooks.example.com"], WEBHOOK_ALLOWED_HOSTS_ONLY=True)
+    def test_allowed_hosts_only(self):
+        self.resolving_to("93.184.216.34")
+        with self.assertRaises(UnsafeCallbackURL):
+            check_callback_url("https://other.example.org/audio")
+
+    def test_worker_drops_unsafe_targets_without_posting(self):
+        self.resolving_to("169.254.169.254")
+        channel = mock.Mock()
+        message = {"callback_url": "http://metadata.example.com/", "event": {"audio_id": "a", "status": "COMPLETED", "timestamp": "t"}}
+        with mock.patch.object(WebhookWorker, "get_session") as get_session:
+            WebhookWorker.on_webhook(channel, mock.Mock(delivery_tag=1), mock.Mock(headers={}), json.dumps(message).encode())
+        get_session.assert_not_called()
+        channel.basic_ack.assert_called_once_with(delivery_tag=1)
+        channel.basic_publish.assert_not_called()
+
+
+@override_settings(API_KEYS_SERVICE="test-key")
+class StatusEventsTests(SimpleTestCase):
+    def setUp(self):
+        self.token = uuid.uuid4()
+        for target, value in (("get_status_listener", mock.Mock()), ("read_status", "ON_QUEUE")):
+            patcher = mock.patch.object(Status, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(Status, "_sse_slots", threading.BoundedSemaphore(2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_stream(self):
+        request = RequestFactory().get(f"/status/{self.token}/events/", HTTP_X_API_KEY="test-key")
+        return Status.StatusEventsAPIView.as_view()(request, audio_token=self.token)
+
+    @override_settings(STATUS_EVENTS_ENABLED=False)
+    def test_not_found_when_status_events_are_disabled(self):
+        self.assertEqual(self.open_stream().status_code, 404)
+        Status.get_status_listener.assert_not_called()
+
+    @override_settings(STATUS_EVENTS_ENABLED=True)
+    def test_streams_are_limited_per_process(self):
+        first, second = self.open_stream(), self.open_stream()
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        refused = self.open_stream()
+        self.assertEqual(refused.status_code, 503)
+        self.assertIn("Retry-After", refused)
+
+        #? Closing a response gives its slot back, even when it was never read
+        first.close()
+        self.assertEqual(self.open_stream().status_code, 200)
+
+
+class StageDeadlineTests(SimpleTestCase):
+    @override_settings(HTTP_CONNECT_TIMEOUT=10, HTTP_READ_TIMEOUT=300)
+    def test_request_timeout_is_cut_to_the_stage_deadline(self):
+        self.assertEqual(http_clients.request_timeout(), (10, 300))
+        with http_clients.deadline_scope(time.monotonic() + 5):
+            connect, read = http_clients.request_timeout()
+            self.assertLessEqual(read, 5)
+            self.assertEqual(connect, read)
+        with http_clients.deadline_scope(time.monotonic() - 1):
+            with self.assertRaises(TimeoutError):
+                http_clients.request_timeout()
+
+    def test_pool_threads_keep_the_deadline_of_the_caller(self):
+        deadline = time.monotonic() + 60
+        seen = []
+        with http_clients.deadline_scope(deadline):
+            worker = threading.Thread(target=http_clients.carry_deadline(
+                lambda: seen.append(http_clients._deadline.get())
+            ))
+        worker.start()
+        worker.join()
+        self.assertEqual(seen, [deadline])
+
+    def test_timed_out_stage_is_waited_for(self):
+        finished = threading.Event()
+
+        def slow():
+            time.sleep(0.3)
+            finished.set()
+
+        scheduler = StageScheduler([Stage("stt", slow, timeout=0.05)], lambda *args: None)
+        with self.assertRaises(StageTimeout):
+            scheduler.run({})
+        #? The retry of the task starts after run() raised, the stage must not still be running then
+        self.assertTrue(finished.is_set())
+
+
+@override_settings(STT_TRANSCODE=True, STT_TRANSCODE_FORMAT="opus")
+class PrepareForUploadTests(SimpleTestCase):
+    def setUp(self):
+        for target, value in (("ffmpeg_available", True), ("record_transcode", None), ("record_transcode_failure", None)):
+            patcher = mock.patch.object(audio_transcoder, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def transcoded(self, output_bytes):
+        return audio_transcoder.TranscodeResult("/tmp/a_stt.ogg", 1000, output_bytes, 0.5, 2.0)
+
+    def test_smaller_file_is_uploaded_and_recorded(self):
+        result = self.transcoded(250)
+        with mock.patch.object(audio_transcoder, "transcode_for_stt", return_value=result):
+            self.assertEqual(audio_transcoder.prepare_for_upload("/tmp/a.wav"), (result.path, result.path))
+        audio_transcoder.record_transcode.assert_called_once_with("opus", result, True)
+
+    def test_larger_file_is_dropped_and_recorded_as_unused(self):
+        result = self.transcoded(1200)
+        with mock.patch.object(audio_transcoder, "transcode_for_stt", return_value=result), \
+                mock.patch.object(audio_transcoder.os, "remove") as remove:
+            self.assertEqual(audio_transcoder.prepare_for_upload("/tmp/a.wav"), ("/tmp/a.wav", None))
+        remove.assert_called_once_with(result.path)
+        audio_transcoder.record_transcode.assert_called_once_with("opus", result, False)
+
+    def test_failure_uploads_the_original(self):
+        with mock.patch.object(audio_transcoder, "transcode_for_stt", side_effect=RuntimeError("ffmpeg exited 1")):
+            self.assertEqual(audio_transcoder.prepare_for_upload("/tmp/a.wav"), ("/tmp/a.wav", None))
+        audio_transcoder.record_transcode_failure.assert_called_once_with("opus")
+
+    @override_settings(STT_TRANSCODE=False)
+    def test_original_is_uploaded_when_disabled(self):
+        self.assertEqual(audio_transcoder.prepare_for_upload("/tmp/a.wav"), ("/tmp/a.wav", None))
+        audio_transcoder.ffmpeg_available.assert_not_called()
+
+
+class OfflineTokenCountTests(SimpleTestCase):
+    def setUp(self):
+        #? tiktoken downloads its encoding on first use, as if the host had no internet access
+        patchers = [mock.patch.object(text_splitter, "_encoding", None)]
+        if importlib.util.find_spec("tiktoken"):
+            patchers.append(mock.patch("tiktoken.encoding_for_model", side_effect=ConnectionError("no network")))
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_counts_four_characters_per_token(self):
+        self.assertEqual(TextSplitter.count_tokens("a" * 40), 10)
+        self.assertEqual(TextSplitter.count_tokens("a" * 41), 11)
+        self.assertIsInstance(text_splitter._encoding, text_splitter.CharacterEncoding)
+
+    def test_windows_overlap_and_cover_the_text(self):
+        text = "".join(str(index % 10) for index in range(100))
+        windows = TextSplitter.split_into_token_windows(text, 10, overlap_tokens=2)
+        self.assertTrue(all(len(window) <= 40 for window in windows))
+        self.assertEqual(windows[0][-8:], windows[1][:8])
+        self.assertTrue(text.endswith(windows[-1]))
+
+
+class TranscriptCacheTests(SimpleTestCase):
+    def test_streamed_audio_bypasses_the_cache(self):
+        strategy, cache = mock.Mock(supports_streaming=True), mock.Mock()
+        strategy.convert_stream_to_text.return_value = "hello"
+        cached = CachedSpeechToText(strategy, cache, "en")
+        self.assertEqual(cached.convert_stream_to_text(iter([b"abc"]), "audio/ogg"), "hello")
+        self.assertEqual(cache.mock_calls, [])
+
+    def test_mongo_collection_is_looked_up_on_every_call(self):
+        databases = [mock.MagicMock(), mock.MagicMock()]
+        with mock.patch("ai_processor.mongo.get_database", side_effect=databases):
+            cache = MongoTranscriptCache("transcript_cache", 1024)
+            #? As after a fork: the next call gets the client of the new process
+            cache.record(hit=True)
+        databases[0].__getitem__.return_value.create_index.assert_called_once_with("last_used")
+        databases[1].__getitem__.return_value.update_one.assert_called_once()
+
+
+class PooledTaskDispatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.connection = mock.Mock()
+        #? Callbacks meant for the connection thread run right away
+        self.connection.add_callback_threadsafe.side_effect = lambda callback: callback()
+        self.executors = []
+        patcher = mock.patch.object(Consumer.PooledTaskDispatcher, "_new_executor", side_effect=self.new_executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(Consumer, "settle_delivery")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dispatcher = Consumer.PooledTaskDispatcher(self.connection, mock.Mock(is_open=True), 1, "process")
+
+    def new_executor(self):
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda *args: Future()
+        self.executors.append(executor)
+        return executor
+
+    def deliver(self, tag):
+        self.dispatcher.on_message(None, mock.Mock(delivery_tag=tag), mock.Mock(headers={}, priority=0), b"{}")
+
+    def test_dead_worker_process_retries_the_task_and_replaces_the_pool(self):
+        self.deliver(1)
+        self.deliver(2)
+        broken = self.executors[0]
+        for future in list(self.dispatcher.pending):
+            future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+
+        self.assertEqual(len(self.executors), 2)
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        outcomes = [call.args[4] for call in Consumer.settle_delivery.mock_calls]
+        self.assertEqual(len(outcomes), 2)
+        self.assertTrue(all(outcome.retryable for outcome in outcomes))
+        self.assertEqual(self.dispatcher.pending, set())
+
+    def test_submit_to_a_broken_pool_goes_to_a_new_one(self):
+        self.executors[0].submit.side_effect = BrokenProcessPool("broken")
+        self.deliver(1)
+        self.assertEqual(len(self.executors), 2)
+        self.executors[1].submit.assert_called_once()
+        self.assertEqual(len(self.dispatcher.pending), 1)
+
+
+@override_settings(RETRY_MAX_ATTEMPTS=4, RETRY_BASE_DELAY_SECONDS=15, RETRY_BACKOFF_FACTOR=4)
+class FailureRouteTests(SimpleTestCase):
+    def test_retry_delays_back_off(self):
+        self.assertEqual(retry_delays(), [15, 60, 240])
+
+    def test_retryable_failures_go_through_the_retry_queues(self):
+        queues = []
+        headers = {"x-enqueued-at": 1}
+        for _ in range(3):
+            queue, headers = failure_route(headers, TaskOutcome(False, True, "timeout"))
+            queues.append(queue)
+        self.assertEqual(queues, ["audio_queue.retry.15s", "audio_queue.retry.60s", "audio_queue.retry.240s"])
+        self.assertEqual(headers[ATTEMPT_HEADER], 3)
+        self.assertEqual(headers["x-enqueued-at"], 1)
+
+    def test_out_of_attempts_goes_to_the_dead_letter_queue(self):
+        queue, headers = failure_route({ATTEMPT_HEADER: 3}, TaskOutcome(False, True, "timeout"))
+        self.assertEqual(queue, DEAD_LETTER_QUEUE)
+        self.assertEqual(headers[DEAD_REASON_HEADER], "max_attempts")
+
+    def test_permanent_failures_are_not_retried(self):
+        queue, headers = failure_route(None, TaskOutcome(False, False, "x" * 600))
+        self.assertEqual(queue, DEAD_LETTER_QUEUE)
+        self.assertEqual(headers[DEAD_REASON_HEADER], "permanent")
+        self.assertEqual(headers[ATTEMPT_HEADER], 1)
+        self.assertEqual(len(headers[LAST_ERROR_HEADER]), 500)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("20ms"), 0.02)
+        self.assertEqual(parse_duration("6m0s"), 360)
+        self.assertEqual(parse_duration("1h2m3.5s"), 3723.5)
+        self.assertEqual(parse_duration("7"), 7)
+        self.assertIsNone(parse_duration(None))
+        self.assertIsNone(parse_duration("soon"))
+
+    def test_buckets_start_full_and_refill_over_time(self):
+        state = _new_state(0.0)
+        limits = {"requests": 60}
+        for _ in range(60):
+            self.assertEqual(_take(state, limits, {"requests": 1}, 0.0), 0.0)
+        #? Empty, one request comes back every second
+        self.assertAlmostEqual(_take(state, limits, {"requests": 1}, 0.0), 1.0)
+        self.assertAlmostEqual(_take(state, limits, {"requests": 1}, 0.5), 0.5)
+        self.assertEqual(_take(state, limits, {"requests": 1}, 1.0), 0.0)
+
+    def test_refill_stops_at_the_limit(self):
+        state = _new_state(0.0)
+        _take(state, {"tokens": 600}, {"tokens": 600}, 0.0)
+        _take(state, {"tokens": 600}, {"tokens": 0}, 3600.0)
+        self.assertEqual(state["levels"]["tokens"], 600)
+
+    def test_request_larger_than_the_bucket_waits_for_a_full_bucket(self):
+        state = _new_state(0.0)
+        limits = {"tokens": 1000}
+        self.assertEqual(_take(state, limits, {"tokens": 400}, 0.0), 0.0)
+        self.assertAlmostEqual(_take(state, limits, {"tokens": 5000}, 0.0), 24.0)
+        self.assertEqual(_take(state, limits, {"tokens": 5000}, 24.0), 0.0)
+        self.assertAlmostEqual(state["levels"]["tokens"], 0.0)
+
+    def test_pause_blocks_until_it_is_over(self):
+        state = _new_state(0.0)
+        state["paused_until"] = 10.0
+        self.assertEqual(_take(state, {"requests": 60}, {"requests": 1}, 4.0), 6.0)
+        self.assertEqual(_take(state, {"requests": 60}, {"requests": 1}, 10.0), 0.0)
+
+    def test_headers_never_raise_the_configured_limits(self):
+        limiter = ProviderRateLimiter("openai", LocalBucketStore(), rpm=100, tpm=1000)
+        limiter.observe(mock.Mock(status_code=200, headers={
+            "x-ratelimit-limit-requests": "5000", "x-ratelimit-limit-tokens": "500",
+        }))
+        self.assertEqual((limiter.rpm, limiter.tpm), (100, 500))
+
+    def test_429_pauses_the_key(self):
+        store = LocalBucketStore()
+        limiter = ProviderRateLimiter("openai", store, rpm=100)
+        with mock.patch("ai_processor.Processor.rate_limiter.time.time", return_value=1000.0):
+            limiter.observe(mock.Mock(status_code=429, headers={"retry-after": "20"}))
+        self.assertEqual(store.take("openai", limiter.limits(), {"requests": 1}, 1005.0), 15.0)
+
+
+class AudioChunkingTests(SimpleTestCase):
+    def test_short_audio_is_one_segment(self):
+        self.assertEqual(plan_segments(300.0, [(100.0, 101.0)], 600, 30), [(0.0, 300.0)])
+
+    def test_cuts_in_the_last_silence_of_each_window(self):
+        silences = [(200.0, 202.0), (500.0, 504.0), (900.0, 902.0), (1190.0, 1192.0)]
+        self.assertEqual(plan_segments(1500.0, silences, 600, 30), [(0.0, 502.0), (502.0, 901.0), (901.0, 1500.0)])
+
+    def test_cuts_at_the_window_edge_without_a_usable_silence(self):
+        self.assertEqual(plan_segments(1500.0, [], 600, 30), [(0.0, 600.0), (600.0, 1200.0), (1200.0, 1500.0)])
+        #? A silence closer than min_chunk_seconds to the start would make a tiny segment
+        self.assertEqual(plan_segments(700.0, [(10.0, 12.0)], 600, 30), [(0.0, 600.0), (600.0, 700.0)])
+
+    def test_segments_are_stitched_in_order_with_their_offsets(self):
+        chunks = [AudioChunk(index, start, end, None) for index, (start, end) in enumerate([(0.0, 502.0), (502.0, 901.25)])]
+        strategy = mock.Mock()
+        strategy.convert_speech_to_text.side_effect = lambda path: {"/tmp/0.ogg": " hello ", "/tmp/1.ogg": "world"}[path]
+        with mock.patch("ai_processor.Processor.Speech_to_text_component.split_on_silence", return_value=chunks), \
+                mock.patch("ai_processor.Processor.Speech_to_text_component.export_chunk",
+                           side_effect=lambda path, chunk, out_dir: f"/tmp/{chunk.index}.ogg"), \
+                mock.patch("ai_processor.Processor.Speech_to_text_component.tempfile.mkdtemp", return_value="/tmp/chunks"), \
+                mock.patch("ai_processor.Processor.Speech_to_text_component.shutil.rmtree"):
+            transcript = ChunkedSpeechToText(strategy, max_workers=2).convert_speech_to_text("/tmp/meeting.wav")
+
+        self.assertIsInstance(transcript, Transcript)
+        self.assertEqual(transcript, "hello world")
+        self.assertEqual(transcript.segments, [
+            {"start": 0.0, "end": 502.0, "text": "hello"},
+            {"start": 502.0, "end": 901.25, "text": "world"},
+        ])
+
+    def test_unsplit_audio_is_a_plain_transcript(self):
+        transcript = stitch_segments([{"start": 0.0, "end": None, "text": " hello world "}])
+        self.assertEqual(transcript, "hello world")
+        self.assertNotIsInstance(transcript, Transcript)
+
+
+class ReportQueryTests(SimpleTestCase):
+    def test_all_fields_by_default(self):
+        self.assertEqual(selected_fields({}), list(REPORT_FIELDS))
+
+    def test_selected_fields_keep_their_order_once(self):
+        self.assertEqual(selected_fields({"fields": "key_points, summary,key_points"}), ["key_points", "summary"])
+
+    def test_unknown_or_empty_fields_are_refused(self):
+        for fields in ("summary,audio", " , "):
+            with self.assertRaises(InvalidReportQuery, msg=fields):
+                selected_fields({"fields": fields})
+
+    @override_settings(REPORT_TRANSCRIPT_PAGE_CHARS=20, REPORT_TRANSCRIPT_MAX_PAGE_CHARS=50)
+    def test_paging_params(self):
+        self.assertIsNone(paging_params({}))
+        self.assertEqual(paging_params({"transcript_cursor": "40"}), (40, 20))
+        self.assertEqual(paging_params({"transcript_limit": "500"}), (0, 50))
+        for params in ({"transcript_cursor": "x"}, {"transcript_cursor": "-1"}, {"transcript_limit": "0"}):
+            with self.assertRaises(InvalidReportQuery, msg=params):
+                paging_params(params)
+
+    def test_pages_end_on_whitespace_and_cover_the_transcript(self):
+        transcript = "the budget is approved and hiring starts on monday"
+        pages, cursor = [], 0
+        while cursor is not None:
+            page, cursor = transcript_page(transcript, cursor, 12)
+            pages.append(page)
+        self.assertEqual("".join(pages), transcript)
+        self.assertTrue(all(page.endswith(" ") for page in pages[:-1]))
+        self.assertTrue(all(len(page) <= 12 for page in pages))
+
+    def test_single_long_word_is_cut(self):
+        self.assertEqual(transcript_page("supercalifragilistic words", 0, 5), ("super", 5))
+
+    def test_cursor_past_the_end(self):
+        self.assertEqual(transcript_page("hello", 10, 5), ("", None))
+
+
+class StatusCacheTests(SimpleTestCase):
+    def test_fresh_entries_only(self):
+        cache = StatusCache()
+        with mock.patch("ai_processor.Processor.status_events.time.monotonic", side_effect=[100.0, 105.0, 112.0]):
+            cache.set("a", "STT_PROCESSED")
+            self.assertEqual(cache.get("a", max_age=10), "STT_PROCESSED")
+            self.assertIsNone(cache.get("a", max_age=10))
+        self.assertIsNone(cache.get("missing", max_age=10))
+
+    def test_least_recently_set_entries_are_dropped(self):
+        cache = StatusCache(max_entries=2)
+        cache.set("a", "ON_QUEUE")
+        cache.set("b", "ON_QUEUE")
+        cache.set("a", "STT_PROCESSED")
+        cache.set("c", "ON_QUEUE")
+        self.assertIsNone(cache.get("b", max_age=60))
+        self.assertEqual(cache.get("a", max_age=60), "STT_PROCESSED")
+        self.assertEqual(cache.get("c", max_age=60), "ON_QUEUE")
+
+
+@override_settings(API_KEYS_SERVICE="test-key", STATUS_EVENTS_ENABLED=False)
+class StatusETagTests(SimpleTestCase):
+    def test_etag_follows_the_status(self):
+        self.assertEqual(Status._status_etag("COMPLETED"), '"COMPLETED"')
+        self.assertNotEqual(Status._status_etag("COMPLETED"), Status._status_etag("ON_QUEUE"))
+
+    def test_if_none_match_uses_weak_comparison(self):
+        etag = Status._status_etag("ON_QUEUE")
+        for header in ('"ON_QUEUE"', 'W/"ON_QUEUE"', '"FAILED", "ON_QUEUE"', "*"):
+            self.assertTrue(Status._etag_matches(header, etag), header)
+        for header in (None, "", '"STT_PROCESSED"'):
+            self.assertFalse(Status._etag_matches(header, etag), header)
+
+    def get_status(self, **headers):
+        request = RequestFactory().get("/status/", HTTP_X_API_KEY="test-key", **headers)
+        with mock.patch.object(Status, "read_status", return_value="ON_QUEUE"):
+            return Status.StatusAPIView.as_view()(request, audio_token=uuid.uuid4())
+
+    def test_unchanged_status_is_not_modified(self):
+        first = self.get_status()
+        self.assertEqual(first.status_code, 200)
+        second = self.get_status(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_cached_status_spares_the_database(self):
+        audio_token = uuid.uuid4()
+        with mock.patch.object(Status, "get_status_cache", return_value=StatusCache()), \
+                mock.patch.object(Status.repository, "get_status", return_value="ON_QUEUE") as get_status:
+            self.assertEqual(Status.read_status(audio_token), "ON_QUEUE")
+            self.assertEqual(Status.read_status(audio_token), "ON_QUEUE")
+        get_status.assert_called_once_with(audio_token)
@@ -1,13 +1,16 @@
 from django.urls import path
-from ai_processor.Views.Status import StatusAPIView
+from ai_processor.Views.Status import StatusAPIView, StatusEventsAPIView
 from ai_processor.Views.Report import ReportAPIView
 from ai_processor.Views.Audios import (
-    SubmitAudioAPIView
+    SubmitAudioAPIView,
+    SubmitAudioBatchAPIView
 )
 
 urlpatterns = [
     path('submit_audio/', SubmitAudioAPIView.as_view(), name='submit_audio'),
+    path('submit_audio_batch/', SubmitAudioBatchAPIView.as_view(), name='submit_audio_batch'),
     path('status/<uuid:audio_token>/', StatusAPIView.as_view(), name='audio-status'),
+    path('status/<uuid:audio_token>/events/', StatusEventsAPIView.as_view(), name='audio-status-events'),
     path('report/<uuid:audio_token>/', ReportAPIView.as_view(), name='audio-report'),
 ]
 
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import json
 from dotenv import load_dotenv
 from .migration_skipping import DisableMigrations
 
@@ -12,12 +13,149 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 API_KEYS_SERVICE = os.getenv("API_KEYS_SERVICE")
 SECRET_KEY = os.getenv("SECRET_KEY", "default-secret-key")  # Provide fallback for SECRET_KEY
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+DEEPGRAM_BASE_URL = os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
 
 # Create audios folder if not exists
 AUDIOS_FOLDER = os.path.join(BASE_DIR, 'audios')
 os.makedirs(AUDIOS_FOLDER, exist_ok=True)
 
+# RabbitMQ
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
+
+# Audio queue producer
+PRODUCER_POOL_SIZE = int(os.getenv("PRODUCER_POOL_SIZE", "4"))  # Connections kept open per web process
+PRODUCER_CONFIRM_DELIVERY = os.getenv("PRODUCER_CONFIRM_DELIVERY", "true").lower() == "true"
+
+SUBMIT_BATCH_MAX_ITEMS = int(os.getenv("SUBMIT_BATCH_MAX_ITEMS", "1000"))  # Items accepted by submit_audio_batch/
+
+# Priorities of the audio tasks, higher ones are delivered first
+AUDIO_QUEUE_MAX_PRIORITY = int(os.getenv("AUDIO_QUEUE_MAX_PRIORITY", "0"))  # 0 keeps audio_queue a plain FIFO queue, see Queue/topology.py before changing it
+PLAN_PRIORITIES = json.loads(os.getenv("PLAN_PRIORITIES", '{"premium": 6, "base": 2}'))
+DEFAULT_PLAN_PRIORITY = int(os.getenv("DEFAULT_PLAN_PRIORITY", "2"))  # Plans missing from PLAN_PRIORITIES
+SHORT_MEETING_SECONDS = int(os.getenv("SHORT_MEETING_SECONDS", "900"))  # Meetings up to this long get the boost below
+SHORT_MEETING_PRIORITY_BOOST = int(os.getenv("SHORT_MEETING_PRIORITY_BOOST", "2"))
+QUEUE_WAIT_METRICS = os.getenv("QUEUE_WAIT_METRICS", "true").lower() == "true"
+QUEUE_WAIT_METRICS_COLLECTION = os.getenv("QUEUE_WAIT_METRICS_COLLECTION", "queue_wait_metrics")
+
+# Audio queue consumer
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "1"))  # Tasks processed at once per consumer
+CONSUMER_POOL = os.getenv("CONSUMER_POOL", "thread")  # "thread" or "process"
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "blocking")  # "blocking" (pika) or "async" (aio-pika)
+
+# Stream the download straight into the STT upload when the strategy supports it,
+# otherwise the audio is saved to AUDIOS_FOLDER first. Streamed audio bypasses the transcript cache.
+STT_STREAMING = os.getenv("STT_STREAMING", "false").lower() == "true"
+
+# Chunked speech to text
+STT_CHUNKING_LANGUAGES = [lang for lang in os.getenv("STT_CHUNKING_LANGUAGES", "ar").split(",") if lang]  # e.g. "ar,en"
+STT_CHUNK_MAX_SECONDS = int(os.getenv("STT_CHUNK_MAX_SECONDS", "600"))
+STT_CHUNK_MAX_BYTES = int(os.getenv("STT_CHUNK_MAX_BYTES", str(24 * 1024 * 1024)))  # Whisper rejects uploads over 25 MB
+STT_CHUNK_WORKERS = int(os.getenv("STT_CHUNK_WORKERS", "4"))  # Segments transcribed at once per meeting
+
+# Transcoding of the downloaded audio before the STT upload (needs ffmpeg, skipped without it)
+STT_TRANSCODE = os.getenv("STT_TRANSCODE", "false").lower() == "true"
+STT_TRANSCODE_FORMAT = os.getenv("STT_TRANSCODE_FORMAT", "opus")  # "opus" (lossy, smallest) or "flac" (lossless)
+STT_TRANSCODE_BITRATE = os.getenv("STT_TRANSCODE_BITRATE", "32k")  # Opus only, plenty for 16 kHz speech
+STT_TRIM_SILENCE = os.getenv("STT_TRIM_SILENCE", "false").lower() == "true"  # Cut leading / trailing silence
+STT_TRIM_SILENCE_NOISE_DB = int(os.getenv("STT_TRIM_SILENCE_NOISE_DB", "-40"))
+STT_TRIM_SILENCE_MIN_SECONDS = float(os.getenv("STT_TRIM_SILENCE_MIN_SECONDS", "1.0"))
+TRANSCODE_METRICS_COLLECTION = os.getenv("TRANSCODE_METRICS_COLLECTION", "transcode_metrics")  # manage.py transcode_stats
+
+# Pipeline stages, independent stages run at the same time. A timeout of 0 means no limit.
+PIPELINE_STAGE_WORKERS = int(os.getenv("PIPELINE_STAGE_WORKERS", "4"))  # Threads per task in the blocking consumer
+PIPELINE_STAGE_TIMEOUTS = {
+    "stt": int(os.getenv("STT_STAGE_TIMEOUT_SECONDS", "3600")),
+    "summary": int(os.getenv("SUMMARY_STAGE_TIMEOUT_SECONDS", "900")),
+    "key_points": int(os.getenv("KEY_POINTS_STAGE_TIMEOUT_SECONDS", "600")),
+}
+
+# Premium tasks get summary and key points from one structured OpenAI call
+PREMIUM_STRUCTURED_DIGEST = os.getenv("PREMIUM_STRUCTURED_DIGEST", "true").lower() == "true"
+
+# Premium summaries of transcripts longer than one window are summarized per window, then combined
+SUMMARY_MAP_REDUCE = os.getenv("SUMMARY_MAP_REDUCE", "true").lower() == "true"
+SUMMARY_WINDOW_TOKENS = int(os.getenv("SUMMARY_WINDOW_TOKENS", "6000"))
+SUMMARY_WINDOW_OVERLAP_TOKENS = int(os.getenv("SUMMARY_WINDOW_OVERLAP_TOKENS", "200"))
+SUMMARY_MAP_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "4"))  # Windows summarized at once by the blocking consumer
+
+# Basic plan summaries: "deepgram" (/v1/read) or "local" (extractive, on the worker CPU)
+BASIC_SUMMARY_ENGINE = os.getenv("BASIC_SUMMARY_ENGINE", "deepgram").lower()
+LOCAL_SUMMARY_MODEL = os.getenv("LOCAL_SUMMARY_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+#? torch threads per process, keep threads x process pool workers <= cores
+LOCAL_SUMMARY_THREADS = int(os.getenv("LOCAL_SUMMARY_THREADS", str(min(4, os.cpu_count() or 1))))
+LOCAL_SUMMARY_BATCH_SIZE = int(os.getenv("LOCAL_SUMMARY_BATCH_SIZE", "32"))  # Sentences embedded per forward pass
+LOCAL_SUMMARY_WARM_UP = os.getenv("LOCAL_SUMMARY_WARM_UP", "true").lower() == "true"  # Load the model when a worker starts
+
+# Transcript cache, keyed by audio content hash + STT strategy + language
+TRANSCRIPT_CACHE_BACKEND = os.getenv("TRANSCRIPT_CACHE_BACKEND", "disk")  # "disk", "mongo" or "off"
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+TRANSCRIPT_CACHE_FOLDER = os.getenv("TRANSCRIPT_CACHE_FOLDER", os.path.join(BASE_DIR, 'transcript_cache'))
+TRANSCRIPT_CACHE_COLLECTION = os.getenv("TRANSCRIPT_CACHE_COLLECTION", "transcript_cache")
+
+# Retries of failed audio tasks: delay before retry n is RETRY_BASE_DELAY_SECONDS * RETRY_BACKOFF_FACTOR ** (n - 1)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))  # Including the first attempt
+RETRY_BASE_DELAY_SECONDS = int(os.getenv("RETRY_BASE_DELAY_SECONDS", "15"))
+RETRY_BACKOFF_FACTOR = int(os.getenv("RETRY_BACKOFF_FACTOR", "4"))
+
+# Keep-alive HTTP clients shared by the strategies of a process, one pool per host
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))  # Long uploads and transcriptions
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"  # Only used when h2 is installed
+
+# Provider rate limits shared by every strategy, 0 means unlimited.
+# "mongo" shares the buckets between all consumer processes and hosts, "local" keeps them per process.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_COLLECTION = os.getenv("RATE_LIMIT_COLLECTION", "provider_rate_limits")
+PROVIDER_RATE_LIMITS = {
+    "openai": {  # gpt-4o-mini chat completions
+        "rpm": int(os.getenv("OPENAI_RPM", "500")),
+        "tpm": int(os.getenv("OPENAI_TPM", "200000")),
+    },
+    "openai-whisper": {  # whisper-1 transcriptions
+        "rpm": int(os.getenv("OPENAI_WHISPER_RPM", "50")),
+    },
+    "deepgram": {  # /v1/listen and /v1/read
+        "rpm": int(os.getenv("DEEPGRAM_RPM", "600")),
+    },
+}
+
+# Status events: webhooks and the SSE / long-poll status endpoints
+STATUS_EVENTS_ENABLED = os.getenv("STATUS_EVENTS_ENABLED", "true").lower() == "true"
+STATUS_BROKER_MAX_ENTRIES = int(os.getenv("STATUS_BROKER_MAX_ENTRIES", "10000"))  # Tasks whose last event a web process remembers
+STATUS_LONG_POLL_MAX_SECONDS = float(os.getenv("STATUS_LONG_POLL_MAX_SECONDS", "30"))
+# Every SSE stream holds a worker thread for its whole length: keep streams short and few per
+# process, and serve status/<token>/events/ from a threaded or ASGI server to allow more of them
+STATUS_SSE_MAX_SECONDS = float(os.getenv("STATUS_SSE_MAX_SECONDS", "60"))
+STATUS_SSE_MAX_STREAMS = int(os.getenv("STATUS_SSE_MAX_STREAMS", "4"))  # Open streams per web process, more get a 503
+STATUS_SSE_KEEPALIVE_SECONDS = float(os.getenv("STATUS_SSE_KEEPALIVE_SECONDS", "15"))
+STATUS_POLL_FALLBACK_SECONDS = float(os.getenv("STATUS_POLL_FALLBACK_SECONDS", "2"))  # While RabbitMQ is unreachable
+STATUS_CACHE_TTL_SECONDS = float(os.getenv("STATUS_CACHE_TTL_SECONDS", "60"))  # While status events are received
+STATUS_CACHE_FALLBACK_TTL_SECONDS = float(os.getenv("STATUS_CACHE_FALLBACK_TTL_SECONDS", "2"))  # Without them
+WEBHOOK_SIGNING_SECRET = os.getenv("WEBHOOK_SIGNING_SECRET")
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_PREFETCH = int(os.getenv("WEBHOOK_PREFETCH", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "6"))
+WEBHOOK_RETRY_BASE_DELAY_SECONDS = int(os.getenv("WEBHOOK_RETRY_BASE_DELAY_SECONDS", "10"))
+WEBHOOK_RETRY_BACKOFF_FACTOR = int(os.getenv("WEBHOOK_RETRY_BACKOFF_FACTOR", "3"))
+# Hosts webhooks may reach even on private addresses, e.g. "hooks.internal,.corp.example.com"
+WEBHOOK_ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+WEBHOOK_ALLOWED_HOSTS_ONLY = os.getenv("WEBHOOK_ALLOWED_HOSTS_ONLY", "false").lower() == "true"  # Refuse every other host
+
+# Async pipeline
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "200"))  # Meetings held by one event loop
+ASYNC_DEFAULT_PROVIDER_CONCURRENCY = int(os.getenv("ASYNC_DEFAULT_PROVIDER_CONCURRENCY", "20"))
+ASYNC_PROVIDER_CONCURRENCY = {
+    "deepgram": int(os.getenv("ASYNC_DEEPGRAM_CONCURRENCY", "50")),
+    "openai": int(os.getenv("ASYNC_OPENAI_CONCURRENCY", "50")),
+}
+
 # Security Settings
 DEBUG = True  # Set to False in production
 ALLOWED_HOSTS = [
@@ -45,9 +183,18 @@ MIGRATION_MODULES = DisableMigrations()
 # Middleware
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ai_processor.middleware.CompressionMiddleware',  # Must stay before ConditionalGetMiddleware
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # Strong ETags and 304s for GETs
 ]
 
+# Response compression and report paging
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))  # Only used when brotli is installed
+REPORT_TRANSCRIPT_PAGE_CHARS = int(os.getenv("REPORT_TRANSCRIPT_PAGE_CHARS", "20000"))
+REPORT_TRANSCRIPT_MAX_PAGE_CHARS = int(os.getenv("REPORT_TRANSCRIPT_MAX_PAGE_CHARS", "100000"))
+
 # Rest Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -71,6 +218,8 @@ DATABASES = {
     }
 }
 
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))  # Pool of the shared pymongo client
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
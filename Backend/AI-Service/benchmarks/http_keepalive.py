@@ -0,0 +1,138 @@
+"""
+Per call latency of a new connection per request (what the strategies used to
+do) against the shared keep-alive clients of ai_processor.Processor.http_clients.
+
+Usage, from Backend/AI-Service:
+    python benchmarks/http_keepalive.py                      # local HTTP server
+    python benchmarks/http_keepalive.py --url https://api.deepgram.com/v1/projects --calls 20
+
+Against a local server only the TCP handshake is saved, against a real HTTPS
+provider the DNS lookup and the TLS handshake are saved too.
+"""
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+
+import django  # noqa: E402
+django.setup()
+
+import httpx  # noqa: E402
+import requests  # noqa: E402
+from ai_processor.Processor.http_clients import get_session, get_async_client, request_timeout  # noqa: E402
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    #? Without it headers and body go out as two packets and delayed ACKs add ~40 ms to kept-alive calls
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"ok": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/read"
+
+
+def timed(call, calls):
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+async def timed_async(call, calls):
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def run(url, calls):
+    payload = {"text": "benchmark"}
+
+    def new_connection():
+        requests.post(url, json=payload, timeout=request_timeout())
+
+    def pooled():
+        get_session(url).post(url, json=payload, timeout=request_timeout())
+
+    async def async_new_client():
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=payload)
+
+    async def async_pooled():
+        await get_async_client(url).post(url, json=payload)
+
+    async def async_runs():
+        await async_pooled()  # open the pooled connection once, like the first message of a worker
+        return {
+            "httpx.AsyncClient per call": await timed_async(async_new_client, calls),
+            "get_async_client": await timed_async(async_pooled, calls),
+        }
+
+    pooled()  # same warm up for the requests session
+    results = {
+        "requests.post per call": timed(new_connection, calls),
+        "get_session": timed(pooled, calls),
+    }
+    results.update(asyncio.run(async_runs()))
+    return results
+
+
+def report(results):
+    print(f"{'client':<30}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, durations in results.items():
+        durations = sorted(durations)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        print(f"{name:<30}{statistics.mean(durations):>10.2f}{statistics.median(durations):>10.2f}{p95:>10.2f}")
+
+    saved = statistics.mean(results["requests.post per call"]) - statistics.mean(results["get_session"])
+    saved_async = statistics.mean(results["httpx.AsyncClient per call"]) - statistics.mean(results["get_async_client"])
+    print(f"\nsaved per call: {saved:.2f} ms (sync), {saved_async:.2f} ms (async)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Endpoint to POST to (default: a local HTTP server)")
+    parser.add_argument("--calls", type=int, default=200, help="Sequential calls per client")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_local_server()
+    try:
+        print(f"{args.calls} sequential POSTs to {url}\n")
+        report(run(url, args.calls))
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cold start of the web app and of the consumers: import time (python -X importtime),
+peak RSS and which heavy modules got loaded, each target in a fresh interpreter.
+
+Provider SDKs, torch and friends must only be imported when a task selects a
+strategy needing them (see ai_processor.Processor.strategy_registry). The
+script exits with 1 when a target imports one of them or goes over a limit,
+so it can guard the start up in CI.
+
+Usage, from Backend/AI-Service:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --max-ms 1500 --max-rss-mb 150 --json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "web": "ai_service.urls",
+    "consumer": "ai_processor.Queue.Consumer",
+    "async-consumer": "ai_processor.Queue.AsyncConsumer",
+}
+
+#? Only needed by some strategies, loaded on first use
+HEAVY_MODULES = ["openai", "deepgram", "torch", "transformers", "summarizer", "sklearn", "tiktoken", "pydantic"]
+
+CHILD = """
+import os, sys, json, time, resource
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+import django
+django.setup()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "elapsed_ms": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    #? Packages imported directly by the entry point or django.setup, by cumulative time
+    top_level = []
+    for line in result.stderr.splitlines():
+        found = IMPORTTIME_LINE.match(line)
+        if found and len(found.group(3)) <= 1:
+            top_level.append((int(found.group(2)) / 1000, found.group(4)))
+    stats["slowest"] = [
+        {"module": name, "cumulative_ms": round(ms, 1)}
+        for ms, name in sorted(top_level, reverse=True)[:top]
+    ]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help=f"Some of {', '.join(TARGETS)} (default: all of them)")
+    parser.add_argument("--max-ms", type=float, help="Fail when a target takes longer to import")
+    parser.add_argument("--max-rss-mb", type=float, help="Fail when a target uses more memory after its imports")
+    parser.add_argument("--allow-heavy", action="store_true", help="Don't fail on heavy modules")
+    parser.add_argument("--top", type=int, default=8, help="Slowest top level imports to list")
+    parser.add_argument("--json", action="store_true", help="Machine readable output")
+    args = parser.parse_args()
+    unknown = [target for target in args.targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets {', '.join(unknown)}")
+
+    results = {}
+    failures = []
+    for target in args.targets or list(TARGETS):
+        stats = measure(TARGETS[target], args.top)
+        results[target] = stats
+        if stats["heavy"] and not args.allow_heavy:
+            failures.append(f"{target} imports {', '.join(stats['heavy'])}")
+        if args.max_ms and stats["elapsed_ms"] > args.max_ms:
+            failures.append(f"{target} takes {stats['elapsed_ms']:.0f} ms to import (max {args.max_ms:.0f})")
+        if args.max_rss_mb and stats["rss_mb"] > args.max_rss_mb:
+            failures.append(f"{target} uses {stats['rss_mb']:.0f} MB (max {args.max_rss_mb:.0f})")
+
+    if args.json:
+        print(json.dumps({"results": results, "failures": failures}, indent=2))
+    else:
+        for target, stats in results.items():
+            print(f"{target} ({TARGETS[target]}): {stats['elapsed_ms']:.0f} ms, {stats['rss_mb']:.0f} MB RSS, "
+                  f"{stats['modules']} modules, heavy: {', '.join(stats['heavy']) or 'none'}")
+            for entry in stats["slowest"]:
+                print(f"    {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
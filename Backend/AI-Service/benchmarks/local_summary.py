@@ -0,0 +1,101 @@
+"""
+Basic plan summaries: LocalExtractiveSummarization (worker CPU) against
+BasicSummarization (Deepgram /v1/read), latency per call and throughput.
+
+The Deepgram path needs DEEPGRAM_API_KEY and is skipped without it. The model
+load of the local path is reported apart, the workers pay it once at start up.
+
+Usage, from Backend/AI-Service:
+    python benchmarks/local_summary.py --transcript meeting.txt --calls 10 --concurrency 4
+    LOCAL_SUMMARY_THREADS=2 python benchmarks/local_summary.py     # synthetic transcript
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from ai_processor.Processor import extractive_summarizer  # noqa: E402
+from ai_processor.Processor.Summarization_component import (  # noqa: E402
+    BasicSummarization,
+    LocalExtractiveSummarization,
+)
+
+TOPICS = ["the budget", "the release date", "hiring", "the customer feedback", "the roadmap", "testing"]
+
+
+def synthetic_transcript(words):
+    rng = random.Random(0)
+    sentences = []
+    count = 0
+    while count < words:
+        topic = rng.choice(TOPICS)
+        sentence = f"We talked about {topic} and {rng.choice(TOPICS)}, then agreed to review {topic} again next week."
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+def latency(strategy, transcript, calls):
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        strategy.summarize_text(transcript, "en")
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def throughput(strategy, transcript, calls, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: strategy.summarize_text(transcript, "en"), range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcript", help="Text file of a transcript (default: a synthetic one)")
+    parser.add_argument("--words", type=int, default=8000, help="Length of the synthetic transcript")
+    parser.add_argument("--calls", type=int, default=10, help="Summaries per measure")
+    parser.add_argument("--concurrency", type=int, default=4, help="Summaries at once for the throughput")
+    args = parser.parse_args()
+
+    if args.transcript:
+        with open(args.transcript, encoding="utf-8") as transcript_file:
+            transcript = transcript_file.read()
+    else:
+        transcript = synthetic_transcript(args.words)
+    print(f"transcript: {len(transcript.split())} words, {args.calls} calls, concurrency {args.concurrency}")
+    print(f"local model: {settings.LOCAL_SUMMARY_MODEL}, {settings.LOCAL_SUMMARY_THREADS} threads, "
+          f"batches of {settings.LOCAL_SUMMARY_BATCH_SIZE}\n")
+
+    start = time.perf_counter()
+    extractive_summarizer.get_sentence_encoder()
+    print(f"model load (once per worker process): {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    strategies = {"local extractive": LocalExtractiveSummarization()}
+    if settings.DEEPGRAM_API_KEY:
+        strategies["deepgram /v1/read"] = BasicSummarization()
+    else:
+        print("DEEPGRAM_API_KEY is not set, skipping the Deepgram path\n")
+
+    print(f"{'engine':<22}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'summaries/s':>14}")
+    for name, strategy in strategies.items():
+        strategy.summarize_text(transcript, "en")  # warm up, like a worker after its first task
+        durations = sorted(latency(strategy, transcript, args.calls))
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        rate = throughput(strategy, transcript, args.calls, args.concurrency)
+        print(f"{name:<22}{statistics.mean(durations):>10.0f}{statistics.median(durations):>10.0f}{p95:>10.0f}{rate:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
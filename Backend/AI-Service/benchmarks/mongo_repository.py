@@ -0,0 +1,117 @@
+"""
+Latency of the audio task queries through djongo (the ORM path the views and
+processors used) against ai_processor.repository (pymongo, projections, $set).
+
+Needs the MongoDB of ai_service.settings. The benchmark inserts its own tasks,
+tagged with a unique user_plan, and deletes them at the end.
+
+Usage, from Backend/AI-Service:
+    python manage.py ensure_indexes
+    python benchmarks/mongo_repository.py --tasks 200 --transcript-kb 200
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from ai_processor import repository  # noqa: E402
+from ai_processor.models import AudioProcessing  # noqa: E402
+
+
+def seed(count, transcript_kb, plan):
+    now = timezone.now()
+    transcript = ("lorem ipsum dolor sit amet " * (transcript_kb * 40))[:transcript_kb * 1024]
+    audio_tasks = [
+        AudioProcessing(
+            audio_token=uuid.uuid4(),
+            audio_url="https://example.com/benchmark.mp3",
+            transcript=transcript,
+            summarization="A short summary of the meeting. " * 20,
+            key_points=[f"key point {index}" for index in range(10)],
+            processing_status='COMPLETED',
+            main_language='en',
+            user_plan=plan,
+            created_at=now,
+            updated_at=now,
+        )
+        for _ in range(count)
+    ]
+    repository.insert_tasks(audio_tasks)
+    return [audio_task.audio_token for audio_task in audio_tasks]
+
+
+def timed(call, tokens):
+    durations = []
+    for token in tokens:
+        start = time.perf_counter()
+        call(token)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def run(tokens):
+    def djongo_status(token):
+        AudioProcessing.objects.filter(audio_token=token).values_list('processing_status', flat=True).first()
+
+    def djongo_summary(token):
+        AudioProcessing.objects.filter(audio_token=token).values('summarization', 'key_points').first()
+
+    def djongo_full(token):
+        AudioProcessing.objects.get(audio_token=token)
+
+    def djongo_stage_write(token):
+        audio_task = AudioProcessing.objects.get(audio_token=token)
+        audio_task.processing_status = 'COMPLETED'
+        audio_task.save()
+
+    def repository_stage_write(token):
+        repository.update_task(token, processing_status='COMPLETED')
+
+    return {
+        "status  djongo": timed(djongo_status, tokens),
+        "status  repository": timed(repository.get_status, tokens),
+        "summary djongo": timed(djongo_summary, tokens),
+        "summary repository": timed(lambda token: repository.find_task(token, ("summarization", "key_points")), tokens),
+        "full    djongo": timed(djongo_full, tokens),
+        "full    repository": timed(repository.get_task, tokens),
+        #? djongo needs the document to save it, the repository only sends the $set
+        "write   djongo get+save": timed(djongo_stage_write, tokens),
+        "write   repository": timed(repository_stage_write, tokens),
+    }
+
+
+def report(results):
+    print(f"{'query':<28}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, durations in results.items():
+        durations = sorted(durations)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        print(f"{name:<28}{statistics.mean(durations):>10.2f}{statistics.median(durations):>10.2f}{p95:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks inserted, each query runs once per task")
+    parser.add_argument("--transcript-kb", type=int, default=100, help="Transcript size of each task")
+    args = parser.parse_args()
+
+    plan = f"benchmark-{uuid.uuid4().hex[:8]}"
+    tokens = seed(args.tasks, args.transcript_kb, plan)
+    try:
+        run(tokens[:10])  # warm up the connection pools
+        print(f"{args.tasks} tasks with a {args.transcript_kb} KB transcript\n")
+        report(run(tokens))
+    finally:
+        repository.audio_collection().delete_many({"user_plan": plan})
+
+
+if __name__ == "__main__":
+    main()
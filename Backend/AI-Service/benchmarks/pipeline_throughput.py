@@ -0,0 +1,525 @@
+"""
+End to end throughput of the audio pipeline on one Linux box, against the
+local provider stubs of benchmarks/stub_providers.py: meetings per minute,
+p50 / p95 / p99 latency of each stage and of whole meetings, and worker RSS.
+
+Modes:
+    memory  (default) tasks go through an in-process queue and an in-memory task
+            store, --workers threads (or coroutines with CONSUMER_MODE=async)
+            run run_task / run_task_async of the real consumers. Retries are
+            requeued at once instead of waiting for the retry queues. Needs
+            neither RabbitMQ nor MongoDB.
+    broker  tasks go through the RabbitMQ and MongoDB of ai_service.settings and
+            are processed by --processes consumer processes, as in production.
+
+All the meetings download the same recording, so the transcript cache is
+turned off unless TRANSCRIPT_CACHE_BACKEND is set. Provider rate limits
+(OPENAI_RPM, DEEPGRAM_RPM, ...) and the other settings apply as usual.
+tiktoken downloads its encoding on first use, on a box without network copy
+it into TIKTOKEN_CACHE_DIR beforehand.
+
+Usage, from Backend/AI-Service:
+    python benchmarks/pipeline_throughput.py --meetings 200 --workers 8 --save baseline.json
+    CONSUMER_MODE=async python benchmarks/pipeline_throughput.py --meetings 200 --workers 50 --baseline baseline.json
+    python benchmarks/pipeline_throughput.py --mode broker --processes 2 --workers 4 --error-rate 0.05
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import queue
+import signal
+import asyncio
+import argparse
+import contextlib
+import collections
+import resource
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, "benchmarks", "stub_providers.py")
+sys.path.insert(0, ROOT)
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def rank(fraction):
+        return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+    return {"count": len(values), "p50": rank(0.5), "p95": rank(0.95), "p99": rank(0.99), "max": values[-1]}
+
+
+def rss_mb(pid="self"):
+    """
+    Resident memory of a process and of its children, from /proc.
+    """
+    total = 0
+    pids = [str(pid)]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            for thread in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{thread}/children") as children:
+                    pids.extend(children.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total / 1024
+
+
+def start_stubs(args):
+    command = [
+        sys.executable, STUBS,
+        "--port", "0",
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+        "--audio-seconds", str(args.audio_seconds),
+        "--transcript-words", str(args.transcript_words),
+    ]
+    if args.latency:
+        command += ["--latency", args.latency]
+    stubs = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = stubs.stdout.readline().strip().rsplit(" ", 1)[-1]
+    if not url.startswith("http"):
+        stubs.kill()
+        raise RuntimeError("stub_providers.py did not start")
+    return stubs, url
+
+
+def stub_stats(url):
+    with urllib.request.urlopen(f"{url}/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def configure_environment(args, stub_url):
+    #? Read by ai_service.settings, so before django.setup()
+    os.environ["DEEPGRAM_BASE_URL"] = stub_url
+    os.environ["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+    os.environ["DEEPGRAM_API_KEY"] = "stub"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ.setdefault("TRANSCRIPT_CACHE_BACKEND", "off")
+    if args.mode == "memory":
+        os.environ["STATUS_EVENTS_ENABLED"] = "false"
+    else:
+        os.environ["CONSUMER_WORKERS"] = str(args.workers)
+        os.environ["ASYNC_MAX_IN_FLIGHT"] = str(args.workers)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+    import django
+    django.setup()
+
+
+def new_meetings(args, stub_url):
+    """
+    Returns:
+        tuple: (AudioProcessing documents, task dicts to queue)
+    """
+    from django.utils import timezone
+    from ai_processor.models import AudioProcessing
+    from ai_processor.Queue.Producer import AudioQueueProducer
+
+    plans = args.plans.split(",")
+    documents = []
+    for index in range(args.meetings):
+        now = timezone.now()
+        documents.append(AudioProcessing(
+            audio_token=uuid.uuid4(),
+            audio_url=f"{stub_url}/audio/meeting.wav",
+            main_language=args.language,
+            user_plan=plans[index % len(plans)],
+            processing_status='ON_QUEUE',
+            key_points=[],
+            created_at=now,
+            updated_at=now,
+        ))
+    tasks = [
+        AudioQueueProducer.build_task(doc.audio_token, doc.audio_url, doc.main_language, doc.user_plan)
+        for doc in documents
+    ]
+    return documents, tasks
+
+
+class MemoryCollection:
+    """
+    The pymongo collection calls of ai_processor.repository used by the pipeline, on a dict.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def insert_many(self, documents, ordered=True):
+        with self.lock:
+            for document in documents:
+                self.documents[document["audio_token"]] = dict(document)
+
+    def find_one(self, query, projection=None):
+        with self.lock:
+            document = self.documents.get(query["audio_token"])
+            if document is None:
+                return None
+            fields = [name for name, keep in (projection or {}).items() if keep and name != "_id"]
+            return {name: document[name] for name in fields if name in document} if fields else dict(document)
+
+    def update_one(self, query, update):
+        with self.lock:
+            document = self.documents.get(query["audio_token"])
+            if document is not None:
+                document.update(update["$set"])
+        return SimpleNamespace(matched_count=int(document is not None))
+
+    def update_many(self, query, update):
+        for token in query["audio_token"]["$in"]:
+            self.update_one({"audio_token": token}, update)
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.meetings = []
+        self.waits = []
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = collections.Counter()
+        self.peak_rss_mb = 0.0
+
+    def stage(self, name, seconds, ok):
+        if ok:
+            with self.lock:
+                self.stages.setdefault(name, []).append(seconds)
+
+    def finished(self, ok, seconds):
+        with self.lock:
+            if ok:
+                self.completed += 1
+                self.meetings.append(seconds)
+            else:
+                self.failed += 1
+            return self.completed + self.failed
+
+
+def run_memory(args, tasks, results):
+    """
+    Process the tasks with the consumers' run_task / run_task_async, returns the wall time.
+    """
+    from django.conf import settings
+    from ai_processor.Queue.topology import will_retry
+
+    def arrival_delay(index):
+        #? Seconds until task index is due, --rate paces the submissions
+        return max(0.0, start + index / args.rate - time.perf_counter()) if args.rate else 0.0
+
+    def settle(outcome, attempt, enqueued):
+        if not outcome.ok:
+            with results.lock:
+                results.errors[(outcome.error or "")[:120]] += 1
+        if not outcome.ok and will_retry(attempt, outcome.retryable):
+            with results.lock:
+                results.retries += 1
+            return True
+        results.finished(outcome.ok, time.perf_counter() - enqueued)
+        return False
+
+    start = time.perf_counter()
+    if settings.CONSUMER_MODE == "async":
+        from ai_processor.Processor.Process_audio_callback import run_task_async
+        from ai_processor.Processor.http_clients import close_async_clients
+
+        async def main():
+            work = asyncio.Queue()
+
+            async def feed():
+                for index, task in enumerate(tasks):
+                    await asyncio.sleep(arrival_delay(index))
+                    work.put_nowait((json.dumps(task), 0, time.perf_counter()))
+
+            async def worker():
+                while True:
+                    body, attempt, enqueued = await work.get()
+                    if not attempt:
+                        results.waits.append(time.perf_counter() - enqueued)
+                    outcome = await run_task_async(body, attempt)
+                    if settle(outcome, attempt, enqueued):
+                        work.put_nowait((body, attempt + 1, enqueued))
+                    work.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(args.workers)]
+            await feed()
+            await work.join()
+            for task in workers:
+                task.cancel()
+            await close_async_clients()
+
+        asyncio.run(main())
+    else:
+        from ai_processor.Processor.Process_audio_callback import run_task
+
+        work = queue.Queue()
+
+        def worker():
+            while True:
+                body, attempt, enqueued = work.get()
+                if not attempt:
+                    results.waits.append(time.perf_counter() - enqueued)
+                outcome = run_task(body, attempt)
+                if settle(outcome, attempt, enqueued):
+                    work.put((body, attempt + 1, enqueued))
+                work.task_done()
+
+        for index in range(args.workers):
+            threading.Thread(target=worker, daemon=True, name=f"benchmark-worker-{index}").start()
+        for index, task in enumerate(tasks):
+            time.sleep(arrival_delay(index))
+            work.put((json.dumps(task), 0, time.perf_counter()))
+        work.join()
+    results.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return time.perf_counter() - start
+
+
+def worker_process(timings_path):
+    """
+    Entry point of a broker mode consumer process: the real consumer, with its stage timings appended to timings_path.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_service.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+    from ai_processor.Processor.pipeline import add_stage_observer
+
+    lock = threading.Lock()
+
+    def write_timing(name, seconds, ok):
+        #? Opened per call, process pool workers forked from here append to the same file
+        with lock, open(timings_path, "a") as timings:
+            timings.write(json.dumps({"stage": name, "seconds": seconds, "ok": ok}) + "\n")
+
+    add_stage_observer(write_timing)
+    if settings.CONSUMER_MODE == "async":
+        from ai_processor.Queue.AsyncConsumer import setup_async_consumer
+        setup_async_consumer()
+    else:
+        from ai_processor.Queue.Consumer import setup_consumer
+        setup_consumer()
+
+
+def run_broker(args, documents, tasks, results):
+    """
+    Queue the tasks on RabbitMQ for --processes consumer processes, returns the wall time.
+    """
+    from ai_processor import repository
+    from ai_processor.Queue.Producer import AudioQueueProducer
+    from ai_processor.Queue.topology import AUDIO_QUEUE
+
+    folder = tempfile.mkdtemp(prefix="pipeline_throughput_")
+    timings_path = os.path.join(folder, "stages.jsonl")
+    log = open(os.path.join(folder, "workers.log"), "w")
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker-process", timings_path], stdout=log, stderr=log)
+        for _ in range(args.processes)
+    ]
+    print(f"worker output: {log.name}", file=sys.stderr)
+    producer = AudioQueueProducer()
+    tokens = [doc.audio_token for doc in documents]
+    peaks = {worker.pid: 0.0 for worker in workers}
+    try:
+        backlog = producer.channel.queue_declare(queue=AUDIO_QUEUE, passive=True).method.message_count
+        if backlog:
+            print(f"Warning: {AUDIO_QUEUE} already holds {backlog} messages, they are processed first")
+        repository.insert_tasks(documents)
+
+        start = time.perf_counter()
+        if args.rate:
+            for index, task in enumerate(tasks):
+                time.sleep(max(0.0, start + index / args.rate - time.perf_counter()))
+                producer.add_audio_task(task["audio_id"], task["audio_url"], task["main_language"], task["user_plan"])
+        else:
+            producer.add_audio_tasks(tasks)
+
+        pending = set(tokens)
+        deadline = time.monotonic() + args.timeout
+        while pending and time.monotonic() < deadline:
+            time.sleep(0.5)
+            for worker in workers:
+                peaks[worker.pid] = max(peaks[worker.pid], rss_mb(worker.pid))
+            finished = repository.audio_collection().find(
+                {"audio_token": {"$in": list(pending)}, "processing_status": {"$in": ["COMPLETED", "FAILED"]}},
+                {"_id": 0, "audio_token": 1, "processing_status": 1, "created_at": 1, "updated_at": 1},
+            )
+            for document in finished:
+                pending.discard(document["audio_token"])
+                #? Both stamped by the service, the COMPLETED write sets updated_at
+                results.finished(
+                    document["processing_status"] == "COMPLETED",
+                    (document["updated_at"] - document["created_at"]).total_seconds(),
+                )
+        elapsed = time.perf_counter() - start
+        if pending:
+            print(f"Warning: {len(pending)} meetings did not finish within {args.timeout}s")
+    finally:
+        for worker in workers:
+            worker.send_signal(signal.SIGINT)
+        for worker in workers:
+            try:
+                worker.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+        producer.close()
+        log.close()
+        repository.audio_collection().delete_many({"audio_token": {"$in": tokens}})
+
+    if os.path.exists(timings_path):
+        with open(timings_path) as timings:
+            for line in timings:
+                timing = json.loads(line)
+                results.stage(timing["stage"], timing["seconds"], timing["ok"])
+    results.peak_rss_mb = max(peaks.values())
+    return elapsed
+
+
+def summarize(args, results, elapsed, providers):
+    from django.conf import settings
+
+    latencies = {f"stage {name}": percentiles(values) for name, values in sorted(results.stages.items())}
+    if results.waits:
+        latencies["queue wait"] = percentiles(results.waits)
+    latencies["meeting"] = percentiles(results.meetings)
+    return {
+        "config": {
+            "mode": args.mode,
+            "consumer": settings.CONSUMER_MODE,
+            "processes": args.processes if args.mode == "broker" else 1,
+            "workers": args.workers,
+            "meetings": args.meetings,
+            "plans": args.plans,
+            "language": args.language,
+            "rate": args.rate,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+        },
+        "elapsed_seconds": elapsed,
+        "completed": results.completed,
+        "failed": results.failed,
+        "retries": results.retries,
+        "errors": dict(results.errors.most_common(5)),
+        "meetings_per_minute": results.completed / elapsed * 60 if elapsed else 0.0,
+        "latencies": latencies,
+        "peak_rss_mb": results.peak_rss_mb,
+        "providers": providers,
+    }
+
+
+def report(summary, baseline=None):
+    config = summary["config"]
+    print(f"\n{config['mode']} mode, {config['consumer']} consumer, {config['processes']} x {config['workers']} workers, "
+          f"{config['meetings']} meetings ({config['plans']}, {config['language']})")
+    print(f"completed {summary['completed']}, failed {summary['failed']}, retries {summary['retries']} "
+          f"in {summary['elapsed_seconds']:.1f}s -> {summary['meetings_per_minute']:.1f} meetings/min")
+
+    print(f"\n{'':<22}{'count':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}")
+    for name, stats in summary["latencies"].items():
+        if stats["count"]:
+            print(f"{name:<22}{stats['count']:>8}{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}{stats['max']:>9.2f}")
+    scope = "per consumer process, children included" if config["mode"] == "broker" else "benchmark process"
+    print(f"\npeak worker RSS: {summary['peak_rss_mb']:.0f} MB ({scope})")
+    calls = ", ".join(
+        f"{route} {counters['requests']} ({counters['errors']} errors)"
+        for route, counters in summary["providers"].items() if counters["requests"]
+    )
+    print(f"provider calls: {calls or 'none'}")
+    for error, count in summary["errors"].items():
+        print(f"failed attempts: {count} x {error}")
+
+    if baseline:
+        print(f"\nagainst the baseline ({baseline['config']['mode']} mode, {baseline['config']['meetings']} meetings):")
+        rows = [("meetings/min", baseline["meetings_per_minute"], summary["meetings_per_minute"])]
+        rows += [
+            (f"{name} p95", baseline["latencies"][name]["p95"], stats["p95"])
+            for name, stats in summary["latencies"].items()
+            if stats["count"] and baseline["latencies"].get(name, {}).get("count")
+        ]
+        rows.append(("peak RSS MB", baseline["peak_rss_mb"], summary["peak_rss_mb"]))
+        for name, before, after in rows:
+            change = (after - before) / before if before else 0.0
+            print(f"    {name:<24}{before:>10.2f} -> {after:>10.2f}  ({change:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["memory", "broker"], default="memory")
+    parser.add_argument("--meetings", type=int, default=100, help="Meetings to process")
+    parser.add_argument("--workers", type=int, default=4, help="Meetings processed at once (per consumer process in broker mode)")
+    parser.add_argument("--processes", type=int, default=1, help="Consumer processes in broker mode")
+    parser.add_argument("--plans", default="premium,base", help="user_plan of the meetings, in turn")
+    parser.add_argument("--language", default="en", help="main_language of the meetings, ar goes through whisper")
+    parser.add_argument("--rate", type=float, default=0, help="Meetings submitted per second (default: all at once)")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds to wait for the meetings in broker mode")
+    parser.add_argument("--latency", help="Stub latencies in ms, e.g. listen=2000,chat=800")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Stub latencies vary by +/- this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a stub provider call fails")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of the injected failures")
+    parser.add_argument("--audio-seconds", type=float, default=60, help="Length of the downloaded recording")
+    parser.add_argument("--transcript-words", type=int, default=1500, help="Length of the stub transcripts")
+    parser.add_argument("--json", action="store_true", help="Machine readable output")
+    parser.add_argument("--save", help="Write the results to this JSON file, to use as a baseline later")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument("--worker-process", metavar="TIMINGS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_process:
+        worker_process(args.worker_process)
+        return
+
+    stubs, stub_url = start_stubs(args)
+    try:
+        configure_environment(args, stub_url)
+        documents, tasks = new_meetings(args, stub_url)
+        results = Results()
+        if args.mode == "memory":
+            from ai_processor import repository
+            from ai_processor.Processor.pipeline import add_stage_observer
+
+            collection = MemoryCollection()
+            repository.audio_collection = lambda: collection
+            repository.insert_tasks(documents)
+            add_stage_observer(results.stage)
+            #? The pipeline prints every transcript, keep the report readable
+            log_path = os.path.join(tempfile.mkdtemp(prefix="pipeline_throughput_"), "workers.log")
+            print(f"worker output: {log_path}", file=sys.stderr)
+            with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+                elapsed = run_memory(args, tasks, results)
+        else:
+            elapsed = run_broker(args, documents, tasks, results)
+        summary = summarize(args, results, elapsed, stub_stats(stub_url))
+    finally:
+        stubs.terminate()
+        stubs.wait()
+
+    if args.save:
+        with open(args.save, "w") as saved:
+            json.dump(summary, saved, indent=2)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as saved:
+                baseline = json.load(saved)
+        report(summary, baseline)
+
+
+if __name__ == "__main__":
+    main()
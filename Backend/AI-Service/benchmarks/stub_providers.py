@@ -0,0 +1,258 @@
+"""
+Local stand-ins for the providers of the pipeline, so benchmarks and load
+tests run offline without calling (or paying for) the real APIs:
+
+    POST /v1/listen                  Deepgram speech to text
+    POST /v1/read                    Deepgram summarization
+    POST /v1/chat/completions        OpenAI chat, plain text or json_schema answers
+    POST /v1/audio/transcriptions    OpenAI whisper
+    GET  /audio/meeting.wav          a generated recording to download
+    GET  /stats                      requests, injected errors and bytes received per route
+
+Every provider route waits a configurable latency (with jitter) and fails
+with a configurable probability, so throttling and outages can be part of a
+run. Point the service at it with DEEPGRAM_BASE_URL=http://127.0.0.1:<port>
+and OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage, from Backend/AI-Service:
+    python benchmarks/stub_providers.py --port 8900
+    python benchmarks/stub_providers.py --latency listen=2000,chat=800 --error-rate 0.02 --error-status 429
+"""
+import io
+import sys
+import json
+import math
+import time
+import array
+import random
+import argparse
+import wave
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+ROUTES = {
+    "/v1/listen": "listen",
+    "/v1/read": "read",
+    "/v1/chat/completions": "chat",
+    "/v1/audio/transcriptions": "transcriptions",
+}
+
+#? Rough latencies of the real endpoints for a meeting of a few minutes, in ms
+DEFAULT_LATENCY_MS = {"listen": 800, "read": 400, "chat": 1500, "transcriptions": 1200}
+
+WORDS = "the budget release roadmap customer feedback hiring testing deadline design review team plan".split()
+
+
+def parse_latencies(text):
+    """
+    "listen=2000,chat=800" -> the default latencies with these ones replaced.
+    """
+    latencies = dict(DEFAULT_LATENCY_MS)
+    for item in filter(None, (text or "").split(",")):
+        route, _, ms = item.partition("=")
+        if route not in latencies:
+            raise ValueError(f"Unknown route '{route}', expected one of {sorted(latencies)}")
+        latencies[route] = float(ms)
+    return latencies
+
+
+def synthetic_wav(seconds, rate=16000):
+    """
+    16 kHz mono 16 bit WAV of a quiet tone, with half a second of silence every
+    5 seconds so the silence based chunking and trimming have something to find.
+    """
+    block = array.array("h", (
+        0 if index >= 4.5 * rate else int(3000 * math.sin(2 * math.pi * 220 * index / rate))
+        for index in range(5 * rate)
+    ))
+    samples = array.array("h")
+    for _ in range(int(seconds // 5) + 1):
+        samples.extend(block)
+    del samples[int(seconds * rate):]
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return output.getvalue()
+
+
+def synthetic_text(words, seed=0):
+    rng = random.Random(seed)
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        count += len(sentence)
+    return " ".join(sentences)
+
+
+class StubState:
+    def __init__(self, latencies, jitter, error_rate, error_status, audio, transcript):
+        self.latencies = latencies
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.audio = audio
+        self.transcript = transcript
+        self.summary = " ".join(transcript.split()[:120])
+        self.key_points = [" ".join(transcript.split()[index:index + 8]) for index in range(0, 80, 8)]
+        self.counters = {route: {"requests": 0, "errors": 0, "bytes_in": 0} for route in DEFAULT_LATENCY_MS}
+        self.lock = threading.Lock()
+
+    def count(self, route, received, failed):
+        with self.lock:
+            counters = self.counters[route]
+            counters["requests"] += 1
+            counters["errors"] += int(failed)
+            counters["bytes_in"] += received
+
+    def chat_content(self, payload):
+        response_format = (payload.get("response_format") or {}).get("json_schema", {}).get("name")
+        if response_format == "meeting_digest":
+            return json.dumps({"summary": self.summary, "key_points": self.key_points})
+        if response_format == "meeting_key_points":
+            return json.dumps({"key_points": self.key_points})
+        if "key points" in payload["messages"][0]["content"]:
+            return " // ".join(self.key_points)
+        return self.summary
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state = None
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            #? Streamed uploads (STT_STREAMING) come without a Content-Length
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        self.send(status, json.dumps(payload).encode(), headers=headers)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith("/audio/"):
+            self.send(200, self.state.audio, "audio/wav")
+        elif path == "/stats":
+            with self.state.lock:
+                self.send_json(200, self.state.counters)
+        else:
+            self.send_json(404, {"error": f"no route {path}"})
+
+    def do_POST(self):
+        state = self.state
+        route = ROUTES.get(urlparse(self.path).path)
+        body = self.read_body()
+        if route is None:
+            self.send_json(404, {"error": f"no route {self.path}"})
+            return
+
+        latency = state.latencies[route] * random.uniform(1 - state.jitter, 1 + state.jitter)
+        time.sleep(max(0.0, latency) / 1000)
+        failed = random.random() < state.error_rate
+        state.count(route, len(body), failed)
+        if failed:
+            headers = {"Retry-After": "1"} if state.error_status == 429 else None
+            self.send_json(state.error_status, {"error": "injected by stub_providers"}, headers)
+            return
+
+        if route == "listen":
+            self.send_json(200, {"results": {"channels": [{"alternatives": [{"transcript": state.transcript}]}]}})
+        elif route == "read":
+            self.send_json(200, {"results": {"summary": {"text": state.summary}}})
+        elif route == "transcriptions":
+            self.send_json(200, {"text": state.transcript})
+        else:
+            payload = json.loads(body)
+            content = state.chat_content(payload)
+            prompt_tokens = len(payload["messages"][0]["content"]) // 4
+            completion_tokens = len(content) // 4
+            self.send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(port=0, latencies=None, jitter=0.2, error_rate=0.0, error_status=503, audio_seconds=60, transcript_words=1500):
+    """
+    Serve the stubs on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: server_address[1] is the port
+    """
+    handler = type("Handler", (StubHandler,), {"state": StubState(
+        latencies or dict(DEFAULT_LATENCY_MS),
+        jitter,
+        error_rate,
+        error_status,
+        synthetic_wav(audio_seconds),
+        synthetic_text(transcript_words),
+    )})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900, help="0 picks a free port")
+    parser.add_argument("--latency", help=f"Per route latency in ms, e.g. listen=2000,chat=800 (defaults: {DEFAULT_LATENCY_MS})")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latencies vary uniformly by +/- this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a provider call fails")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of the injected failures, 429 adds a Retry-After")
+    parser.add_argument("--audio-seconds", type=float, default=60, help="Length of the served recording")
+    parser.add_argument("--transcript-words", type=int, default=1500, help="Length of the returned transcripts")
+    args = parser.parse_args()
+    try:
+        latencies = parse_latencies(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = start_server(
+        args.port, latencies, args.jitter, args.error_rate, args.error_status, args.audio_seconds, args.transcript_words
+    )
+    #? First line of output, read by pipeline_throughput.py to find the port
+    print(f"listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# locust load profile of the AI-Service API: submit_audio/, status/<uuid>/ and report/<uuid>/
+#
+# MeetingClient behaves like an integration: it submits a recording, polls the
+# status every --poll-interval seconds (sending the ETag back, or long-polling
+# with --status-wait) until the meeting is done, then fetches the report.
+# DashboardReader re-reads the status and a light report of meetings that are
+# already done, like a UI refreshing. The submit -> completed time of every
+# meeting is reported as the "meeting" entry.
+#
+# Run the service against the provider stubs so a load test costs nothing, from Backend/AI-Service:
+#   python benchmarks/stub_providers.py --port 8900 &
+#   export DEEPGRAM_BASE_URL=http://127.0.0.1:8900 OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+#   export DEEPGRAM_API_KEY=stub OPENAI_API_KEY=stub TRANSCRIPT_CACHE_BACKEND=off API_KEYS_SERVICE=load-test
+#   python manage.py runserver 8000 &
+#   python manage.py run_consumer &
+#
+# Then from Backend/NonFunctionalTesting, with the same API_KEYS_SERVICE:
+#   locust -f ai_service_locustfile.py --host http://127.0.0.1:8000 --headless -u 50 -r 5 -t 10m \
+#       --csv ai_service --results-json ai_service.json --max-p95-ms status=100,report=300
+#
+# --csv writes locust's own stats / history / failures files, --results-json a
+# summary per request name. With --max-p95-ms locust exits with 1 when a p95
+# goes over its limit, so a run can gate a change in CI.
+import os
+import json
+import time
+import random
+from locust import HttpUser, task, between, events
+from locust.runners import WorkerRunner
+
+API_PREFIX = "/ai_processor"
+FINAL_STATUSES = ("COMPLETED", "FAILED")
+
+#? Meetings done during the run, read again by DashboardReader
+completed_tokens = []
+
+
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    parser.add_argument("--api-key", env_var="API_KEYS_SERVICE", default="", help="X-API-KEY of the AI-Service")
+    parser.add_argument("--audio-url", env_var="LOCUST_AUDIO_URL", default="http://127.0.0.1:8900/audio/meeting.wav",
+                        help="Recording the meetings submit, served by stub_providers.py by default")
+    parser.add_argument("--plans", env_var="LOCUST_PLANS", default="premium,base", help="user_plan of the submissions, picked at random")
+    parser.add_argument("--language", env_var="LOCUST_LANGUAGE", default="en", help="main_language of the submissions")
+    parser.add_argument("--poll-interval", type=float, env_var="LOCUST_POLL_INTERVAL", default=2.0,
+                        help="Seconds between two status polls")
+    parser.add_argument("--status-wait", type=float, env_var="LOCUST_STATUS_WAIT", default=0.0,
+                        help="Long-poll the status with ?since=&wait= this many seconds instead of polling")
+    parser.add_argument("--meeting-timeout", type=float, env_var="LOCUST_MEETING_TIMEOUT", default=600.0,
+                        help="Seconds after which a meeting that is not done counts as failed")
+    parser.add_argument("--results-json", env_var="LOCUST_RESULTS_JSON", default="",
+                        help="Write a summary per request name to this JSON file")
+    parser.add_argument("--max-p95-ms", env_var="LOCUST_MAX_P95_MS", default="",
+                        help="Limits such as status=100,report=300, the run fails when a p95 is over its limit")
+
+
+class AIServiceUser(HttpUser):
+    abstract = True
+
+    def on_start(self):
+        self.options = self.environment.parsed_options
+        self.client.headers["X-API-KEY"] = self.options.api_key
+
+    def get_status(self, token, etag=None, since=None):
+        """
+        Returns:
+            tuple: (status or None when unchanged or failed, etag)
+        """
+        params = {}
+        name = "status"
+        if since and self.options.status_wait > 0:
+            params = {"since": since, "wait": self.options.status_wait}
+            name = "status (long poll)"
+        headers = {"If-None-Match": etag} if etag else {}
+        with self.client.get(f"{API_PREFIX}/status/{token}/", params=params, headers=headers,
+                             name=name, catch_response=True) as response:
+            if response.status_code == 304:
+                response.success()
+                return None, etag
+            if response.status_code != 200:
+                response.failure(f"status answered {response.status_code}")
+                return None, etag
+            return response.json()["status"], response.headers.get("ETag")
+
+    def get_report(self, token, fields=None, name="report"):
+        params = {"fields": fields} if fields else {}
+        with self.client.get(f"{API_PREFIX}/report/{token}/", params=params, name=name, catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f"report answered {response.status_code}")
+
+
+class MeetingClient(AIServiceUser):
+    weight = 4
+    wait_time = between(1, 5)
+
+    def record_meeting(self, started, exception=None):
+        self.environment.events.request.fire(
+            request_type="MEETING",
+            name="meeting",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
+
+    @task
+    def submit_poll_report(self):
+        started = time.perf_counter()
+        submission = {
+            "audio_url": self.options.audio_url,
+            "main_language": self.options.language,
+            "user_plan": random.choice(self.options.plans.split(",")),
+        }
+        with self.client.post(f"{API_PREFIX}/submit_audio/", json=submission, name="submit_audio",
+                              catch_response=True) as response:
+            if response.status_code != 201:
+                response.failure(f"submit answered {response.status_code}")
+                return
+            token = response.json()["audio_token"]
+
+        status, etag = None, None
+        deadline = started + self.options.meeting_timeout
+        while time.perf_counter() < deadline:
+            new_status, etag = self.get_status(token, etag, since=status)
+            status = new_status or status
+            if status in FINAL_STATUSES:
+                break
+            if self.options.status_wait <= 0:
+                time.sleep(self.options.poll_interval)
+
+        if status != "COMPLETED":
+            self.record_meeting(started, RuntimeError(f"meeting ended as {status or 'unknown'}"))
+            return
+        self.get_report(token)
+        self.record_meeting(started)
+        completed_tokens.append(token)
+
+
+class DashboardReader(AIServiceUser):
+    weight = 1
+    wait_time = between(2, 10)
+
+    def on_start(self):
+        super().on_start()
+        self.etags = {}
+
+    @task
+    def refresh(self):
+        if not completed_tokens:
+            return
+        token = random.choice(completed_tokens)
+        _, self.etags[token] = self.get_status(token, self.etags.get(token))
+        self.get_report(token, fields="summary,key_points", name="report (summary only)")
+
+
+def parse_limits(text):
+    limits = {}
+    for item in filter(None, (text or "").split(",")):
+        name, _, ms = item.partition("=")
+        limits[name.strip()] = float(ms)
+    return limits
+
+
+@events.quitting.add_listener
+def write_results(environment, **kwargs):
+    options = environment.parsed_options
+    #? Workers of a distributed run only hold part of the stats, the master writes the results
+    if options is None or isinstance(environment.runner, WorkerRunner):
+        return
+    summary = {}
+    for entry in sorted(environment.stats.entries.values(), key=lambda entry: entry.name):
+        summary[entry.name] = {
+            "method": entry.method,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": entry.total_rps,
+            "avg_ms": entry.avg_response_time,
+            "p50_ms": entry.get_response_time_percentile(0.5),
+            "p95_ms": entry.get_response_time_percentile(0.95),
+            "p99_ms": entry.get_response_time_percentile(0.99),
+            "max_ms": entry.max_response_time,
+        }
+
+    breaches = []
+    for name, limit in parse_limits(options.max_p95_ms).items():
+        p95 = summary.get(name, {}).get("p95_ms")
+        if p95 is not None and p95 > limit:
+            breaches.append(f"{name} p95 {p95:.0f} ms > {limit:.0f} ms")
+    for breach in breaches:
+        print(f"FAIL: {breach}")
+    if breaches:
+        environment.process_exit_code = 1
+
+    if options.results_json:
+        os.makedirs(os.path.dirname(options.results_json) or ".", exist_ok=True)
+        with open(options.results_json, "w") as results:
+            json.dump({
+                "host": environment.host,
+                "users": environment.runner.user_count if environment.runner else None,
+                "total": {
+                    "requests": environment.stats.total.num_requests,
+                    "failures": environment.stats.total.num_failures,
+                    "rps": environment.stats.total.total_rps,
+                },
+                "requests": summary,
+                "breaches": breaches,
+            }, results, indent=2)